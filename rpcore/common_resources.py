@@ -28,12 +28,12 @@ from __future__ import division
 
 from panda3d.core import CS_yup_right, CS_zup_right, invert, Vec3, Mat4, Vec4
 from panda3d.core import SamplerState
-from direct.stdpy.file import open
 
 from rpcore.globals import Globals
 from rpcore.rpobject import RPObject
 from rpcore.loader import RPLoader
 
+from rpcore.util.generic import write_file_if_changed
 from rpcore.util.shader_input_blocks import GroupedInputBlock
 
 
@@ -47,6 +47,7 @@ class CommonResources(RPObject):
         self._pipeline = pipeline
         self._showbase = Globals.base
         self._ptas = {}
+        self.config_hash = None
         self._load_fonts()
         self._load_textures()
         self._setup_inputs()
@@ -108,12 +109,14 @@ class CommonResources(RPObject):
         self._input_ubo.update_input("view_proj_mat_no_jitter", view_mat * proj_mat)
 
     def write_config(self):
-        """ Generates the shader configuration for the common inputs """
+        """ Generates the shader configuration for the common inputs. The file
+        is only written if its content changed, the hash of the content is
+        stored in config_hash. """
         content = self._input_ubo.generate_shader_code()
         try:
             # Try to write the temporary file
-            with open("/$$rptemp/$$main_scene_data.inc.glsl", "w") as handle:
-                handle.write(content)
+            self.config_hash, _ = write_file_if_changed(
+                "/$$rptemp/$$main_scene_data.inc.glsl", content)
         except IOError as msg:
             self.error("Failed to write common resources shader configuration!", msg)
 
@@ -24,14 +24,23 @@ THE SOFTWARE.
 
 """
 
-from rplibs.six import iteritems, iterkeys
+import io
+import os
+import time
+import hashlib
+import threading
+import collections
+
+from rplibs.six import iteritems, iterkeys, itervalues
 from rplibs.yaml import load_yaml_file
 
-from panda3d.core import Filename
+from panda3d.core import Filename, VirtualFileSystem
 from direct.stdpy.file import open
 
 from rpcore.rpobject import RPObject
 from rpcore.loader import RPLoader
+from rpcore.util.shader_template import ShaderTemplate
+from rpcore.util.startup_tracer import StartupTracer
 
 
 class Effect(RPObject):
@@ -56,29 +65,190 @@ class Effect(RPObject):
     # TagStateManager class.
     _PASSES = ("gbuffer", "shadow", "voxelize", "envmap", "forward")
 
-    # Effects are cached based on their source filename and options, this is
-    # the cache where compiled are effects stored.
+    # Effects are cached based on their source filename, options and the
+    # modification stamps of their source files, this is the cache where
+    # compiled effects are stored. It gets cleared when reloading the shaders.
     _GLOBAL_CACHE = {}
 
+    # Modification stamps of the shader templates, computed once per cache
+    # lifetime, since the templates only change when reloading the shaders
+    _TEMPLATE_STAMPS = None
+
     # Global counter to store the amount of generated effects, used to create
     # a unique id used for writing temporary files.
     _EFFECT_ID = 0
 
+    # Directory where generated shaders are stored across runs, or None if
+    # the persistent cache is disabled. See set_persistent_cache_dir.
+    _PERSISTENT_CACHE_DIR = None
+
+    # Size in bytes after which the generation time log gets rotated
+    _MAX_GENERATION_LOG_SIZE = 256 * 1024
+
+    # Guards the generation time log, since effects are prepared in parallel
+    _GENERATION_LOG_LOCK = threading.Lock()
+
     @classmethod
     def load(cls, filename, options):
         """ Loads an effect from a given filename with the specified options.
         This lookups in the global effect cache, and checks if a similar effect
         (i.e. with the same hash) was already loaded, and in that case returns it.
         Otherwise a new effect with the given options is created. """
-        effect_hash = cls._generate_hash(filename, options)
-        if effect_hash in cls._GLOBAL_CACHE:
-            return cls._GLOBAL_CACHE[effect_hash]
-        effect = cls()
-        effect.set_options(options)
-        if not effect.do_load(filename):
-            RPObject.global_error("Effect", "Could not load effect!")
+        return cls.load_many([(filename, options)])[0]
+
+    @classmethod
+    def load_many(cls, requests, pool=None):
+        """ Loads multiple effects at once, given a list of (filename, options)
+        tuples. Effects which are not cached yet get prepared using the given
+        thread pool, that is, their yaml files get parsed and their shaders get
+        generated and written in parallel. The shader objects are created
+        afterwards on the calling thread. Returns a list of effects in the
+        same order as the requests, containing None for failed effects. """
+        cache_keys = []
+        pending = collections.OrderedDict()
+        for filename, options in requests:
+            options = options or {}
+            cache_key = cls._get_cache_key(filename, options)
+            cache_keys.append(cache_key)
+            if cache_key not in cls._GLOBAL_CACHE and cache_key not in pending:
+                effect = cls()
+                effect.set_options(options)
+                pending[cache_key] = (effect, filename)
+
+        results = cls._prepare_jobs(list(itervalues(pending)), pool)
+        failed = set()
+        for (cache_key, (effect, _)), (success, error) in zip(iteritems(pending), results):
+            if error is not None:
+                raise error
+            if not success or not effect.create_shader_objs():
+                RPObject.global_error("Effect", "Could not load effect!")
+                failed.add(cache_key)
+                continue
+            cls._GLOBAL_CACHE[cache_key] = effect
+        return [None if i in failed else cls._GLOBAL_CACHE[i] for i in cache_keys]
+
+    @classmethod
+    def _prepare_jobs(cls, jobs, pool):
+        """ Prepares a list of (effect, filename) tuples, using the given thread
+        pool if there is more than one job. Returns a list of (success, error)
+        tuples, where error is the exception raised while preparing, or None """
+        if pool is not None and len(jobs) > 1:
+            return pool.map(cls._prepare_job, jobs)
+        return [cls._prepare_job(job) for job in jobs]
+
+    @staticmethod
+    def _prepare_job(job):
+        """ Prepares an effect given an (effect, filename) tuple, this is
+        executed by the worker threads in load_many. Exceptions are returned
+        instead of raised, so that the other effects still get prepared. """
+        effect, filename = job
+        try:
+            return effect.prepare(filename), None
+        except Exception as msg:  # pylint: disable=broad-except
+            return False, msg
+
+    @classmethod
+    def _get_cache_key(cls, filename, options):
+        """ Returns the key of an effect in the global effect cache """
+        return (cls._generate_hash(filename, options),
+                cls._get_file_stamp(filename), cls._get_template_stamps())
+
+    @classmethod
+    def clear_cache(cls):
+        """ Clears the global effect cache, so that all effects get loaded from
+        their source files again. This should be called when reloading shaders. """
+        cls._GLOBAL_CACHE.clear()
+        cls._TEMPLATE_STAMPS = None
+        ShaderTemplate.clear_cache()
+
+    @classmethod
+    def get_loaded_effects(cls):
+        """ Returns a list of all effects currently stored in the cache """
+        effects = []
+        for effect in itervalues(cls._GLOBAL_CACHE):
+            if effect not in effects:
+                effects.append(effect)
+        return effects
+
+    @classmethod
+    def reload_effects(cls, effects, pool=None):
+        """ Regenerates the given effects from their source files. The effects
+        are reloaded in place and keep their id, so that applying them again
+        replaces the render states created for the previous shaders. Each effect
+        is loaded into a new effect first, so that an effect which fails to load,
+        e.g. because of a syntax error, keeps its previous shaders. The effects
+        get prepared using the given thread pool, see load_many(). Returns the
+        list of effects which were reloaded successfully. """
+        cls._TEMPLATE_STAMPS = None
+        ShaderTemplate.clear_cache()
+        jobs = []
+        for effect in effects:
+            new_effect = cls()
+            new_effect.set_options(effect._options)
+            jobs.append((new_effect, effect.filename))
+
+        reloaded = []
+        for effect, (new_effect, _), (success, error) in zip(
+                effects, jobs, cls._prepare_jobs(jobs, pool)):
+            if error is None:
+                try:
+                    success = success and new_effect.create_shader_objs()
+                except Exception as msg:  # pylint: disable=broad-except
+                    error = msg
+            if error is not None:
+                effect.error("Could not reload", effect.filename, ":", error)
+                continue
+            if not success:
+                effect.error("Could not reload effect!")
+                continue
+
+            for cache_key, cached_effect in list(iteritems(cls._GLOBAL_CACHE)):
+                if cached_effect is effect:
+                    del cls._GLOBAL_CACHE[cache_key]
+            effect_id = effect.effect_id
+            effect.__dict__.update(new_effect.__dict__)
+            effect.effect_id = effect_id
+            cls._GLOBAL_CACHE[cls._get_cache_key(effect.filename, effect._options)] = effect
+            reloaded.append(effect)
+        return reloaded
+
+    @classmethod
+    def set_persistent_cache_dir(cls, path):
+        """ Sets a directory to store the generated shaders of all effects in,
+        so that they do not have to be generated again on the next start.
+        Shaders are keyed by the hash of the template contents and injected
+        code, including the option defines. Pass None to disable the cache. """
+        if path is not None and not os.path.isdir(path):
+            try:
+                os.makedirs(path)
+            except OSError as msg:
+                RPObject.global_warn("Effect", "Could not create effect cache", path, ":", msg)
+                path = None
+        cls._PERSISTENT_CACHE_DIR = path
+
+    @classmethod
+    def _get_file_stamp(cls, filename):
+        """ Returns the modification time and size of a file, or None if the
+        file does not exist. Used to detect changed effect sources. """
+        vfile = VirtualFileSystem.get_global_ptr().get_file(Filename(filename), True)
+        if vfile is None:
             return None
-        return effect
+        return vfile.get_timestamp(), vfile.get_file_size()
+
+    @classmethod
+    def _get_template_stamps(cls):
+        """ Returns the modification stamps of all shader templates """
+        if cls._TEMPLATE_STAMPS is None:
+            templates = cls._get_template_paths()
+            cls._TEMPLATE_STAMPS = tuple(cls._get_file_stamp(i) for i in templates)
+        return cls._TEMPLATE_STAMPS
+
+    @classmethod
+    def _get_template_paths(cls):
+        """ Returns the paths of all shader templates used by the effects """
+        templates = ["/$$rp/shader/templates/vertex.vert.glsl"]
+        templates += ["/$$rp/shader/templates/{}.frag.glsl".format(i) for i in cls._PASSES]
+        return templates
 
     @classmethod
     def _generate_hash(cls, filename, options):
@@ -96,7 +266,9 @@ class Effect(RPObject):
         # will cause a cache miss)
         filename = Filename(filename)
         filename.make_absolute()
-        file_hash = str(hash(filename.to_os_generic()))
+        # Python's hash() of strings differs between runs, use a stable hash
+        # so that the persistent effect cache can be used
+        file_hash = hashlib.md5(filename.to_os_generic().encode("utf-8")).hexdigest()[:16]
 
         # Hash the options, that is, sort the keys to make sure the values
         # are always in the same order, and then convert the flags to strings using
@@ -114,6 +286,8 @@ class Effect(RPObject):
         self._options = self._DEFAULT_OPTIONS.copy()
         self._generated_shader_paths = {}
         self._shader_objs = {}
+        self._num_cached_shaders = 0
+        self.generation_time = 0.0
 
     def get_option(self, name):
         """ Returns a given option value by name """
@@ -130,21 +304,67 @@ class Effect(RPObject):
     def do_load(self, filename):
         """ Internal method to load the effect from the given filename, do
         not use this directly, instead use load(). """
+        return self.prepare(filename) and self.create_shader_objs()
+
+    def prepare(self, filename):
+        """ Parses the effect file and generates the shaders for all passes,
+        without constructing any shader objects yet. This is safe to call
+        from a worker thread, see load_many(). """
         self.filename = filename
         self.effect_name = self._convert_filename_to_name(filename)
         self.effect_hash = self._generate_hash(filename, self._options)
 
         # Load the YAML file
+        start_time = time.time()
         parsed_yaml = load_yaml_file(filename) or {}
         self._parse_content(parsed_yaml)
+        end_time = time.time()
+        StartupTracer.add_span(self.effect_name + ".prepare", "effect", start_time, end_time)
+        self.generation_time = end_time - start_time
+        self._record_generation_time()
+        return True
 
-        # Construct a shader object for each pass
+    def create_shader_objs(self):
+        """ Constructs a shader object for each pass from the generated
+        shaders. This has to be called from the main thread, after prepare() """
         for pass_id in self._PASSES:
             vertex_src = self._generated_shader_paths["vertex-" + pass_id]
             fragment_src = self._generated_shader_paths["fragment-" + pass_id]
             self._shader_objs[pass_id] = RPLoader.load_shader(vertex_src, fragment_src)
         return True
 
+    def _record_generation_time(self):
+        """ Logs how long it took to generate the shaders of this effect. When
+        using the persistent cache and at least one shader was generated, the
+        time is also appended to a log file in the cache directory, to be able
+        to track regressions. The log file is rotated once it gets too big. """
+        num_shaders = len(self._generated_shader_paths)
+        self.debug("Generated", self.effect_name, "in {:3.1f} ms ({} of {} shaders cached)".format(
+            self.generation_time * 1000.0, self._num_cached_shaders, num_shaders))
+
+        if self._PERSISTENT_CACHE_DIR is None or self._num_cached_shaders == num_shaders:
+            return
+        log_file = os.path.join(self._PERSISTENT_CACHE_DIR, "generation_times.log")
+        try:
+            with self._GENERATION_LOG_LOCK:
+                if (os.path.isfile(log_file) and
+                        os.path.getsize(log_file) > self._MAX_GENERATION_LOG_SIZE):
+                    if os.path.isfile(log_file + ".old"):
+                        os.remove(log_file + ".old")
+                    os.rename(log_file, log_file + ".old")
+                with io.open(log_file, "a") as handle:
+                    handle.write(u"{} {} {:.3f}ms {}/{}\n".format(
+                        time.strftime("%Y-%m-%d %H:%M:%S"), self.effect_name,
+                        self.generation_time * 1000.0, self._num_cached_shaders, num_shaders))
+        except (IOError, OSError) as msg:
+            self.warn("Failed to write", log_file, ":", msg)
+
+    def get_source_files(self):
+        """ Returns the paths of all files the effect was generated from,
+        including the generated shaders, which contain the includes """
+        return ([self.filename] + self._get_template_paths() +
+                sorted(itervalues(self._generated_shader_paths)))
+
     def get_shader_obj(self, pass_id):
         """ Returns a handle to the compiled shader object for a given render
         pass. """
@@ -219,89 +439,49 @@ class Effect(RPObject):
         cache_key = self.effect_name + "@" + stage + "-" + pass_id + "@" + self.effect_hash
         return self._process_shader_template(template_src, cache_key, injects)
 
-    def _process_shader_template(self, template_src, cache_key, injections):  # noqa # pylint: disable=too-many-branches
+    def _process_shader_template(self, template_src, cache_key, injections):
         """ Generates a compiled shader object from a given shader
         source location and code injection definitions. """
-        with open(template_src, "r") as handle:
-            shader_lines = handle.readlines()
-
-        parsed_lines = ["\n\n"]
-        addline = parsed_lines.append
-
-        addline("/* Compiled Shader Template")
-        addline(" * generated from: '" + template_src + "'")
-        addline(" * cache key: '" + cache_key + "'")
-        addline(" *")
-        addline(" * !!! Autogenerated, do not edit! Your changes will be lost. !!!")
-        addline(" */\n\n")
-
-        # Store whether we are in the main function already - we need this
-        # to properly insert scoped code blocks
-        in_main = False
-
-        for line in shader_lines:  # pylint: disable=too-many-nested-blocks
-            stripped_line = line.strip().lower()
-
-            # Check if we are already in the main function
-            if "void main()" in stripped_line:
-                in_main = True
-
-            # Check if the current line is a hook
-            if stripped_line.startswith("%") and stripped_line.endswith("%"):
-
-                # If the line is a hook, get the hook name and save the
-                # indent so we can indent all injected lines properly.
-                hook_name = stripped_line[1:-1]
-                indent = " " * (len(line) - len(line.lstrip()))
-
-                # Inject all registered template values into the hook
-                if hook_name in injections:
-
-                    # Directly remove the value from the list so we can check which
-                    # hooks were not found in the template
-                    insertions = injections.pop(hook_name)
-
-                    if len(insertions) > 0:
-
-                        # When we are in the main function, we have to make sure we
-                        # use a seperate scope, so there are no conflicts with variable
-                        # declarations
-                        header = indent + "/* Hook: " + hook_name + " */" + (" {" if in_main else "")  # noqa # pylint: disable=line-too-long
-                        addline(header)
-
-                        for line_to_insert in insertions:
-                            if line_to_insert is None:
-                                self.warn("Empty insertion '" + hook_name + "'")
-                                continue
-
-                            if not isinstance(line_to_insert, str):
-                                self.warn("Invalid line type: ", line_to_insert)
-                                continue
-
-                            # Dont indent defines and pragmas
-                            if line_to_insert.startswith("#"):
-                                addline(line_to_insert)
-                            else:
-                                addline(indent + line_to_insert)
-
-                        if in_main:
-                            addline(indent + "}")
-
-            else:
-                addline(line.rstrip())
-
-        # Add a closing newline to the file
-        addline("")
-
-        # Warn the user about all unused hooks
-        for key in injections:
-            self.warn("Hook '" + key + "' not found in template '" + template_src + "'!")
+        template = ShaderTemplate.load(template_src)
+
+        persistent_file = self._get_persistent_cache_file(template, cache_key, injections)
+        if persistent_file is not None and os.path.isfile(persistent_file):
+            with io.open(persistent_file, "rb") as handle:
+                shader_content = handle.read().decode("utf-8")
+            self._num_cached_shaders += 1
+        else:
+            shader_content = template.expand(cache_key, injections)
+            if persistent_file is not None:
+                self._write_persistent_cache_file(persistent_file, shader_content)
 
         # Write the constructed shader and load it back
-        shader_content = "\n".join(parsed_lines)
         temp_path = "/$$rptemp/$$effect-" + cache_key + ".glsl"
 
         with open(temp_path, "w") as handle:
             handle.write(shader_content)
 
         return temp_path
+
+    def _get_persistent_cache_file(self, template, cache_key, injections):
+        """ Returns the path of the generated shader in the persistent cache,
+        or None if the persistent cache is disabled """
+        if self._PERSISTENT_CACHE_DIR is None:
+            return None
+        content_hash = hashlib.sha1(template.content_hash.encode("ascii"))
+        content_hash.update(cache_key.encode("utf-8"))
+        content_hash.update(repr(sorted(iteritems(injections))).encode("utf-8"))
+        return os.path.join(self._PERSISTENT_CACHE_DIR, content_hash.hexdigest() + ".glsl")
+
+    def _write_persistent_cache_file(self, persistent_file, shader_content):
+        """ Stores a generated shader in the persistent cache. The shader is
+        written to a temporary file first, so other instances never read a
+        partially written shader. """
+        temp_file = persistent_file + ".{}-{}.tmp".format(os.getpid(), self.effect_id)
+        try:
+            with io.open(temp_file, "wb") as handle:
+                handle.write(shader_content.encode("utf-8"))
+            if os.path.isfile(persistent_file):
+                os.remove(persistent_file)
+            os.rename(temp_file, persistent_file)
+        except (IOError, OSError) as msg:
+            self.warn("Failed to write", persistent_file, ":", msg)
@@ -39,6 +39,9 @@ class GPUCommandQueue(RPObject):
     """ This class offers an interface to the gpu, allowing commands to be
     pushed to a queue which then get executed on the gpu """
 
+    SHADER_SOURCES = ("/$$rp/shader/default_post_process.vert.glsl",
+                      "/$$rp/shader/process_command_queue.frag.glsl")
+
     def __init__(self, pipeline):
         RPObject.__init__(self)
         self._pipeline = pipeline
@@ -82,9 +85,7 @@ class GPUCommandQueue(RPObject):
 
     def reload_shaders(self):
         """ Reloads the command shader """
-        shader = RPLoader.load_shader(
-            "/$$rp/shader/default_post_process.vert.glsl",
-            "/$$rp/shader/process_command_queue.frag.glsl")
+        shader = RPLoader.load_shader(*self.SHADER_SOURCES)
         self._command_target.shader = shader
 
     def register_input(self, key, val):
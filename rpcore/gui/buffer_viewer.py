@@ -80,14 +80,19 @@ class BufferViewer(DraggableWindow):
     @property
     def stage_information(self):
         """ Returns the amount of attached stages, and also the memory consumed
-        in MiB in a tuple. """
+        in MiB in a tuple. Textures shared by multiple targets are only
+        counted once. """
         count, memory = 0, 0
+        seen = set()
         for entry in self.entries:
             if isinstance(entry, Texture):
                 memory += entry.estimate_texture_memory()
                 count += 1
             elif entry.__class__.__name__ == "RenderTarget":
                 for target in itervalues(entry.targets):
+                    if id(target) in seen:
+                        continue
+                    seen.add(id(target))
                     memory += target.estimate_texture_memory()
                     count += 1
             else:
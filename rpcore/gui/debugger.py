@@ -127,7 +127,7 @@ class Debugger(RPObject):
         self.overlay_node = Globals.base.aspect2d.attach_new_node("Overlay")
         self.debug_lines = []
 
-        num_lines = 6 if self.advanced_info else 1
+        num_lines = 7 if self.advanced_info else 1
         for i in range(num_lines):
             self.debug_lines.append(TextNode(
                 pos=Vec2(0, -i * 0.046), parent=self.overlay_node, align="right", color=Vec3(0.7, 1, 1)))
@@ -244,16 +244,18 @@ class Debugger(RPObject):
 
         text = "{:4d} states |  {:4d} transforms "
         text += "|  {:4d} cmds |  {:4d} lights |  {:4d} shadows "
-        text += "|  {:5.1f}% atlas usage"
+        text += "|  {:5.1f}% atlas usage ({:4.1f}% frag.)"
         self.debug_lines[1].text = text.format(
             RenderState.get_num_states(), TransformState.get_num_states(),
             self.pipeline.light_mgr.cmd_queue.num_processed_commands,
             self.pipeline.light_mgr.num_lights,
             self.pipeline.light_mgr.num_shadow_sources,
-            self.pipeline.light_mgr.shadow_atlas_coverage)
+            self.pipeline.light_mgr.shadow_atlas_coverage,
+            self.pipeline.light_mgr.shadow_atlas_fragmentation)
 
         text = "Internal:  {:3.0f} MB VRAM |  {:5d} img |  {:5d} tex |  "
         text += "{:5d} fbos |  {:3d} plugins |  {:2d}  views  ({:2d} active)"
+        text += " |  ies cache {:2d} hit / {:2d} miss"
         tex_memory, tex_count = self.buffer_viewer.stage_information
 
         views, active_views = 0, 0
@@ -271,7 +273,9 @@ class Debugger(RPObject):
             tex_memory / (1024**2), len(Image.REGISTERED_IMAGES), tex_count,
             RenderTarget.NUM_ALLOCATED_BUFFERS,
             len(self.pipeline.plugin_mgr.enabled_plugins),
-            views, active_views)
+            views, active_views,
+            self.pipeline.ies_loader.cache_hits,
+            self.pipeline.ies_loader.cache_misses)
 
         text = "Scene:   {:4.0f} MB VRAM |  {:3d} tex |  {:4d} geoms "
         text += "|  {:4d} nodes |  {:7,.0f} vertices"
@@ -326,5 +330,14 @@ class Debugger(RPObject):
             self.pipeline.settings["pipeline.resolution_scale"] * 100.0,
             self.pipeline.light_mgr.num_tiles.x,
             self.pipeline.light_mgr.num_tiles.y,)
+
+        task_scheduler = self.pipeline.task_scheduler
+        text = "Tasks ({}):  {:3.2f} / {:3.2f} ms  |  most overdue: ".format(
+            task_scheduler.mode, task_scheduler.scheduled_cost, task_scheduler.frame_budget)
+        text += ", ".join("{} ({}/{}, {:3.2f} ms, measured {})".format(
+            stats["name"], stats["age"], stats["max_staleness"], stats["cost"],
+            "-" if stats["observed_cost"] is None else "{:3.2f} ms".format(stats["observed_cost"]))
+                          for stats in task_scheduler.get_task_stats()[:3])
+        self.debug_lines[6].text = text
         if task:
             return task.again
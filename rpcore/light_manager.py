@@ -32,6 +32,7 @@ from rpcore.globals import Globals
 from rpcore.gpu_command_queue import GPUCommandQueue
 from rpcore.image import Image
 from rpcore.native import InternalLightManager, PointLight, ShadowManager
+from rpcore.native import NATIVE_CXX_LOADED
 from rpcore.rpobject import RPObject
 
 from rpcore.stages.apply_lights_stage import ApplyLightsStage
@@ -73,6 +74,13 @@ class LightManager(RPObject):
         """ Returns the amount of stored lights """
         return self.internal_mgr.num_lights
 
+    @property
+    def num_updated_lights(self):
+        """ Returns the amount of lights which were uploaded to the GPU during
+        the last update. Only tracked by the python implementation, which only
+        uploads changed lights. """
+        return getattr(self.internal_mgr, "num_updated_lights", 0)
+
     @property
     def num_shadow_sources(self):
         """ Returns the amount of stored shadow sources """
@@ -83,6 +91,14 @@ class LightManager(RPObject):
         """ Returns the shadow atlas coverage in percentage  """
         return self.internal_mgr.shadow_manager.atlas.coverage * 100.0
 
+    @property
+    def shadow_atlas_fragmentation(self):
+        """ Returns the shadow atlas fragmentation in percentage, that is the
+        share of free space which is not part of the largest free region. This
+        is only tracked by the python implementation, and 0 otherwise. """
+        atlas = self.internal_mgr.shadow_manager.atlas
+        return getattr(atlas, "fragmentation", 0.0) * 100.0
+
     def add_light(self, light):
         """ Adds a new light """
         self.internal_mgr.add_light(light)
@@ -93,11 +109,37 @@ class LightManager(RPObject):
         self.internal_mgr.remove_light(light)
         self.pta_max_light_index[0] = self.internal_mgr.max_light_index
 
+    def add_lights(self, lights):
+        """ Adds a list of lights. When using the python implementation, the
+        lights get consecutive slots and are uploaded with range commands """
+        if hasattr(self.internal_mgr, "add_lights"):
+            self.internal_mgr.add_lights(lights)
+        else:
+            for light in lights:
+                self.internal_mgr.add_light(light)
+        self.pta_max_light_index[0] = self.internal_mgr.max_light_index
+
+    def remove_lights(self, lights):
+        """ Removes a list of lights """
+        for light in lights:
+            self.internal_mgr.remove_light(light)
+        self.pta_max_light_index[0] = self.internal_mgr.max_light_index
+
+    def update_lights_bulk(self, lights):
+        """ Uploads the data of a list of attached lights immediately, instead
+        of waiting for the next update. This is only supported by the python
+        implementation, otherwise the lights get updated during the next update. """
+        if hasattr(self.internal_mgr, "update_lights_bulk"):
+            self.internal_mgr.update_lights_bulk(lights)
+
     def update(self):
         """ Main update method to process the GPU commands """
         self.internal_mgr.set_camera_pos(
             Globals.base.camera.get_pos(Globals.base.render))
         self.internal_mgr.update()
+        if self.light_storage is not None:
+            self.light_storage.write_dirty_to(
+                self.img_light_data, self.cmd_queue.command_list)
         self.shadow_manager.update()
         self.cmd_queue.process_queue()
 
@@ -150,6 +192,7 @@ class LightManager(RPObject):
         self.img_light_data = Image.create_buffer(
             "LightData", self.MAX_LIGHTS * per_light_vec4s, "RGBA16")
         self.img_light_data.clear_image()
+        self.init_light_storage()
 
         self.pta_max_light_index = PTAInt.empty_array(1)
         self.pta_max_light_index[0] = 0
@@ -169,6 +212,28 @@ class LightManager(RPObject):
         inputs["ShadowSourceData"] = self.img_source_data
         inputs["maxLightIndex"] = self.pta_max_light_index
 
+    def init_light_storage(self):
+        """ Optionally keeps the light data in numpy arrays, which are uploaded
+        once per frame, instead of emitting a GPU command for each changed light.
+        This is only supported by the python implementation. """
+        self.light_storage = None
+        if not self.pipeline.settings["lighting.use_numpy_light_storage"]:
+            return
+
+        if NATIVE_CXX_LOADED:
+            self.warn("The numpy light storage is not supported by the C++ modules")
+            return
+
+        try:
+            from rpcore.pynative.light_storage import NumpyLightStorage
+        except ImportError:
+            self.warn("Could not import numpy, using GPU commands to store lights")
+            return
+
+        self.debug("Using numpy light storage")
+        self.light_storage = NumpyLightStorage(self.MAX_LIGHTS)
+        self.internal_mgr.light_storage = self.light_storage
+
     def init_stages(self):
         """ Inits all required stages for the lighting """
 
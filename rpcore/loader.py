@@ -33,6 +33,7 @@ from panda3d.core import Shader
 
 from rpcore.globals import Globals
 from rpcore.rpobject import RPObject
+from rpcore.util.startup_tracer import StartupTracer
 
 __all__ = ("RPLoader",)
 
@@ -40,22 +41,29 @@ __all__ = ("RPLoader",)
 class timed_loading_operation(object):  # noqa # pylint: disable=invalid-name,too-few-public-methods
 
     """ Context manager for a synchronous loading operation, keeping track
-    on how much time elapsed during the loading process, and warning about
-    long loading times. """
+    on how much time elapsed during the loading process. During startup, the
+    operation is recorded in the StartupTracer. Afterwards, long loading times
+    are warned about, since they cause stutters. """
 
     WARNING_COUNT = 0
+    SLOW_THRESHOLD = 0.08
 
-    def __init__(self, resource):
+    def __init__(self, resource, category="load"):
         self.resource = resource
+        self.category = category
         if isinstance(self.resource, (list, tuple)):
             self.resource = ', '.join(self.resource)
 
     def __enter__(self):
-        self.start_time = time.process_time()
+        self.start_time = time.time()
 
     def __exit__(self, *args):
-        duration = (time.process_time() - self.start_time) * 1000.0
-        if duration > 80.0 and timed_loading_operation.WARNING_COUNT < 5:
+        end_time = time.time()
+        if StartupTracer.is_recording():
+            StartupTracer.add_span(self.resource, self.category, self.start_time, end_time)
+            return
+        duration = (end_time - self.start_time) * 1000.0
+        if duration > self.SLOW_THRESHOLD * 1000.0 and timed_loading_operation.WARNING_COUNT < 5:
             RPObject.global_warn(
                 "RPLoader", "Loading '" + self.resource + "' took", round(duration, 2), "ms")
             timed_loading_operation.WARNING_COUNT += 1
@@ -72,31 +80,31 @@ class RPLoader(RPObject):
     @classmethod
     def load_texture(cls, filename):
         """ Loads a 2D-texture from disk """
-        with timed_loading_operation(filename):
+        with timed_loading_operation(filename, "texture"):
             return Globals.base.loader.load_texture(filename)
 
     @classmethod
     def load_cube_map(cls, filename, read_mipmaps=False):
         """ Loads a cube map from disk """
-        with timed_loading_operation(filename):
+        with timed_loading_operation(filename, "texture"):
             return Globals.base.loader.load_cube_map(filename, readMipmaps=read_mipmaps)
 
     @classmethod
     def load_3d_texture(cls, filename):
         """ Loads a 3D-texture from disk """
-        with timed_loading_operation(filename):
+        with timed_loading_operation(filename, "texture"):
             return Globals.base.loader.load_3d_texture(filename)
 
     @classmethod
     def load_font(cls, filename):
         """ Loads a font from disk """
-        with timed_loading_operation(filename):
+        with timed_loading_operation(filename, "font"):
             return Globals.base.loader.load_font(filename)
 
     @classmethod
     def load_shader(cls, *args):
         """ Loads a shader from disk """
-        with timed_loading_operation(args):
+        with timed_loading_operation(args, "shader"):
             if len(args) == 1:
                 return Shader.load_compute(Shader.SL_GLSL, args[0])
             return Shader.load(Shader.SL_GLSL, *args)
@@ -104,7 +112,7 @@ class RPLoader(RPObject):
     @classmethod
     def load_model(cls, filename):
         """ Loads a model from disk """
-        with timed_loading_operation(filename):
+        with timed_loading_operation(filename, "model"):
             return Globals.base.loader.load_model(filename)
 
     @classmethod
@@ -74,6 +74,13 @@ class BasePlugin(RPObject):
         self._assigned_stages.append(stage_handle)
         return stage_handle
 
+    def remove_stage(self, stage_handle):
+        """ Unlinks a stage from the current plugin instance, so that its shaders
+        do not get reloaded anymore. This is called by the stage manager for
+        stages which got pruned, since their targets were already removed. """
+        if stage_handle in self._assigned_stages:
+            self._assigned_stages.remove(stage_handle)
+
     def get_setting(self, setting_id, plugin_id=None):
         """ Returns the value of a setting given by its setting id. If plugin_id
         is set, returns the setting of the given plugin """
@@ -26,25 +26,62 @@ THE SOFTWARE.
 
 from __future__ import division
 
-from rplibs.six import iteritems
-from direct.stdpy.file import open
+import collections
+
+from panda3d.core import PTAFloat, SamplerState
+
+from rplibs.six import iteritems, itervalues
 
 from rpcore.rpobject import RPObject
-from rpcore.util.shader_input_blocks import GroupedInputBlock
+from rpcore.image import Image
+from rpcore.util.generic import write_file_if_changed
+from rpcore.util.shader_input_blocks import GroupedInputBlock, SimpleInputBlock
+from rpcore.util.smooth_connected_curve import SmoothConnectedCurve
 from rpcore.pluginbase.day_setting_types import ColorType
 
+# Without numpy, the curves are evaluated directly each time the time changes
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class DayTimeManager(RPObject):
 
     """ This manager handles all time of day settings, provides them as
-    a input to all shaders, and stores which time it currently is """
+    a input to all shaders, and stores which time it currently is. The settings
+    are baked into a lookup table whenever their curves change, so each frame
+    only requires a single interpolation of all settings.
+
+    If pipeline.daytime_texture is set, the lookup table is uploaded as texture
+    instead, and the shaders sample it themselves, so that each frame only the
+    current time has to be passed to the shaders. """
+
+    # Amount of samples of the lookup table per curve
+    LUT_SIZE = 1024
 
     def __init__(self, pipeline):
         RPObject.__init__(self)
         self._pipeline = pipeline
-        self._input_ubo = GroupedInputBlock("TimeOfDay")
         self._time = 0.5
-        self._setting_handles = {}
+        self._setting_handles = collections.OrderedDict()
+        self._lut = None
+        self._lut_layout = []
+        self._lut_revision = None
+        self._lut_tex = None
+        self._last_time = None
+        self.config_hash = None
+
+        self._use_texture = pipeline.settings["pipeline.daytime_texture"]
+        if self._use_texture and numpy is None:
+            self.warn("Could not import numpy, uploading the daytime settings each frame")
+            self._use_texture = False
+
+        if self._use_texture:
+            self._input_ubo = SimpleInputBlock("TimeOfDay")
+            self._pta_time = PTAFloat.empty_array(1)
+        else:
+            self._input_ubo = GroupedInputBlock("TimeOfDay")
 
     @property
     def time(self):
@@ -74,26 +111,163 @@ class DayTimeManager(RPObject):
 
     def load_settings(self):
         """ Loads all day time settings from the plugin manager and registers
-        them to the used input buffer """
+        them to the used input buffer. The generated shader code is only
+        written if it changed, its hash is stored in config_hash. """
         for plugin_id, settings in iteritems(self._pipeline.plugin_mgr.day_settings):
             for setting, handle in iteritems(settings):
                 setting_id = "{}.{}".format(plugin_id, setting)
-                self._input_ubo.register_pta(setting_id, handle.glsl_type)
+                if not self._use_texture:
+                    self._input_ubo.register_pta(setting_id, handle.glsl_type)
                 self._setting_handles[setting_id] = handle
         self._pipeline.stage_mgr.input_blocks.append(self._input_ubo)
 
-        # Generate UBO shader code
-        shader_code = self._input_ubo.generate_shader_code()
-        with open("/$$rptemp/$$daytime_config.inc.glsl", "w") as handle:
-            handle.write(shader_code)
+        if self._use_texture:
+            num_rows = self._update_lut_layout()
+            self._lut_tex = Image.create_2d("DaytimeLUT", self.LUT_SIZE, max(1, num_rows), "R32")
+            self._lut_tex.set_minfilter(SamplerState.FT_nearest)
+            self._lut_tex.set_magfilter(SamplerState.FT_nearest)
+            self._input_ubo.add_input("lut", self._lut_tex)
+            self._input_ubo.add_input("time", self._pta_time)
+            shader_code = self._generate_lut_shader_code()
+        else:
+            shader_code = self._input_ubo.generate_shader_code()
+        shader_code += self._generate_accessors()
 
-    def update(self):
-        """ Internal update method which updates all day time settings """
+        self.config_hash, _ = write_file_if_changed(
+            "/$$rptemp/$$daytime_config.inc.glsl", shader_code)
+
+    def _generate_accessors(self):
+        """ Generates a function for each setting which returns its current value,
+        e.g. get_daytime_scattering_sun_color(). This works with both the input
+        block and the lookup texture. """
+        content = ""
+        for setting_id, handle in iteritems(self._setting_handles):
+            if self._use_texture:
+                setting_id, start, count = next(i for i in self._lut_layout if i[0] == setting_id)
+                samples = ", ".join("_sample_daytime_lut({})".format(start + i)
+                                    for i in range(count))
+                value = samples if count == 1 else "{}({})".format(handle.glsl_type, samples)
+            else:
+                value = "TimeOfDay." + setting_id
+            content += "{} get_daytime_{}() {{ return {}; }}\n".format(
+                handle.glsl_type, setting_id.replace(".", "_"), value)
+        return content + "\n"
+
+    def _generate_lut_shader_code(self):
+        """ Generates the shader code to sample the lookup texture. In order to
+        keep the TimeOfDay.plugin.setting syntax working, TimeOfDay is defined
+        as a function returning all settings, the shader compiler removes all
+        settings which are not used. """
+        content = "#pragma once\n\n"
+        content += "// Autogenerated by the render pipeline\n"
+        content += "// Do not edit! Your changes will be lost.\n\n"
+        content += "#define DAYTIME_LUT_SIZE {}\n\n".format(self.LUT_SIZE)
+        content += "uniform struct {\n    sampler2D lut;\n    float time;\n} TimeOfDay;\n\n"
+        content += "float _sample_daytime_lut(int row) {\n"
+        content += "    float position = TimeOfDay.time * float(DAYTIME_LUT_SIZE - 1);\n"
+        content += "    int index = min(int(position), DAYTIME_LUT_SIZE - 2);\n"
+        content += "    return mix(texelFetch(TimeOfDay.lut, ivec2(index, row), 0).x,\n"
+        content += "               texelFetch(TimeOfDay.lut, ivec2(index + 1, row), 0).x,\n"
+        content += "               position - float(index));\n"
+        content += "}\n\n"
+
+        structs = collections.OrderedDict()
+        for setting_id, handle in iteritems(self._setting_handles):
+            plugin_id, setting = setting_id.split(".")
+            structs.setdefault(plugin_id, []).append((handle.glsl_type, setting))
+
+        for plugin_id, members in iteritems(structs):
+            content += "struct " + plugin_id + "_UBOSTRUCT {\n"
+            for glsl_type, setting in members:
+                content += "    " + glsl_type + " " + setting + ";\n"
+            content += "};\n\n"
+
+        content += "struct TimeOfDay_LUTSTRUCT {\n"
+        for plugin_id in structs:
+            content += "    " + plugin_id + "_UBOSTRUCT " + plugin_id + ";\n"
+        content += "};\n\n"
+
+        # The accessors are appended afterwards, so declare them here
+        for setting_id, handle in iteritems(self._setting_handles):
+            content += "{} get_daytime_{}();\n".format(
+                handle.glsl_type, setting_id.replace(".", "_"))
+
+        content += "\nTimeOfDay_LUTSTRUCT _get_time_of_day() {\n"
+        content += "    TimeOfDay_LUTSTRUCT result;\n"
+        for setting_id in self._setting_handles:
+            content += "    result.{} = get_daytime_{}();\n".format(
+                setting_id, setting_id.replace(".", "_"))
+        content += "    return result;\n"
+        content += "}\n\n"
+        content += "#define TimeOfDay _get_time_of_day()\n\n"
+        return content
+
+    def _get_shader_value(self, handle, value):
+        """ Returns the value passed to the shaders for a given linear value """
+        # XXX: Find a better interface for this. Without this fix, colors
+        # are in the range 0 .. 255 in the shader.
+        if isinstance(handle, ColorType):
+            return value
+        return handle.get_scaled_value(value)
+
+    def _update_lut_layout(self):
+        """ Determines the rows of each setting in the lookup table, and
+        returns the total amount of rows """
+        num_rows = 0
+        self._lut_layout = []
         for setting_id, handle in iteritems(self._setting_handles):
-            # XXX: Find a better interface for this. Without this fix, colors
-            # are in the range 0 .. 255 in the shader.
-            if isinstance(handle, ColorType):
-                value = handle.get_value_at(self._time)
+            self._lut_layout.append((setting_id, num_rows, len(handle.curves)))
+            num_rows += len(handle.curves)
+        return num_rows
+
+    def _bake_lut(self):
+        """ Bakes the shader values of all settings into a lookup table, which
+        contains a row for each curve. Only curves which changed are sampled
+        again, since the curves cache their samples. """
+        num_rows = self._update_lut_layout()
+        rows = []
+        for handle in itervalues(self._setting_handles):
+            for curve in handle.curves:
+                rows.append([self._get_shader_value(handle, i)
+                             for i in curve.get_lut(self.LUT_SIZE)])
+        self._lut = numpy.array(rows, dtype=numpy.float32).reshape(num_rows, self.LUT_SIZE)
+        self._lut_revision = SmoothConnectedCurve.REVISION
+
+        if self._lut_tex is not None:
+            data = numpy.frombuffer(
+                memoryview(self._lut_tex.modify_ram_image()), dtype=numpy.float32)
+            data[:self._lut.size] = self._lut.ravel()
+
+    def update(self):
+        """ Internal update method which updates all day time settings. Does
+        nothing if neither the time nor any of the curves changed. """
+        if self._time == self._last_time and self._lut_revision == SmoothConnectedCurve.REVISION:
+            return
+        self._last_time = self._time
+
+        if numpy is None:
+            for setting_id, handle in iteritems(self._setting_handles):
+                value = self._get_shader_value(handle, handle.get_value_at(self._time))
+                self._input_ubo.update_input(setting_id, value)
+            self._lut_revision = SmoothConnectedCurve.REVISION
+            return
+
+        if self._lut_revision != SmoothConnectedCurve.REVISION:
+            self._bake_lut()
+
+        # The shaders sample the lookup texture themselves
+        if self._lut_tex is not None:
+            self._pta_time[0] = self._time
+            return
+
+        # Interpolate all settings at once
+        position = self._time * (self.LUT_SIZE - 1)
+        index = min(int(position), self.LUT_SIZE - 2)
+        weight = position - index
+        values = (self._lut[:, index] * (1.0 - weight) + self._lut[:, index + 1] * weight).tolist()
+
+        for setting_id, start, count in self._lut_layout:
+            if count == 1:
+                self._input_ubo.update_input(setting_id, values[start])
             else:
-                value = handle.get_scaled_value_at(self._time)
-            self._input_ubo.update_input(setting_id, value)
+                self._input_ubo.update_input(setting_id, tuple(values[start:start + count]))
@@ -24,6 +24,7 @@ THE SOFTWARE.
 
 """
 
+import time
 import importlib
 import collections
 
@@ -34,10 +35,27 @@ from direct.stdpy.file import listdir, isdir, join, open
 
 from rpcore.rpobject import RPObject
 from rpcore.native import NATIVE_CXX_LOADED
+from rpcore.util.startup_tracer import StartupTracer
+from rpcore.pluginbase.plugin_info import PluginInfo
 from rpcore.pluginbase.setting_types import make_setting_from_data
 from rpcore.pluginbase.day_setting_types import make_daysetting_from_data
 
 
+class PluginInstances(dict):
+
+    """ Dictionary of plugin instances, which imports and constructs each
+    plugin the first time it gets accessed """
+
+    def __init__(self, plugin_mgr):
+        dict.__init__(self)
+        self._plugin_mgr = plugin_mgr
+
+    def __missing__(self, plugin_id):
+        instance = self._plugin_mgr.construct_plugin(plugin_id)
+        self[plugin_id] = instance
+        return instance
+
+
 class PluginManager(RPObject):
 
     """ This class manages all plugins. It provides functionality to load plugin
@@ -51,15 +69,22 @@ class PluginManager(RPObject):
         self._pipeline = pipeline
         self.settings = {}
         self.day_settings = {}
-        self.instances = {}
+        self.plugin_infos = {}
+        self.instances = PluginInstances(self)
         self.enabled_plugins = set()
 
+        # Import and construction time of each plugin, in seconds
+        self.plugin_timings = collections.OrderedDict()
+
         # Used by the plugin configurator and to only load the required data
         self.requires_daytime_settings = True
 
     def load(self):
-        """ Loads all plugins and their settings, and also constructs instances
-        of the main plugin classes for all enabled plugins """
+        """ Loads all plugins and their settings, and checks the requirements
+        of all enabled plugins. The plugins themselves are imported and
+        constructed the first time they are accessed, usually when the first
+        hook gets triggered, see PluginInstances. Disabled plugins are never
+        imported. """
         self.debug("Loading plugin settings")
         self.load_base_settings("/$$rp/rpplugins")
         self.load_setting_overrides("/$$rpconfig/plugins.yaml")
@@ -67,12 +92,9 @@ class PluginManager(RPObject):
         if self.requires_daytime_settings:
             self.load_daytime_overrides("/$$rpconfig/daytime.yaml")
 
-        self.debug("Creating plugin instances ..")
+        self.debug("Checking plugin requirements ..")
         for plugin_id in self.settings:
-            handle = self._load_plugin(plugin_id)
-            if handle:
-                self.instances[plugin_id] = handle
-            else:
+            if plugin_id in self.enabled_plugins and not self._check_requirements(plugin_id):
                 self.disable_plugin(plugin_id)
 
     def disable_plugin(self, plugin_id):
@@ -81,16 +103,17 @@ class PluginManager(RPObject):
         self.warn("Disabling", plugin_id)
         if plugin_id in self.enabled_plugins:
             self.enabled_plugins.remove(plugin_id)
-        for instance in list(self.instances.values()):
-            if plugin_id in instance.required_plugins:
-                self.disable_plugin(instance.plugin_id)
+        for info in list(self.plugin_infos.values()):
+            if plugin_id in info.required_plugins and info.plugin_id in self.enabled_plugins:
+                self.disable_plugin(info.plugin_id)
         # if plugin_id in self.instances:
         #     del self.instances[plugin_id]
 
     def unload(self):
         """ Unloads all plugins """
         self.debug("Unloading all plugins")
-        self.instances = {}
+        self.instances = PluginInstances(self)
+        self.plugin_infos = {}
         self.settings = {}
         self.day_settings = {}
         self.enabled_plugins = set()
@@ -110,6 +133,7 @@ class PluginManager(RPObject):
     def load_plugin_settings(self, plugin_id, plugin_pth):
         """ Internal method to load all settings of a plugin, given its plugin
         id and path to the plugin base directory """
+        self.plugin_infos[plugin_id] = PluginInfo(plugin_id, plugin_pth)
         config_file = join(plugin_pth, "config.yaml")
         config = load_yaml_file(config_file)
         # When you don't specify anything in the settings, instead of
@@ -165,10 +189,12 @@ class PluginManager(RPObject):
         """ Triggers a given hook on all plugins, effectively calling all
         bound callbacks """
         hook_method = "on_{}".format(hook_name)
-        for plugin_id in self.enabled_plugins:
-            plugin_handle = self.instances[plugin_id]
-            if hasattr(plugin_handle, hook_method):
-                getattr(plugin_handle, hook_method)()
+        with StartupTracer.span(hook_method, "plugin"):
+            for plugin_id in self.enabled_plugins:
+                plugin_handle = self.instances[plugin_id]
+                if hasattr(plugin_handle, hook_method):
+                    with StartupTracer.span(plugin_id + "." + hook_method, "plugin"):
+                        getattr(plugin_handle, hook_method)()
 
     def is_plugin_enabled(self, plugin_id):
         """ Returns whether a plugin is currently enabled and loaded """
@@ -190,24 +216,40 @@ class PluginManager(RPObject):
                     # a shader reload when they change
                     setting.add_defines(plugin_id, setting_id, self._pipeline.stage_mgr.defines)
 
-    def _load_plugin(self, plugin_id):
-        """ Internal method to load a plugin """
-        plugin_class = "rpplugins.{}.plugin".format(plugin_id)
-        module = importlib.import_module(plugin_class)
-        instance = module.Plugin(self._pipeline)
-        if instance.native_only and not NATIVE_CXX_LOADED:
-            if plugin_id in self.enabled_plugins:
-                self.warn("Cannot load", plugin_id, "since it requires the C++ modules.")
-                return False
-        for required_plugin in instance.required_plugins:
+    def _check_requirements(self, plugin_id):
+        """ Internal method to check whether all requirements of a plugin are
+        met, without importing the plugin """
+        info = self.plugin_infos[plugin_id]
+        if info.native_only and not NATIVE_CXX_LOADED:
+            self.warn("Cannot load", plugin_id, "since it requires the C++ modules.")
+            return False
+        for required_plugin in info.required_plugins:
             if required_plugin not in self.enabled_plugins:
-                if plugin_id in self.enabled_plugins:
-                    self.warn("Cannot load {} since it requires {}".format(
-                        plugin_id, required_plugin))
-                    return False
-                break
+                self.warn("Cannot load {} since it requires {}".format(
+                    plugin_id, required_plugin))
+                return False
+        return True
+
+    def construct_plugin(self, plugin_id):
+        """ Imports the plugin module and constructs the plugin instance. This
+        is called by PluginInstances, use the instances attribute instead. """
+        start_time = time.time()
+        module = importlib.import_module("rpplugins.{}.plugin".format(plugin_id))
+        import_time = time.time()
+        instance = module.Plugin(self._pipeline)
+        end_time = time.time()
+        StartupTracer.add_span(plugin_id + ".import", "plugin", start_time, import_time)
+        StartupTracer.add_span(plugin_id + ".construct", "plugin", import_time, end_time)
+        self.plugin_timings[plugin_id] = (import_time - start_time, end_time - import_time)
         return instance
 
+    def log_plugin_timings(self):
+        """ Prints how long importing and constructing each plugin took """
+        self.debug("Plugin timings (import / construct):")
+        for plugin_id, (import_time, construct_time) in iteritems(self.plugin_timings):
+            self.debug("  {:<35} {:8.2f} ms {:8.2f} ms".format(
+                plugin_id, import_time * 1000.0, construct_time * 1000.0))
+
     def save_overrides(self, override_file):
         """ Saves all overrides to the given file """
         output = "\n# Render Pipeline Plugin Configuration\n"
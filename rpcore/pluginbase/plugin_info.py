@@ -0,0 +1,75 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import ast
+
+from direct.stdpy.file import open, join
+
+__all__ = ["PluginInfo"]
+
+
+class PluginInfo(object):  # pylint: disable=too-few-public-methods
+
+    """ Stores the metadata of a plugin, that is its name, author, description,
+    version and requirements. The metadata is read from the class attributes
+    of the Plugin class by parsing the plugin source instead of importing it,
+    so that disabled plugins and tools which only require the metadata never
+    import any stage code. """
+
+    _DEFAULTS = {
+        "name": "",
+        "author": "",
+        "description": "",
+        "version": "",
+        "native_only": False,
+        "required_plugins": (),
+    }
+
+    def __init__(self, plugin_id, plugin_pth):
+        """ Reads the metadata of the plugin located at the given path """
+        self.plugin_id = plugin_id
+        for key, default in self._DEFAULTS.items():
+            setattr(self, key, default)
+        self._parse(join(plugin_pth, "plugin.py"))
+
+    def _parse(self, filename):
+        """ Extracts the literal class attributes of the Plugin class """
+        with open(filename, "r") as handle:
+            tree = ast.parse(handle.read(), filename)
+
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef) or node.name != "Plugin":
+                continue
+            for stmt in node.body:
+                if not isinstance(stmt, ast.Assign) or len(stmt.targets) != 1:
+                    continue
+                target = stmt.targets[0]
+                if not isinstance(target, ast.Name) or target.id not in self._DEFAULTS:
+                    continue
+                try:
+                    setattr(self, target.id, ast.literal_eval(stmt.value))
+                except ValueError:
+                    pass
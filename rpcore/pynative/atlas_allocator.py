@@ -0,0 +1,245 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from __future__ import division
+
+import heapq
+
+from rplibs.six.moves import range  # pylint: disable=import-error
+
+
+def next_power_of_two(value):
+    result = 1
+    while result < value:
+        result *= 2
+    return result
+
+
+class QuadtreeAtlasAllocator(object):
+
+    """ Buddy allocator which recursively splits the atlas into four quadrants.
+    Since shadow map resolutions are powers of two, regions are allocated
+    from a free list per quadtree level, which is O(log n). Regions which are
+    no power of two get rounded up. Requires the amount of tiles to be a
+    power of two. """
+
+    def __init__(self, num_tiles):
+        assert num_tiles == next_power_of_two(num_tiles)
+        self._num_tiles = num_tiles
+        self._num_levels = num_tiles.bit_length()
+        self._free = [set() for i in range(self._num_levels)]  # pylint: disable=unused-variable
+        self._free_heaps = [[] for i in range(self._num_levels)]  # pylint: disable=unused-variable
+        self._allocated = {}
+        self._reserved_tiles = 0
+        self._add_free_block(0, 0, 0)
+
+    def _block_size(self, level):
+        return self._num_tiles >> level
+
+    def _add_free_block(self, level, x, y):
+        # Keep a heap per level as well, so blocks are handed out in a stable
+        # (bottom-left first) order. Blocks removed from the set are skipped lazily.
+        self._free[level].add((y, x))
+        heap = self._free_heaps[level]
+        if len(heap) > 4 * len(self._free[level]) + 64:
+            heap[:] = list(self._free[level])
+            heapq.heapify(heap)
+        heapq.heappush(heap, (y, x))
+
+    def _pop_free_block(self, level):
+        heap, free = self._free_heaps[level], self._free[level]
+        while heap:
+            block = heapq.heappop(heap)
+            if block in free:
+                free.remove(block)
+                return block[1], block[0]
+        return None
+
+    def allocate(self, width, height):
+        block_size = next_power_of_two(max(width, height))
+        if block_size > self._num_tiles:
+            return None
+        level = self._num_levels - block_size.bit_length()
+
+        # Find the smallest free block which is big enough
+        source_level = level
+        while source_level >= 0 and not self._free[source_level]:
+            source_level -= 1
+        if source_level < 0:
+            return None
+
+        x, y = self._pop_free_block(source_level)
+
+        # Split the block until it has the requested size, the upper-left
+        # quadrant is used and the other quadrants are free
+        while source_level < level:
+            source_level += 1
+            half = self._block_size(source_level)
+            self._add_free_block(source_level, x + half, y)
+            self._add_free_block(source_level, x, y + half)
+            self._add_free_block(source_level, x + half, y + half)
+
+        self._allocated[(x, y)] = level
+        self._reserved_tiles += block_size ** 2
+        return x, y
+
+    def free(self, x, y):
+        level = self._allocated.pop((x, y))
+        self._reserved_tiles -= self._block_size(level) ** 2
+
+        # Merge the block with its buddies as long as all of them are free
+        while level > 0:
+            parent_size = self._block_size(level - 1)
+            half = parent_size // 2
+            parent_x, parent_y = x - x % parent_size, y - y % parent_size
+            buddies = [(parent_y + dy, parent_x + dx)
+                       for dx, dy in ((0, 0), (half, 0), (0, half), (half, half))
+                       if (parent_x + dx, parent_y + dy) != (x, y)]
+            if not all(buddy in self._free[level] for buddy in buddies):
+                break
+            for buddy in buddies:
+                self._free[level].remove(buddy)
+            x, y, level = parent_x, parent_y, level - 1
+
+        self._add_free_block(level, x, y)
+
+    def get_num_reserved_tiles(self):
+        return self._reserved_tiles
+
+    def get_largest_free_region(self):
+        for level in range(self._num_levels):
+            if self._free[level]:
+                return self._block_size(level) ** 2
+        return 0
+
+
+class ShelfAtlasAllocator(object):
+
+    """ Fallback allocator for atlases whose amount of tiles is no power of two.
+    The atlas is divided into horizontal shelves, each holding regions of the
+    same height. Each shelf keeps a list of free spans, and shelves which get
+    empty are returned to the free rows again. Allocation cost only depends on
+    the amount of shelves, which is bounded by the atlas height. """
+
+    def __init__(self, num_tiles):
+        self._num_tiles = num_tiles
+        self._free_rows = [[0, num_tiles]]
+        self._shelves = {}
+        self._allocated = {}
+        self._reserved_tiles = 0
+
+    def _take_span(self, spans, width):
+        for i, (span_x, span_w) in enumerate(spans):
+            if span_w >= width:
+                if span_w == width:
+                    del spans[i]
+                else:
+                    spans[i] = [span_x + width, span_w - width]
+                return span_x
+        return None
+
+    def _open_shelf(self, height):
+        for i, (row_y, row_h) in enumerate(self._free_rows):
+            if row_h >= height:
+                if row_h == height:
+                    del self._free_rows[i]
+                else:
+                    self._free_rows[i] = [row_y + height, row_h - height]
+                self._shelves[row_y] = {"height": height, "spans": [[0, self._num_tiles]],
+                                        "num_regions": 0}
+                return row_y
+        return None
+
+    def allocate(self, width, height):
+        if width > self._num_tiles or height > self._num_tiles:
+            return None
+
+        # Prefer shelves which exactly match the height, then open a new shelf,
+        # and only as last resort use a taller shelf
+        result = self._allocate_in_shelves(width, lambda shelf_h: shelf_h == height)
+        if result is not None:
+            return result
+
+        shelf_y = self._open_shelf(height)
+        if shelf_y is not None:
+            x = self._take_span(self._shelves[shelf_y]["spans"], width)
+            return self._commit(x, shelf_y, width)
+
+        return self._allocate_in_shelves(width, lambda shelf_h: shelf_h > height)
+
+    def _allocate_in_shelves(self, width, height_filter):
+        candidates = sorted(
+            (shelf["height"], shelf_y) for shelf_y, shelf in self._shelves.items()
+            if height_filter(shelf["height"]))
+        for _, shelf_y in candidates:
+            x = self._take_span(self._shelves[shelf_y]["spans"], width)
+            if x is not None:
+                return self._commit(x, shelf_y, width)
+        return None
+
+    def _commit(self, x, shelf_y, width):
+        shelf = self._shelves[shelf_y]
+        shelf["num_regions"] += 1
+        self._allocated[(x, shelf_y)] = width
+        self._reserved_tiles += width * shelf["height"]
+        return x, shelf_y
+
+    def _insert_span(self, spans, x, width):
+        spans.append([x, width])
+        spans.sort()
+        merged = [spans[0]]
+        for span in spans[1:]:
+            if merged[-1][0] + merged[-1][1] == span[0]:
+                merged[-1][1] += span[1]
+            else:
+                merged.append(span)
+        spans[:] = merged
+
+    def free(self, x, y):
+        width = self._allocated.pop((x, y))
+        shelf = self._shelves[y]
+        self._reserved_tiles -= width * shelf["height"]
+        self._insert_span(shelf["spans"], x, width)
+        shelf["num_regions"] -= 1
+        if shelf["num_regions"] == 0:
+            del self._shelves[y]
+            self._insert_span(self._free_rows, y, shelf["height"])
+
+    def get_num_reserved_tiles(self):
+        return self._reserved_tiles
+
+    def get_largest_free_region(self):
+        largest = max([row_h for row_y, row_h in self._free_rows] or [0]) * self._num_tiles
+        for shelf in self._shelves.values():
+            for span_x, span_w in shelf["spans"]:  # pylint: disable=unused-variable
+                largest = max(largest, span_w * shelf["height"])
+        return largest
+
+
+ATLAS_ALLOCATORS = {
+    "quadtree": QuadtreeAtlasAllocator,
+    "shelf": ShelfAtlasAllocator,
+}
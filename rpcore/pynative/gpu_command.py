@@ -29,29 +29,73 @@ from rplibs.six.moves import range  # pylint: disable=import-error
 
 import struct
 
+# Maximum size of a command, in blocks of 32 floats
+MAX_COMMAND_BLOCKS = 32
+
 
 class GPUCommand(object):
 
     """ Please refer to the native C++ implementation for docstrings and comments.
-    This is just the python implementation, which does not contain documentation! """
+    This is just the python implementation, which does not contain documentation!
+
+    Range commands like CMD_store_light_range may span multiple consecutive
+    blocks of 32 floats, see get_num_blocks and create_range_command. """
 
     CMD_invalid = 0
     CMD_store_light = 1
     CMD_remove_light = 2
     CMD_store_source = 3
     CMD_remove_sources = 4
+    CMD_store_light_range = 5
+    CMD_store_source_range = 6
+
+    # Size of the records stored by the range commands, in floats
+    LIGHT_RECORD_FLOATS = 16
+    SOURCE_RECORD_FLOATS = 20
+
+    # Range commands start with the command type, base slot and record count
+    RANGE_HEADER_FLOATS = 3
 
-    def __init__(self, command_type):
+    def __init__(self, command_type, num_blocks=1):
+        assert 1 <= num_blocks <= MAX_COMMAND_BLOCKS
         self._command_type = command_type
         self._current_index = 0
-        self._data = [0.0] * 32
+        self._data = [0.0] * (32 * num_blocks)
         self.push_int(command_type)
 
+    @classmethod
+    def get_max_range_records(cls, record_floats):
+        return (MAX_COMMAND_BLOCKS * 32 - cls.RANGE_HEADER_FLOATS) // record_floats
+
+    @classmethod
+    def create_range_command(cls, command_type, record_floats, objects):
+        """ Creates a command storing the records of objects in consecutive
+        slots, starting at the slot of the first object. Each record is written
+        with write_to_command of the object and padded to record_floats. """
+        assert 0 < len(objects) <= cls.get_max_range_records(record_floats)
+        num_floats = cls.RANGE_HEADER_FLOATS + len(objects) * record_floats
+        cmd = cls(command_type, (num_floats + 31) // 32)
+        cmd.push_int(objects[0].get_slot())
+        cmd.push_int(len(objects))
+        for i, obj in enumerate(objects):
+            obj.write_to_command(cmd)
+            cmd.skip_to(cls.RANGE_HEADER_FLOATS + (i + 1) * record_floats)
+        return cmd
+
+    def get_num_blocks(self):
+        return len(self._data) // 32
+
+    def skip_to(self, index):
+        if index > len(self._data):
+            print("GPUCommand: out of bounds!")
+            return
+        self._current_index = max(self._current_index, index)
+
     def push_int(self, value):
         self.push_float(float(value))
 
     def push_float(self, value):
-        if self._current_index >= 32:
+        if self._current_index >= len(self._data):
             print("GPUCommand: out of bounds!")
             return
         self._data[self._current_index] = float(value)
@@ -76,9 +120,9 @@ class GPUCommand(object):
         return False
 
     def write_to(self, dest, command_index):
-        data = struct.pack("f" * 32, *self._data)
+        data = struct.pack("f" * len(self._data), *self._data)
         offset = command_index * 32 * 4
-        dest.set_subdata(offset, 32 * 4, data)
+        dest.set_subdata(offset, len(data), data)
 
     def write(self, out=None):  # pylint: disable=unused-argument
         print("GPUCommand(type=", self._command_type, "size=", self._current_index, ")")
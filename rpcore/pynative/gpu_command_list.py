@@ -24,27 +24,101 @@ THE SOFTWARE.
 
 """
 
+import struct
+from collections import deque
+
+from rplibs.six.moves import range  # pylint: disable=import-error
+
+# Each command consists of 32 floats
+COMMAND_FLOATS = 32
+COMMAND_BYTES = COMMAND_FLOATS * 4
+COMMAND_STRUCT = struct.Struct("{}f".format(COMMAND_FLOATS))
+
 
 class GPUCommandList(object):
 
     """ Please refer to the native C++ implementation for docstrings and comments.
-    This is just the python implementation, which does not contain documentation! """
+    This is just the python implementation, which does not contain documentation!
+
+    Commands are encoded into a preallocated float32 ring buffer as soon as they
+    are added, and the commands of a frame are copied to the command queue
+    with one (or two, if the ring wraps around) contiguous copies.
+
+    Commands spanning multiple blocks are never split between two frames.
+    The amount of commands is counted in blocks, which matches the
+    amount of commands processed by the command queue shader. """
+
+    def __init__(self, capacity=4096):
+        self._capacity = capacity
+        self._buffer = bytearray(capacity * COMMAND_BYTES)
+        self._first = 0
+        self._num_commands = 0
 
-    def __init__(self):
-        self._commands = []
+        # Total amount of blocks written so far, and (first block, size) of
+        # all queued commands with more than one block
+        self._num_written = 0
+        self._multi_block_commands = deque()
 
     def add_command(self, cmd):
-        self._commands.append(cmd)
+        data = cmd._data  # noqa # pylint: disable=protected-access
+        num_blocks = len(data) // COMMAND_FLOATS
+        while self._num_commands + num_blocks > self._capacity:
+            self._grow()
+        index = (self._first + self._num_commands) % self._capacity
+
+        if num_blocks == 1:
+            COMMAND_STRUCT.pack_into(self._buffer, index * COMMAND_BYTES, *data)
+        else:
+            self._multi_block_commands.append(
+                (self._num_written + self._num_commands, num_blocks))
+            for block in range(num_blocks):
+                COMMAND_STRUCT.pack_into(
+                    self._buffer, ((index + block) % self._capacity) * COMMAND_BYTES,
+                    *data[block * COMMAND_FLOATS:(block + 1) * COMMAND_FLOATS])
+        self._num_commands += num_blocks
+
+    def _grow(self):
+        # Linearize the ring, so the oldest command is at the start again
+        old_buffer = self._buffer
+        split = self._first * COMMAND_BYTES
+        self._buffer = old_buffer[split:] + old_buffer[:split]
+        self._buffer.extend(bytearray(len(old_buffer)))
+        self._first = 0
+        self._capacity *= 2
 
     @property
     def num_commands(self):
-        return len(self._commands)
+        return self._num_commands
 
     def write_commands_to(self, dest, limit=32):
-        num_commands_written = 0
+        num_commands = min(limit, self._num_commands)
+
+        # Stop before a command which does not fit completely
+        end = self._num_written + num_commands
+        multi_block_commands = self._multi_block_commands
+        while multi_block_commands and multi_block_commands[0][0] < end:
+            first_block, num_blocks = multi_block_commands[0]
+            if first_block + num_blocks > end:
+                num_commands = first_block - self._num_written
+                break
+            multi_block_commands.popleft()
+
+        if num_commands <= 0:
+            return 0
+
+        source = memoryview(self._buffer)
+        target = memoryview(dest)
+        num_first = min(num_commands, self._capacity - self._first)
+        start = self._first * COMMAND_BYTES
+        target[0:num_first * COMMAND_BYTES] = source[start:start + num_first * COMMAND_BYTES]
 
-        while num_commands_written < limit and self._commands:
-            self._commands.pop(0).write_to(dest, num_commands_written)
-            num_commands_written += 1
+        # The ring wrapped around, copy the remaining commands from its start
+        num_wrapped = num_commands - num_first
+        if num_wrapped > 0:
+            target[num_first * COMMAND_BYTES:num_commands * COMMAND_BYTES] = \
+                source[0:num_wrapped * COMMAND_BYTES]
 
-        return num_commands_written
+        self._first = (self._first + num_commands) % self._capacity
+        self._num_commands -= num_commands
+        self._num_written += num_commands
+        return num_commands
@@ -24,16 +24,27 @@ THE SOFTWARE.
 
 """
 
+from __future__ import division
+
 from rplibs.six.moves import range  # pylint: disable=import-error
 
 import math
 from panda3d.core import PNMImage
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class IESDataset(object):
 
     """ Please refer to the native C++ implementation for docstrings and comments.
-    This is just the python implementation, which does not contain documentation! """
+    This is just the python implementation, which does not contain documentation!
+
+    If numpy is available, the whole LUT is generated at once using searchsorted
+    and linear interpolation in both the vertical and horizontal angles.
+    Otherwise, the LUT is generated per texel and horizontal angles are ignored. """
 
     def __init__(self):
         self._vertical_angles = None
@@ -50,6 +61,52 @@ class IESDataset(object):
         self._candela_values = candela_values
 
     def generate_dataset_texture_into(self, dest_tex, layer_index):
+        if numpy is None:
+            self._generate_dataset_texture_per_texel(dest_tex, layer_index)
+            return
+
+        lut = self.generate_dataset_lut(dest_tex.get_x_size(), dest_tex.get_y_size())
+        write_lut_into(dest_tex, layer_index, lut)
+
+    def generate_dataset_lut(self, resolution_vertical, resolution_horizontal):
+        """ Generates the LUT as float32 array of the shape (resolution_horizontal,
+        resolution_vertical), in the row order of the texture ram image. The
+        x-axis refers to the vertical angle, the y-axis to the horizontal angle. """
+        vertical_angles = numpy.array(self._vertical_angles, dtype=numpy.float64)
+        horizontal_angles = numpy.array(self._horizontal_angles, dtype=numpy.float64)
+        candela_values = numpy.array(self._candela_values, dtype=numpy.float64).reshape(
+            len(horizontal_angles), len(vertical_angles))
+
+        vert = numpy.arange(resolution_vertical) / (resolution_vertical - 1.0)
+        vert = numpy.cos(vert * math.pi) * 90.0 + 90.0
+        horiz = numpy.arange(resolution_horizontal) / (resolution_horizontal - 1.0) * 360.0
+
+        # Interpolate the vertical angles for each horizontal angle of the dataset
+        indices, lerp, valid = _find_enclosing(vertical_angles, vert, "right")
+        valid &= (vert >= 0.0) & (vert <= vertical_angles[-1])
+        columns = (candela_values[:, indices] * lerp +
+                   candela_values[:, indices - 1] * (1.0 - lerp))
+        columns[:, ~valid] = 0.0
+
+        if len(horizontal_angles) == 1:
+            lut = numpy.repeat(columns, resolution_horizontal, axis=0)
+        else:
+            # Mirror the horizontal angles at the last angle, most profiles only
+            # contain the values from 0 .. 180 or 0 .. 90 degrees
+            max_angle = horizontal_angles[-1]
+            horiz = numpy.fmod(horiz, 2.0 * max_angle)
+            horiz = numpy.where(horiz > max_angle, 2.0 * max_angle - horiz, horiz)
+
+            indices, lerp, valid = _find_enclosing(horizontal_angles, horiz, "left")
+            lerp = lerp[:, None]
+            lut = columns[indices] * lerp + columns[indices - 1] * (1.0 - lerp)
+            lut[~valid] = 0.0
+
+        # The per texel path writes the LUT via a PNMImage, which gets flipped
+        # when loading it into the texture
+        return numpy.clip(lut[::-1], 0.0, 1.0).astype(numpy.float32)
+
+    def _generate_dataset_texture_per_texel(self, dest_tex, layer_index):
         resolution_vertical = dest_tex.get_y_size()
         resolution_horizontal = dest_tex.get_x_size()
 
@@ -68,7 +125,7 @@ class IESDataset(object):
     def get_candela_value(self, vertical_angle, horizontal_angle):  # noqa # pylint: disable=unused-argument
         # NOTICE: Since python is slower, we always only assume a dataset without
         # horizontal angles. This still produces convincing results, but does
-        # generate much faster.
+        # generate much faster. The numpy path handles horizontal angles.
         return self.get_vertical_candela_value(0, vertical_angle)
 
     def get_candela_value_from_index(self, vertical_angle_idx, horizontal_angle_idx):
@@ -95,3 +152,28 @@ class IESDataset(object):
                 assert lerp >= 0.0 and lerp <= 1.0
                 return curr_value * lerp + prev_value * (1.0 - lerp)
         return 0.0
+
+
+def _find_enclosing(angles, samples, side):
+    """ Returns for each sample the index of the upper enclosing angle, the
+    interpolation factor between both angles, and whether an enclosing angle
+    exists, matching the search of the C++ implementation """
+    if len(angles) < 2:
+        zeros = numpy.zeros(len(samples), dtype=numpy.intp)
+        return zeros, numpy.zeros(len(samples)), numpy.zeros(len(samples), dtype=bool)
+    indices = numpy.searchsorted(angles, samples, side=side)
+    valid = indices < len(angles)
+    indices = numpy.clip(indices, 1, len(angles) - 1)
+    prev_angles = angles[indices - 1]
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        lerp = (samples - prev_angles) / (angles[indices] - prev_angles)
+    valid &= numpy.isfinite(lerp)
+    return indices, numpy.where(valid, lerp, 0.0), valid
+
+
+def write_lut_into(dest_tex, layer_index, lut):
+    """ Copies a LUT generated by IESDataset.generate_dataset_lut into the given
+    layer of a float texture, by writing directly into its ram image """
+    layer_size = dest_tex.get_x_size() * dest_tex.get_y_size()
+    data = numpy.frombuffer(memoryview(dest_tex.modify_ram_image()), dtype=numpy.float32)
+    data[layer_index * layer_size:(layer_index + 1) * layer_size] = lut.ravel()
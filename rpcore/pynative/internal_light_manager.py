@@ -24,29 +24,57 @@ THE SOFTWARE.
 
 """
 from __future__ import print_function
+
+import heapq
+
 from rplibs.six.moves import range  # pylint: disable=import-error
 
 from panda3d.core import Vec3
 
 from rpcore.pynative.pointer_slot_storage import PointerSlotStorage
 from rpcore.pynative.gpu_command import GPUCommand
+from rpcore.pynative.shadow_source_grid import ShadowSourceGrid
 
 MAX_LIGHT_COUNT = 65535
 MAX_SHADOW_SOURCES = 2048
 
 
+def split_into_ranges(objects, max_length):
+    """ Sorts objects by their slot, and splits them into lists of objects in
+    consecutive slots with at most max_length entries """
+    objects = sorted(objects, key=lambda obj: obj.get_slot())
+    range_start = 0
+    for i in range(1, len(objects) + 1):
+        if (i < len(objects) and i - range_start < max_length and
+                objects[i].get_slot() == objects[i - 1].get_slot() + 1):
+            continue
+        yield objects[range_start:i]
+        range_start = i
+
+
 class InternalLightManager(object):
 
     """ Please refer to the native C++ implementation for docstrings and comments.
-    This is just the python implementation, which does not contain documentation! """
+    This is just the python implementation, which does not contain documentation!
+
+    Unlike the C++ implementation, shadow sources are kept in a uniform grid,
+    so that only the sources near the camera have to be checked each frame.
+    Also, only the lights in the dirty set are processed, instead of checking
+    all lights each frame, and lights or shadow sources in consecutive slots
+    are uploaded with a single range command. """
 
     def __init__(self):
         self._lights = PointerSlotStorage(MAX_LIGHT_COUNT)
         self._shadow_sources = PointerSlotStorage(MAX_SHADOW_SOURCES)
         self._cmd_list = None
+        self._light_storage = None
         self._shadow_manager = None
         self._camera_pos = Vec3(0)
         self._shadow_update_distance = 100.0
+        self._dirty_lights = set()
+        self._num_updated_lights = 0
+        self._source_grid = ShadowSourceGrid(self._shadow_update_distance)
+        self._sources_with_region = set()
 
     def get_max_light_index(self):
         return self._lights.get_max_index()
@@ -63,6 +91,11 @@ class InternalLightManager(object):
 
     num_shadow_sources = property(get_num_shadow_sources)
 
+    def get_num_updated_lights(self):
+        return self._num_updated_lights
+
+    num_updated_lights = property(get_num_updated_lights)
+
     def set_shadow_manager(self, shadow_manager):
         self._shadow_manager = shadow_manager
 
@@ -74,11 +107,20 @@ class InternalLightManager(object):
     def set_command_list(self, cmd_list):
         self._cmd_list = cmd_list
 
+    def set_light_storage(self, light_storage):
+        self._light_storage = light_storage
+
+    def get_light_storage(self):
+        return self._light_storage
+
+    light_storage = property(get_light_storage, set_light_storage)
+
     def set_camera_pos(self, pos):
         self._camera_pos = pos
 
     def set_shadow_update_distance(self, dist):
         self._shadow_update_distance = dist
+        self._source_grid.cell_size = max(1.0, dist)
 
     def add_light(self, light):
         if light.has_slot():
@@ -97,6 +139,53 @@ class InternalLightManager(object):
             self.setup_shadows(light)
 
         self.gpu_update_light(light)
+        light.set_dirty_set(self._dirty_lights)
+
+    def add_lights(self, lights):
+        lights_to_add = []
+        for light in lights:
+            if light.has_slot():
+                print("ERROR: Cannot add light since it already has a slot!")
+            else:
+                lights_to_add.append(light)
+
+        if not lights_to_add:
+            return
+
+        base_slot = self._lights.find_consecutive_slots(len(lights_to_add))
+        if base_slot < 0:
+            # Not enough consecutive slots, add the lights one by one
+            for light in lights_to_add:
+                self.add_light(light)
+            return
+
+        for i, light in enumerate(lights_to_add):
+            light.assign_slot(base_slot + i)
+            self._lights.reserve_slot(base_slot + i, light)
+            if light.get_casts_shadows():
+                self.setup_shadows(light)
+
+        self.gpu_update_lights(lights_to_add)
+        for light in lights_to_add:
+            light.set_dirty_set(self._dirty_lights)
+
+    def remove_lights(self, lights):
+        for light in lights:
+            self.remove_light(light)
+
+    def update_lights_bulk(self, lights):
+        lights_to_update = []
+        for light in lights:
+            if not light.has_slot():
+                print("ERROR: Cannot update light since it was not attached!")
+                continue
+            if light.casts_shadows:
+                light.update_shadow_sources()
+                for i in range(light.get_num_shadow_sources()):
+                    self._source_grid.update(light.get_shadow_source(i))
+            self._dirty_lights.discard(light)
+            lights_to_update.append(light)
+        self.gpu_update_lights(lights_to_update)
 
     def setup_shadows(self, light):
         light.init_shadow_sources()
@@ -114,6 +203,7 @@ class InternalLightManager(object):
             slot = base_slot + i
             self._shadow_sources.reserve_slot(slot, source)
             source.set_slot(slot)
+            self._source_grid.update(source)
 
     def remove_light(self, light):
         assert light is not None
@@ -123,6 +213,8 @@ class InternalLightManager(object):
 
         self._lights.free_slot(light.get_slot())
         self.gpu_remove_light(light)
+        light.set_dirty_set(None)
+        self._dirty_lights.discard(light)
         light.remove_slot()
 
         if light.get_casts_shadows():
@@ -134,6 +226,8 @@ class InternalLightManager(object):
                 if source.has_region():
                     self._shadow_manager.get_atlas().free_region(source.get_region())
                     source.clear_region()
+                self._source_grid.remove(source)
+                self._sources_with_region.discard(source)
 
             self.gpu_remove_consecutive_sources(
                 light.get_shadow_source(0), light.get_num_shadow_sources())
@@ -147,64 +241,106 @@ class InternalLightManager(object):
         self._cmd_list.add_command(cmd_remove)
 
     def gpu_remove_light(self, light):
+        if self._light_storage is not None:
+            self._light_storage.remove_light(light.get_slot())
+            return
+
         cmd_remove = GPUCommand(GPUCommand.CMD_remove_light)
         cmd_remove.push_int(light.get_slot())
         self._cmd_list.add_command(cmd_remove)
 
     def gpu_update_light(self, light):
+        if self._light_storage is not None:
+            self._light_storage.store_light(light)
+            light.set_needs_update(False)
+            return
+
         cmd_update = GPUCommand(GPUCommand.CMD_store_light)
         cmd_update.push_int(light.get_slot())
         light.write_to_command(cmd_update)
         light.set_needs_update(False)
         self._cmd_list.add_command(cmd_update)
 
+    def gpu_update_lights(self, lights):
+        if self._light_storage is not None:
+            for light in lights:
+                self.gpu_update_light(light)
+            return
+
+        max_length = GPUCommand.get_max_range_records(GPUCommand.LIGHT_RECORD_FLOATS)
+        for light_range in split_into_ranges(lights, max_length):
+            if len(light_range) == 1:
+                self.gpu_update_light(light_range[0])
+                continue
+            self._cmd_list.add_command(GPUCommand.create_range_command(
+                GPUCommand.CMD_store_light_range, GPUCommand.LIGHT_RECORD_FLOATS,
+                light_range))
+            for light in light_range:
+                light.set_needs_update(False)
+
     def gpu_update_source(self, source):
         cmd_update = GPUCommand(GPUCommand.CMD_store_source)
         cmd_update.push_int(source.get_slot())
         source.write_to_command(cmd_update)
         self._cmd_list.add_command(cmd_update)
 
+    def gpu_update_sources(self, sources):
+        max_length = GPUCommand.get_max_range_records(GPUCommand.SOURCE_RECORD_FLOATS)
+        for source_range in split_into_ranges(sources, max_length):
+            if len(source_range) == 1:
+                self.gpu_update_source(source_range[0])
+            else:
+                self._cmd_list.add_command(GPUCommand.create_range_command(
+                    GPUCommand.CMD_store_source_range, GPUCommand.SOURCE_RECORD_FLOATS,
+                    source_range))
+
     def update_lights(self):
-        for light in self._lights.begin():
-            if light.get_needs_update():
-                if light.casts_shadows:
-                    light.update_shadow_sources()
-            self.gpu_update_light(light)
+        # Process the lights in slot order, so the written data is mostly linear
+        dirty_lights = sorted(self._dirty_lights, key=lambda light: light.get_slot())
+        self._dirty_lights.clear()
+        self._num_updated_lights = len(dirty_lights)
+
+        for light in dirty_lights:
+            if light.casts_shadows:
+                light.update_shadow_sources()
+                for i in range(light.get_num_shadow_sources()):
+                    self._source_grid.update(light.get_shadow_source(i))
+        self.gpu_update_lights(dirty_lights)
 
     def update_shadow_sources(self):
-        sources_to_update = []
-
-        for source in self._shadow_sources.begin():
-            # if source and source.get_needs_update():
-                # sources_to_update.append(source)
-            if source:
-                bounds = source.get_bounds()
-                distance_to_camera = (self._camera_pos - bounds.get_center()) - bounds.get_radius()
-                if distance_to_camera < self._shadow_update_distance:
-                    sources_to_update.append(source)
-                else:
-                    if source.has_region():
-                        self._shadow_manager.get_atlas().free_region(source.get_region())
-                        source.clear_region()
-
-        def get_source_score(source):
-            dist = (source.get_bounds().get_center() - self._camera_pos).length()
-            return -dist + (10**10 if source.has_region() else 0)
-
-        sorted_sources = list(sorted(sources_to_update, key=get_source_score))
+        sources_in_range = self._source_grid.query(
+            self._camera_pos, self._shadow_update_distance)
 
         atlas = self._shadow_manager.get_atlas()
-        update_slots = min(
-            len(sorted_sources),
-            self._shadow_manager.get_num_update_slots_left())
 
-        for i in range(update_slots):
-            if sorted_sources[i].has_region():
-                atlas.free_region(sorted_sources[i].get_region())
+        # Free the regions of sources which left the update radius
+        in_range = set(source for _, source in sources_in_range)
+        for source in list(self._sources_with_region):
+            if source not in in_range:
+                atlas.free_region(source.get_region())
+                source.clear_region()
+                self._sources_with_region.discard(source)
 
-        for i in range(update_slots):
-            source = sorted_sources[i]
+        update_slots = self._shadow_manager.get_num_update_slots_left()
+        if update_slots <= 0:
+            return
 
+        # Sources without a region come first, then the ones closest to the camera
+        candidates = [(source.has_region(), dist, source)
+                      for dist, source in sources_in_range if source.get_needs_update()]
+        sorted_sources = [entry[2] for entry in heapq.nsmallest(
+            update_slots, candidates, key=lambda entry: entry[:2])]
+
+        # Sources which do not get updated due to a failed update keep no
+        # region, otherwise it would be freed again later on
+        for source in sorted_sources:
+            if source.has_region():
+                atlas.free_region(source.get_region())
+                source.clear_region()
+                self._sources_with_region.discard(source)
+
+        updated_sources = []
+        for source in sorted_sources:
             if not self._shadow_manager.add_update(source):
                 print("ERROR: Shadow manager ensured update slot, but slot is taken!")
                 break
@@ -214,7 +350,13 @@ class InternalLightManager(object):
             new_uv_region = atlas.region_to_uv(new_region)
             source.set_region(new_region, new_uv_region)
             source.set_needs_update(False)
-            self.gpu_update_source(source)
+            if source.has_region():
+                self._sources_with_region.add(source)
+            else:
+                self._sources_with_region.discard(source)
+            updated_sources.append(source)
+
+        self.gpu_update_sources(updated_sources)
 
     def update(self):
         self.update_lights()
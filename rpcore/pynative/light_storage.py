@@ -0,0 +1,162 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from __future__ import division
+
+import numpy
+
+from rplibs.six.moves import range  # pylint: disable=import-error
+
+from rpcore.pynative.gpu_command import GPUCommand
+
+
+class NumpyLightStorage(object):
+
+    """ Optional storage for the light data when using the python implementation.
+    Instead of emitting a GPUCommand for every changed light, all light data is
+    kept in contiguous arrays indexed by the light slot. Once per frame, the
+    records of all changed lights are packed and emitted as range commands.
+    Only if a lot of lights changed and no range commands are queued anymore,
+    the records are copied into the ram image of the LightData buffer with a
+    single vectorized copy instead, since that makes Panda re-upload the
+    whole buffer.
+
+    The record layout matches the data written by the CMD_store_light command,
+    see RPLight.write_to_command. """
+
+    # Amount of floats per light, that is 4 texels of the LightData buffer
+    RECORD_SIZE = 16
+
+    # Maximum amount of changed lights which get uploaded with commands
+    MAX_COMMAND_LIGHTS = 256
+
+    def __init__(self, max_lights):
+        self._max_lights = max_lights
+        self.light_type = numpy.zeros(max_lights, dtype=numpy.float32)
+        self.ies_profile = numpy.zeros(max_lights, dtype=numpy.float32)
+        self.shadow_source = numpy.zeros(max_lights, dtype=numpy.float32)
+        self.position = numpy.zeros((max_lights, 3), dtype=numpy.float32)
+        self.color = numpy.zeros((max_lights, 3), dtype=numpy.float32)
+        self.radius = numpy.zeros(max_lights, dtype=numpy.float32)
+
+        # Light type specific data, e.g. the inner radius for point lights or
+        # the cosine of the fov and the direction for spot lights
+        self.params = numpy.zeros((max_lights, 4), dtype=numpy.float32)
+
+        self._dirty_slots = set()
+
+        # Highest slot which was ever written, all slots above are still zero
+        self._max_written_slot = -1
+
+        # Whether range commands were written which might not be processed yet
+        self._commands_pending = False
+
+    @property
+    def num_dirty_lights(self):
+        """ Returns the amount of lights which will get written on the next
+        call to write_dirty_to """
+        return len(self._dirty_slots)
+
+    def store_light(self, light):
+        """ Stores the data of an attached light and marks it as changed """
+        slot = light.get_slot()
+        light.write_to_storage(self, slot)
+        self._dirty_slots.add(slot)
+        self._max_written_slot = max(self._max_written_slot, slot)
+
+    def remove_light(self, slot):
+        """ Clears the data of a slot, which indicates a null light """
+        for array in (self.light_type, self.ies_profile, self.shadow_source,
+                      self.position, self.color, self.radius, self.params):
+            array[slot] = 0
+        self._dirty_slots.add(slot)
+
+    def pack(self, slots):
+        """ Packs the records of the given slots, which can either be an index
+        array or a slice. Returns an array of shape (n, RECORD_SIZE). """
+        light_type = self.light_type[slots]
+        records = numpy.zeros((len(light_type), self.RECORD_SIZE), dtype=numpy.float32)
+        records[:, 0] = light_type
+        records[:, 1] = self.ies_profile[slots]
+        records[:, 2] = self.shadow_source[slots]
+        records[:, 3:6] = self.position[slots]
+        records[:, 6:9] = self.color[slots]
+        records[:, 9] = self.radius[slots]
+        records[:, 10:14] = self.params[slots]
+        return records
+
+    def write_dirty_to(self, dest_tex, cmd_list):
+        """ Uploads the records of all changed lights. Small amounts of changes
+        are written to the given command list, otherwise all records are copied
+        to the ram image of the given buffer texture, which should have the
+        RGBA16 or RGBA32 format """
+        if cmd_list.num_commands == 0:
+            self._commands_pending = False
+
+        if not self._dirty_slots:
+            return 0
+
+        # The command queue only processes a limited amount of commands per
+        # frame. Commands which are still queued would overwrite the data of
+        # a ram image upload once processed, so keep using commands until
+        # the command list is empty.
+        num_dirty = len(self._dirty_slots)
+        if num_dirty <= self.MAX_COMMAND_LIGHTS or self._commands_pending:
+            self._write_commands(sorted(self._dirty_slots), cmd_list)
+            self._commands_pending = True
+        else:
+            self._write_ram_image(dest_tex)
+        self._dirty_slots.clear()
+        return num_dirty
+
+    def _write_commands(self, slots, cmd_list):
+        """ Emits range commands for the given sorted slots """
+        records = self.pack(numpy.array(slots, dtype=numpy.int64))
+        max_length = GPUCommand.get_max_range_records(self.RECORD_SIZE)
+        range_start = 0
+        for i in range(1, len(slots) + 1):
+            if (i < len(slots) and i - range_start < max_length and
+                    slots[i] == slots[i - 1] + 1):
+                continue
+            num_floats = GPUCommand.RANGE_HEADER_FLOATS + (i - range_start) * self.RECORD_SIZE
+            cmd = GPUCommand(GPUCommand.CMD_store_light_range, (num_floats + 31) // 32)
+            cmd.push_int(slots[range_start])
+            cmd.push_int(i - range_start)
+            for value in records[range_start:i].flat:
+                cmd.push_float(value)
+            cmd_list.add_command(cmd)
+            range_start = i
+
+    def _write_ram_image(self, dest_tex):
+        """ Copies the records of all used slots to the ram image. Since the
+        whole buffer gets uploaded, this also has to include the slots which
+        were previously written with commands. """
+        slots = slice(0, self._max_written_slot + 1)
+
+        # Panda stores the texels as BGRA in the ram image
+        records = self.pack(slots).reshape(-1, 4, 4)[:, :, (2, 1, 0, 3)]
+        ram_image = numpy.frombuffer(memoryview(dest_tex.modify_ram_image()), dtype=numpy.float32)
+        ram_image.reshape(-1, 4, 4)[slots] = records
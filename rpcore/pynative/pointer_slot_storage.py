@@ -30,12 +30,56 @@ from rplibs.six.moves import range  # pylint: disable=import-error
 class PointerSlotStorage(object):
 
     """ Please refer to the native C++ implementation for docstrings and comments.
-    This is just the python implementation, which does not contain documentation! """
+    This is just the python implementation, which does not contain documentation!
+
+    Unlike the C++ version, free slots are not found by scanning the data.
+    Instead, a segment tree over the slots stores the longest run of free
+    slots, as well as the free runs at the start and end of each node. This
+    makes find_slot and find_consecutive_slots O(log n), while still returning
+    the same (lowest) slot as a linear first-fit scan would. """
 
     def __init__(self, max_size):
         self._data = [None] * max_size
+        self._occupied = {}
         self._max_index = 0
         self._num_entries = 0
+        self._size = max_size
+        self._init_free_runs()
+
+    def _init_free_runs(self):
+        self._num_leaves = 1
+        while self._num_leaves < self._size:
+            self._num_leaves *= 2
+
+        self._best = [0] * self._num_leaves + [1] * self._num_leaves
+        self._prefix = list(self._best)
+        self._suffix = list(self._best)
+
+        node_size = 1
+        first = self._num_leaves
+        while first > 1:
+            for node in range(first // 2, first):
+                self._combine(node, node_size)
+            node_size *= 2
+            first //= 2
+
+    def _combine(self, node, half):
+        left, right = 2 * node, 2 * node + 1
+        best, prefix, suffix = self._best, self._prefix, self._suffix
+        prefix[node] = prefix[left] if prefix[left] < half else half + prefix[right]
+        suffix[node] = suffix[right] if suffix[right] < half else half + suffix[left]
+        best[node] = max(best[left], best[right], suffix[left] + prefix[right])
+
+    def _set_free(self, slot, free):
+        node = self._num_leaves + slot
+        value = 1 if free else 0
+        self._best[node] = self._prefix[node] = self._suffix[node] = value
+        half = 1
+        node //= 2
+        while node >= 1:
+            self._combine(node, half)
+            half *= 2
+            node //= 2
 
     def get_max_index(self):
         return self._max_index
@@ -44,33 +88,45 @@ class PointerSlotStorage(object):
         return self._num_entries
 
     def find_slot(self):
-        # Notice: returns None in case of no free slot, and the slot otherwise, this
+        # Notice: returns -1 in case of no free slot, and the slot otherwise, this
         # is different to the C++ Module
-        for i, value in enumerate(self._data):
-            if not value:
-                return i
-        return -1
+        return self.find_consecutive_slots(1)
 
     def find_consecutive_slots(self, num_consecutive):
-        if num_consecutive == 1:
-            return self.find_slot()
-
-        for i in range(len(self._data)):
-            any_taken = False
-            for k in range(num_consecutive):
-                if self._data[i + k]:
-                    any_taken = True
-                    break
-            if not any_taken:
-                return i
-        return -1
+        best, prefix, suffix = self._best, self._prefix, self._suffix
+        if best[1] < num_consecutive:
+            return -1
+
+        # Descend into the leftmost child which can still hold the run. The
+        # run can also start in the left child and continue in the right one.
+        node, start, half = 1, 0, self._num_leaves // 2
+        while node < self._num_leaves:
+            left, right = 2 * node, 2 * node + 1
+            if best[left] >= num_consecutive:
+                node = left
+            elif suffix[left] + prefix[right] >= num_consecutive:
+                slot = start + half - suffix[left]
+                return slot if self._fits(slot, num_consecutive) else -1
+            else:
+                node = right
+                start += half
+            half //= 2
+        return start if self._fits(start, num_consecutive) else -1
+
+    def _fits(self, slot, num_consecutive):
+        # The leaves past the storage size are free as well, so the first
+        # fitting run might reach out of the storage
+        return slot + num_consecutive <= self._size
 
     def free_slot(self, slot):
         self._data[slot] = None
+        self._occupied.pop(slot, None)
         self._num_entries -= 1
+        self._set_free(slot, True)
         if slot == self._max_index:
-            while self._max_index >= 0 and not self._data[self._max_index]:
-                self._max_index -= 1
+            # The free run at the end of the root node tells where the
+            # last used slot is, -1 if the container is empty
+            self._max_index = self._num_leaves - 1 - self._suffix[1]
 
     def free_consecutive_slots(self, slot, num_consecutive):
         for i in range(num_consecutive):
@@ -79,12 +135,14 @@ class PointerSlotStorage(object):
     def reserve_slot(self, slot, ptr):
         self._max_index = max(self._max_index, slot)
         self._data[slot] = ptr
+        self._occupied[slot] = ptr
         self._num_entries += 1
+        self._set_free(slot, False)
 
     def begin(self):
-        for i in range(self._max_index + 1):
-            if self._data[i]:
-                yield self._data[i]
+        # Only iterates the used slots. Iterating a copy allows to free slots
+        # while iterating
+        return iter(list(self._occupied.values()))
 
     def end(self):
         raise NotImplementedError("Use .begin() as iterator when using the python side!")
@@ -63,7 +63,10 @@ __all__ = ["RPLight"]
 class RPLight(object):
 
     """ Please refer to the native C++ implementation for docstrings and comments.
-    This is just the python implementation, which does not contain documentation! """
+    This is just the python implementation, which does not contain documentation!
+
+    While attached, a light adds itself to the dirty set of the light manager
+    when it needs an update, so the manager only has to process changed lights. """
 
     LT_empty = 0
     LT_point_light = 1
@@ -81,6 +84,7 @@ class RPLight(object):
         self._near_plane = 0.5
         self._energy = 20
         self._shadow_sources = []
+        self._dirty_set = None
 
     def get_num_shadow_sources(self):
         return len(self._shadow_sources)
@@ -93,6 +97,13 @@ class RPLight(object):
 
     def set_needs_update(self, flag):
         self._needs_update = flag
+        if flag and self._dirty_set is not None:
+            self._dirty_set.add(self)
+
+    def set_dirty_set(self, dirty_set):
+        self._dirty_set = dirty_set
+        if dirty_set is not None and self._needs_update:
+            dirty_set.add(self)
 
     def get_needs_update(self):
         return self._needs_update
@@ -140,6 +151,7 @@ class RPLight(object):
 
     def set_energy(self, energy):
         self._energy = energy
+        self.set_needs_update(True)
 
     def get_energy(self):
         return self._energy
@@ -206,3 +218,16 @@ class RPLight(object):
 
         cmd.push_vec3(self._position)
         cmd.push_vec3(self._color * self._energy / 100.0)
+
+    def write_to_storage(self, storage, slot):
+        storage.light_type[slot] = self._light_type
+        storage.ies_profile[slot] = self._ies_profile
+
+        if self._casts_shadows:
+            storage.shadow_source[slot] = self._shadow_sources[0].get_slot()
+        else:
+            storage.shadow_source[slot] = -1
+
+        color = self._color * self._energy / 100.0
+        storage.position[slot] = self._position.x, self._position.y, self._position.z
+        storage.color[slot] = color.x, color.y, color.z
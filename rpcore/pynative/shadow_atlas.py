@@ -25,28 +25,34 @@ THE SOFTWARE.
 """
 
 from __future__ import print_function, division
-from rplibs.six.moves import range  # pylint: disable=import-error
 
 from panda3d.core import LVecBase4i, LVecBase4
 
+from rpcore.pynative.atlas_allocator import ATLAS_ALLOCATORS, next_power_of_two
+
 
 class ShadowAtlas(object):
 
     """ Please refer to the native C++ implementation for docstrings and comments.
-    This is just the python implementation, which does not contain documentation! """
+    This is just the python implementation, which does not contain documentation!
+
+    Instead of testing every tile position, regions are found by an allocator,
+    see atlas_allocator.py. The quadtree allocator is used by default, and the
+    shelf allocator in case the amount of tiles is no power of two. """
 
-    def __init__(self, size, tile_size=32):
+    def __init__(self, size, tile_size=32, allocator="quadtree"):
         self._size = size
         self._tile_size = tile_size
         self._num_used_tiles = 0
+        self._allocator_name = allocator
         self.init_tiles()
 
     def init_tiles(self):
         self._num_tiles = self._size // self._tile_size
-
-        def row():
-            return [False for i in range(self._num_tiles)]  # pylint: disable=unused-variable
-        self._flags = [row() for j in range(self._num_tiles)]  # pylint: disable=unused-variable
+        if self._num_tiles != next_power_of_two(self._num_tiles):
+            self._allocator_name = "shelf"
+        self._allocator = ATLAS_ALLOCATORS[self._allocator_name](self._num_tiles)
+        self._regions = {}
 
     def get_num_used_tiles(self):
         return self._num_used_tiles
@@ -58,35 +64,54 @@ class ShadowAtlas(object):
 
     coverage = property(get_coverage)
 
-    def reserve_region(self, x, y, w, h):
-        self._num_used_tiles += w * h
-        for x_offset in range(w):
-            for y_offset in range(h):
-                self._flags[x + x_offset][y + y_offset] = True
+    def get_fragmentation(self):
+        # Share of the free space which is not part of the largest free region,
+        # 0 means all free space is usable for a single region
+        free_tiles = self._num_tiles ** 2 - self._allocator.get_num_reserved_tiles()
+        if free_tiles <= 0:
+            return 0.0
+        return 1.0 - self._allocator.get_largest_free_region() / float(free_tiles)
+
+    fragmentation = property(get_fragmentation)
+
+    def get_wasted_tiles(self):
+        # Tiles which are reserved by the allocator, e.g. due to rounding,
+        # but not used by any region
+        return self._allocator.get_num_reserved_tiles() - self._num_used_tiles
+
+    wasted_tiles = property(get_wasted_tiles)
+
+    def get_allocator_name(self):
+        return self._allocator_name
+
+    allocator_name = property(get_allocator_name)
 
     def find_and_reserve_region(self, tile_width, tile_height):
-        for x in range(self._num_tiles - tile_height + 1):
-            for y in range(self._num_tiles - tile_width + 1):
-                if self.region_is_free(x, y, tile_width, tile_height):
-                    self.reserve_region(x, y, tile_width, tile_height)
-                    return LVecBase4i(x, y, tile_width, tile_height)
-        print("Failed to find a free region of size", tile_width, "x", tile_height)
-        return LVecBase4i(-1)
+        position = self._allocator.allocate(tile_width, tile_height)
+        if position is None:
+            print("Failed to find a free region of size", tile_width, "x", tile_height)
+            return LVecBase4i(-1)
+        x, y = position
+        self._regions[(x, y)] = (tile_width, tile_height)
+        self._num_used_tiles += tile_width * tile_height
+        return LVecBase4i(x, y, tile_width, tile_height)
 
     def free_region(self, region):
+        if self._regions.get((region.x, region.y)) != (region.z, region.w):
+            print("ShadowAtlas: Attempted to free a region which is not reserved:", region)
+            return
+        del self._regions[(region.x, region.y)]
         self._num_used_tiles -= region.z * region.w
-        for x in range(region.z):
-            for y in range(region.w):
-                self._flags[region.x + x][region.y + y] = False
+        self._allocator.free(region.x, region.y)
 
     def get_tile_size(self):
         return self._tile_size
 
     def region_is_free(self, x, y, w, h):
-        for x_offset in range(w):
-            for y_offset in range(h):
-                if self._flags[x + x_offset][y + y_offset]:
-                    return False
+        for (region_x, region_y), (region_w, region_h) in self._regions.items():
+            if (region_x < x + w and x < region_x + region_w and
+                    region_y < y + h and y < region_y + region_h):
+                return False
         return True
 
     def get_required_tiles(self, resolution):
@@ -0,0 +1,166 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from __future__ import division
+
+import math
+
+from rplibs.six.moves import range  # pylint: disable=import-error
+
+
+class ShadowSourceGrid(object):
+
+    """ Uniform grid over the bounding spheres of all shadow sources. Each
+    source gets stored in all cells its bounding box overlaps, so a distance
+    query only has to visit the cells around the query point instead of all
+    sources. Sources covering a huge amount of cells are kept in a separate
+    list which is always checked.
+
+    Entries are updated incrementally: Updating a source whose bounds did not
+    change is a no-op, and moving a source only touches the cells it left and
+    entered. """
+
+    def __init__(self, cell_size=100.0, max_cells_per_source=64):
+        self._cell_size = float(cell_size)
+        self._max_cells_per_source = max_cells_per_source
+        self._cells = {}
+        self._large_sources = set()
+
+        # Stores (center_x, center_y, center_z, radius, cells) per source,
+        # cells being None for sources in the large list
+        self._entries = {}
+
+    def get_num_entries(self):
+        return len(self._entries)
+
+    num_entries = property(get_num_entries)
+
+    def get_num_cells(self):
+        return len(self._cells)
+
+    num_cells = property(get_num_cells)
+
+    def get_cell_size(self):
+        return self._cell_size
+
+    def set_cell_size(self, cell_size):
+        """ Changes the cell size, this rebuilds the whole grid """
+        entries = self._entries
+        self._cell_size = float(cell_size)
+        self._cells = {}
+        self._large_sources = set()
+        self._entries = {}
+        for source, entry in entries.items():
+            self._insert(source, entry[0], entry[1], entry[2], entry[3])
+
+    cell_size = property(get_cell_size, set_cell_size)
+
+    def _cell_range(self, x, y, z, extent):
+        """ Returns the inclusive integer cell bounds of a box around a point """
+        inv_size = 1.0 / self._cell_size
+        return (int(math.floor((x - extent) * inv_size)),
+                int(math.floor((y - extent) * inv_size)),
+                int(math.floor((z - extent) * inv_size)),
+                int(math.floor((x + extent) * inv_size)),
+                int(math.floor((y + extent) * inv_size)),
+                int(math.floor((z + extent) * inv_size)))
+
+    def _insert(self, source, x, y, z, radius):
+        min_x, min_y, min_z, max_x, max_y, max_z = self._cell_range(x, y, z, radius)
+        num_cells = (max_x - min_x + 1) * (max_y - min_y + 1) * (max_z - min_z + 1)
+        if num_cells > self._max_cells_per_source:
+            self._large_sources.add(source)
+            self._entries[source] = (x, y, z, radius, None)
+            return
+
+        cells = []
+        for cx in range(min_x, max_x + 1):
+            for cy in range(min_y, max_y + 1):
+                for cz in range(min_z, max_z + 1):
+                    key = (cx, cy, cz)
+                    self._cells.setdefault(key, set()).add(source)
+                    cells.append(key)
+        self._entries[source] = (x, y, z, radius, cells)
+
+    def remove(self, source):
+        """ Removes a source from the grid, does nothing if the source is not
+        stored in the grid """
+        entry = self._entries.pop(source, None)
+        if entry is None:
+            return
+        cells = entry[4]
+        if cells is None:
+            self._large_sources.discard(source)
+            return
+        for key in cells:
+            cell = self._cells[key]
+            cell.discard(source)
+            if not cell:
+                del self._cells[key]
+
+    def update(self, source):
+        """ Inserts a source, or moves it in case its bounds changed """
+        bounds = source.get_bounds()
+        center = bounds.get_center()
+        x, y, z, radius = center.x, center.y, center.z, bounds.get_radius()
+        entry = self._entries.get(source)
+        if entry is not None:
+            if entry[0] == x and entry[1] == y and entry[2] == z and entry[3] == radius:
+                return
+            self.remove(source)
+        self._insert(source, x, y, z, radius)
+
+    def query(self, point, max_distance):
+        """ Returns a list of (distance, source) tuples of all sources whose
+        bounding sphere is closer than max_distance to the given point. The
+        distance is measured to the center of the bounding sphere. """
+        px, py, pz = point.x, point.y, point.z
+        min_x, min_y, min_z, max_x, max_y, max_z = self._cell_range(px, py, pz, max_distance)
+        num_cells = (max_x - min_x + 1) * (max_y - min_y + 1) * (max_z - min_z + 1)
+
+        candidates = set(self._large_sources)
+        if num_cells > len(self._cells):
+            # Cheaper to check all occupied cells than all cells in range
+            for (cx, cy, cz), cell in self._cells.items():
+                if min_x <= cx <= max_x and min_y <= cy <= max_y and min_z <= cz <= max_z:
+                    candidates.update(cell)
+        else:
+            cells = self._cells
+            for cx in range(min_x, max_x + 1):
+                for cy in range(min_y, max_y + 1):
+                    for cz in range(min_z, max_z + 1):
+                        cell = cells.get((cx, cy, cz))
+                        if cell:
+                            candidates.update(cell)
+
+        result = []
+        entries = self._entries
+        for source in candidates:
+            x, y, z, radius, _ = entries[source]
+            dist = math.sqrt((px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2)
+            if dist - radius < max_distance:
+                result.append((dist, source))
+        return result
@@ -26,21 +26,27 @@ THE SOFTWARE.
 
 from __future__ import division
 
+import os
 import sys
 import math
 import time
+import atexit
+
+from multiprocessing.pool import ThreadPool
 
 from panda3d.core import LVecBase2i, TransformState, RenderState, load_prc_file
 from panda3d.core import PandaSystem, MaterialAttrib, WindowProperties
-from panda3d.core import GeomTristrips, Vec4
+from panda3d.core import GeomTristrips, Vec4, Filename
 
 from direct.showbase.ShowBase import ShowBase
 from direct.stdpy.file import isfile
 
-from rplibs.yaml import load_yaml_file_flat
+from rplibs.six import iteritems
+from rplibs.yaml import load_yaml_file_flat, set_yaml_cache_dir, get_yaml_stats
 from rplibs.six.moves import range  # pylint: disable=import-error
 
 from rpcore.globals import Globals
+from rpcore.loader import timed_loading_operation
 from rpcore.effect import Effect
 from rpcore.rpobject import RPObject
 from rpcore.common_resources import CommonResources
@@ -52,6 +58,9 @@ from rpcore.pluginbase.day_manager import DayTimeManager
 from rpcore.util.task_scheduler import TaskScheduler
 from rpcore.util.network_communication import NetworkCommunication
 from rpcore.util.ies_profile_loader import IESProfileLoader
+from rpcore.util.shader_include_graph import ShaderIncludeGraph
+from rpcore.util.shader_watcher import ShaderWatcher
+from rpcore.util.startup_tracer import StartupTracer
 
 from rpcore.gui.debugger import Debugger
 from rpcore.gui.loading_screen import LoadingScreen
@@ -74,6 +83,16 @@ class RenderPipeline(RPObject):
     the pipeline to form a working system. It does not do much work itself, but
     instead setups all the managers and systems to be able to do their work. """
 
+    # Options of the effect applied to the default skybox
+    _SKYBOX_EFFECT_OPTIONS = {
+        "render_shadow": False,
+        "render_envmap": False,
+        "render_voxelize": False,
+        "alpha_testing": False,
+        "normal_mapping": False,
+        "parallax_mapping": False
+    }
+
     def __init__(self):
         """ Creates a new pipeline with a given showbase instance. This should
         be done before intializing the ShowBase, the pipeline will take care of
@@ -84,15 +103,23 @@ class RenderPipeline(RPObject):
         self.mount_mgr = MountManager(self)
         self.settings = {}
         self._applied_effects = []
+        self._preparation_pool = None
+        self._include_graph = None
+        self._include_graph_job = None
+        self._shader_watcher = None
+        self._startup_timings = {}
         self._pre_showbase_initialized = False
         self._first_frame = None
+        self._first_frame_start = None
         self.set_loading_screen_image("/$$rp/data/gui/loading_screen_bg.txo")
 
     def load_settings(self, path):
         """ Loads the pipeline configuration from a given filename. Usually
         this is the 'config/pipeline.ini' file. If you call this more than once,
         only the settings of the last file will be used. """
-        self.settings = load_yaml_file_flat(path)
+        with StartupTracer.span("load_settings"):
+            self.settings = load_yaml_file_flat(path)
+        self._init_yaml_cache()
 
     def reload_shaders(self):
         """ Reloads all shaders. This will reload the shaders of all plugins,
@@ -109,18 +136,97 @@ class RenderPipeline(RPObject):
             self._showbase.graphicsEngine.render_frame()
             self._showbase.graphicsEngine.render_frame()
         self.tag_mgr.cleanup_states()
+        Effect.clear_cache()
+        self._include_graph = None
+        self._include_graph_job = None
         self.stage_mgr.reload_shaders()
         self.light_mgr.reload_shaders()
+        self._prepare_startup_effects()
         self._set_default_effect()
         self.plugin_mgr.trigger_hook("shader_reload")
         if self.settings["pipeline.display_debugger"]:
             self.debugger.set_reload_hint_visible(False)
         self._apply_custom_shaders()
 
+    def reload_changed_shaders(self, changed_files):
+        """ Reloads only the stages and effects which use one of the given
+        shader files, either directly or through an include. This is much
+        faster than reload_shaders(), however changed defines or shaders
+        loaded outside of the stages and effects are not picked up. Returns
+        the amount of reloaded stages and effects. """
+        graph = self._get_include_graph()
+        changed = [graph.update_file(i) for i in changed_files]
+        affected = graph.get_dependents(changed)
+
+        def uses_affected_file(sources):
+            return any(graph.add_file(i) in affected for i in sources)
+
+        # Errors are logged instead of raised, since a file saved while editing
+        # might be broken, reloading it again after fixing it works as usual
+        stages = []
+        for stage in self.stage_mgr.stages:
+            if not uses_affected_file(stage.get_shader_sources()):
+                continue
+            try:
+                self.stage_mgr.reload_stage(stage)
+                stages.append(stage)
+            except Exception as msg:  # pylint: disable=broad-except
+                self.error("Could not reload", stage.stage_id, ":", msg)
+        if uses_affected_file(self.light_mgr.cmd_queue.SHADER_SOURCES):
+            try:
+                self.light_mgr.reload_shaders()
+            except Exception as msg:  # pylint: disable=broad-except
+                self.error("Could not reload the light manager shaders:", msg)
+
+        effects = [i for i in Effect.get_loaded_effects()
+                   if uses_affected_file(i.get_source_files())]
+        if effects:
+            effects = Effect.reload_effects(effects, self._preparation_pool)
+            for source in (j for i in effects for j in i.get_source_files()):
+                graph.update_file(source)
+            filenames = set(i.filename for i in effects)
+            for args in self._applied_effects:
+                if args[1] in filenames:
+                    self._internal_set_effect(*args)
+
+        self.debug("Reloaded", len(stages), "stages and", len(effects), "effects")
+        return len(stages), len(effects)
+
+    def _get_include_graph(self):
+        """ Returns the include graph of all loaded shaders, building it the
+        first time it is requested, unless it was already built in the
+        preparation pool, see _init_shader_watcher """
+        if self._include_graph is None:
+            if self._include_graph_job is not None:
+                self._include_graph = self._include_graph_job.get()
+                self._include_graph_job = None
+            else:
+                self._include_graph = self._build_include_graph(self._get_stage_shader_sources())
+            for effect in Effect.get_loaded_effects():
+                for source in effect.get_source_files():
+                    self._include_graph.add_file(source)
+        return self._include_graph
+
+    def _get_stage_shader_sources(self):
+        """ Returns the paths of the shaders loaded by all stages """
+        return [j for i in self.stage_mgr.stages for j in i.get_shader_sources()]
+
+    @staticmethod
+    def _build_include_graph(stage_sources):
+        """ Builds the include graph of all shaders, resolving the includes of
+        the given stage shaders. This only reads files, so it can run in the
+        preparation pool. """
+        graph = ShaderIncludeGraph()
+        graph.scan()
+        for source in stage_sources:
+            graph.add_file(source)
+        return graph
+
     def _apply_custom_shaders(self):
         """ Re-applies all custom shaders the user applied, to avoid them getting
         removed when the shaders are reloaded """
         self.debug("Re-applying", len(self._applied_effects), "custom shaders")
+        self.prepare_effects([(args[1], args[2]) for args in self._applied_effects])
         for args in self._applied_effects:
             self._internal_set_effect(*args)
 
@@ -132,7 +238,8 @@ class RenderPipeline(RPObject):
         See the 00-Loading the pipeline sample for more information. """
         if not self.mount_mgr.is_mounted:
             self.debug("Mount manager was not mounted, mounting now ...")
-            self.mount_mgr.mount()
+            with StartupTracer.span("mount"):
+                self.mount_mgr.mount()
 
         if not self.settings:
             self.debug("No settings loaded, loading from default location")
@@ -156,7 +263,8 @@ class RenderPipeline(RPObject):
         pre_showbase_init() before initializing the ShowBase"""
 
         start_time = time.time()
-        self._init_showbase(base)
+        with StartupTracer.span("init_showbase"):
+            self._init_showbase(base)
 
         if not self._showbase.win.gsg.supports_compute_shaders:
             self.fatal(
@@ -165,20 +273,33 @@ class RenderPipeline(RPObject):
                 "be too old, or you might be using the open source drivers on linux.")
 
         self._init_globals()
-        self.loading_screen.create()
+        self._init_effect_cache()
+        self._init_preparation_pool()
+        with StartupTracer.span("loading_screen"):
+            self.loading_screen.create()
         self._adjust_camera_settings()
-        self._create_managers()
-        self.plugin_mgr.load()
-        self.daytime_mgr.load_settings()
-        self.common_resources.write_config()
-        self._init_debugger()
+        with StartupTracer.span("create_managers"):
+            self._create_managers()
+        with StartupTracer.span("load_plugins"):
+            self.plugin_mgr.load()
+        with StartupTracer.span("write_shader_configs"):
+            self.daytime_mgr.load_settings()
+            self.common_resources.write_config()
+        with StartupTracer.span("init_debugger"):
+            self._init_debugger()
 
         self.plugin_mgr.trigger_hook("stage_setup")
         self.plugin_mgr.trigger_hook("post_stage_setup")
 
         self._create_common_defines()
-        self._initialize_managers()
-        self._create_default_skybox()
+        with StartupTracer.span("initialize_managers"):
+            self._initialize_managers()
+        effect_start = time.time()
+        with StartupTracer.span("prepare_effects"):
+            self._prepare_startup_effects()
+        self._startup_timings["effects"] = time.time() - effect_start
+        with StartupTracer.span("create_default_skybox"):
+            self._create_default_skybox()
 
         self.plugin_mgr.trigger_hook("pipeline_created")
 
@@ -189,9 +310,12 @@ class RenderPipeline(RPObject):
         # when we finished, so we can measure how long it took to render the
         # first frame (where the shaders are actually compiled)
         init_duration = (time.time() - start_time)
+        StartupTracer.add_span("create", "startup", start_time, time.time())
         self._first_frame = time.process_time()
+        self._first_frame_start = time.time()
         self.debug("Finished initialization in {:3.3f} s, first frame: {}".format(
             init_duration, Globals.clock.get_frame_count()))
+        self._report_startup_timings()
 
     def set_loading_screen_image(self, image_source):
         """ Tells the pipeline to use the default loading screen, which consists
@@ -209,6 +333,22 @@ class RenderPipeline(RPObject):
         remove_light documentation for further information. """
         self.light_mgr.remove_light(light)
 
+    def add_lights(self, lights):
+        """ Adds a list of lights at once, which is faster than adding them
+        one by one. Check out the LightManager add_lights documentation for
+        further information. """
+        self.light_mgr.add_lights(lights)
+
+    def remove_lights(self, lights):
+        """ Removes a list of previously attached lights, check out the
+        LightManager remove_lights documentation for further information. """
+        self.light_mgr.remove_lights(lights)
+
+    def update_lights_bulk(self, lights):
+        """ Uploads a list of changed lights at once, check out the LightManager
+        update_lights_bulk documentation for further information. """
+        self.light_mgr.update_lights_bulk(lights)
+
     def load_ies_profile(self, filename):
         """ Loads an IES profile from a given filename and returns a handle which
         can be used to set an ies profile on a light """
@@ -221,10 +361,16 @@ class RenderPipeline(RPObject):
         effect will be applied to that nodepath and all nodepaths below whose
         current effect sort is less than the new effect sort (passed by the
         sort parameter). """
-        effect = Effect.load(effect_src, options)
+        with StartupTracer.span(effect_src, "effect"):
+            effect = Effect.load(effect_src, options)
         if effect is None:
             return self.error("Could not apply effect")
 
+        # Effects are shared between all nodes using the same file and options,
+        # so the sort has to be part of the state name, otherwise applying the
+        # effect with another sort would change the states of all other nodes
+        state_name = "{}-{}".format(effect.effect_id, sort)
+
         for i, stage in enumerate(("gbuffer", "shadow", "voxelize", "envmap", "forward")):
             if not effect.get_option("render_" + stage):
                 nodepath.hide(self.tag_mgr.get_mask(stage))
@@ -234,7 +380,7 @@ class RenderPipeline(RPObject):
                     nodepath.set_shader(shader, 25)
                 else:
                     self.tag_mgr.apply_state(
-                        stage, nodepath, shader, str(effect.effect_id), 25 + 10 * i + sort)
+                        stage, nodepath, shader, state_name, 25 + 10 * i + sort)
                 nodepath.show_through(self.tag_mgr.get_mask(stage))
 
         if effect.get_option("render_gbuffer") and effect.get_option("render_forward"):
@@ -248,6 +394,13 @@ class RenderPipeline(RPObject):
         self._applied_effects.append(args)
         self._internal_set_effect(*args)
 
+    def prepare_effects(self, effects):
+        """ Loads a list of (effect_src, options) tuples into the effect cache,
+        so that the following set_effect calls do not have to load them one
+        after another. The effects get prepared in parallel if
+        pipeline.shader_preparation_threads is greater than zero. """
+        Effect.load_many(effects, self._preparation_pool)
+
     def add_environment_probe(self):
         """ Constructs a new environment probe and returns the handle, so that
         the probe can be modified. In case the env_probes plugin is not activated,
@@ -292,7 +445,6 @@ class RenderPipeline(RPObject):
             rp_light.shadow_map_resolution = light_node.shadow_buffer_size.x
             rp_light.inner_radius = 0.4
 
-            self.add_light(rp_light)
             light.remove_node()
             lights.append(rp_light)
 
@@ -308,10 +460,11 @@ class RenderPipeline(RPObject):
             rp_light.fov = light_node.exponent / math.pi * 180.0
             lpoint = light.get_mat(Globals.base.render).xform_vec((0, 0, -1))
             rp_light.direction = lpoint
-            self.add_light(rp_light)
             light.remove_node()
             lights.append(rp_light)
 
+        self.add_lights(lights)
+
         envprobes = []
         for np in scene.find_all_matches("**/ENVPROBE*"):
             probe = self.add_environment_probe()
@@ -369,15 +522,24 @@ class RenderPipeline(RPObject):
         """ Internal method to create all managers and instances. This also
         initializes the commonly used render stages, which are always required,
         independently of which plugins are enabled. """
-        self.task_scheduler = TaskScheduler(self)
-        self.tag_mgr = TagStateManager(Globals.base.cam)
-        self.plugin_mgr = PluginManager(self)
-        self.stage_mgr = StageManager(self)
-        self.light_mgr = LightManager(self)
-        self.daytime_mgr = DayTimeManager(self)
-        self.ies_loader = IESProfileLoader(self)
-        self.common_resources = CommonResources(self)
-        self._init_common_stages()
+        with StartupTracer.span("TaskScheduler"):
+            self.task_scheduler = TaskScheduler(self)
+        with StartupTracer.span("TagStateManager"):
+            self.tag_mgr = TagStateManager(Globals.base.cam)
+        with StartupTracer.span("PluginManager"):
+            self.plugin_mgr = PluginManager(self)
+        with StartupTracer.span("StageManager"):
+            self.stage_mgr = StageManager(self)
+        with StartupTracer.span("LightManager"):
+            self.light_mgr = LightManager(self)
+        with StartupTracer.span("DayTimeManager"):
+            self.daytime_mgr = DayTimeManager(self)
+        with StartupTracer.span("IESProfileLoader"):
+            self.ies_loader = IESProfileLoader(self)
+        with StartupTracer.span("CommonResources"):
+            self.common_resources = CommonResources(self)
+        with StartupTracer.span("init_common_stages"):
+            self._init_common_stages()
 
     def _analyze_system(self):
         """ Prints information about the system used, including information
@@ -409,7 +571,9 @@ class RenderPipeline(RPObject):
         have to get initialized inbetween. """
         self.stage_mgr.setup()
         self.stage_mgr.reload_shaders()
+        start_time = time.time()
         self.light_mgr.reload_shaders()
+        self._startup_timings["light_manager"] = time.time() - start_time
         self._init_bindings()
         self.light_mgr.init_shadows()
 
@@ -428,6 +592,92 @@ class RenderPipeline(RPObject):
             self.debugger = EmptyDebugger()  # pylint: disable=redefined-variable-type
             del EmptyDebugger
 
+    def _init_effect_cache(self):
+        """ Enables the persistent cache of generated effect shaders, in case
+        a cache directory was specified in the pipeline settings """
+        cache_dir = self._resolve_path_setting("pipeline.effect_cache_dir")
+        if cache_dir is not None:
+            self.debug("Using effect cache directory", cache_dir)
+            Effect.set_persistent_cache_dir(cache_dir)
+
+    def _init_preparation_pool(self):
+        """ Creates the thread pool used to prepare effects and to resolve the
+        includes of the stage shaders in parallel, in case it is enabled in
+        the pipeline settings. The pool gets closed when the application exits. """
+        num_threads = self.settings.get("pipeline.shader_preparation_threads", 0)
+        if num_threads > 0:
+            self.debug("Preparing shaders with", num_threads, "threads")
+            self._preparation_pool = ThreadPool(num_threads)
+            atexit.register(self._close_preparation_pool)
+
+    def _close_preparation_pool(self):
+        """ Waits for the pending jobs of the preparation pool and stops its threads """
+        self._preparation_pool.close()
+        self._preparation_pool.join()
+        self._preparation_pool = None
+
+    def _init_yaml_cache(self):
+        """ Enables storing snapshots of the parsed yaml files on disk, in case
+        a cache directory was specified in the pipeline settings """
+        cache_dir = self._resolve_path_setting("pipeline.yaml_cache_dir")
+        if cache_dir is not None:
+            self.debug("Using yaml cache directory", cache_dir)
+        set_yaml_cache_dir(cache_dir)
+
+    def _resolve_path_setting(self, setting):
+        """ Returns the absolute path of a path setting, or None if the setting
+        is empty. Relative paths are relative to the base path. """
+        path = self.settings.get(setting, "")
+        if not path:
+            return None
+        if not os.path.isabs(path):
+            base_path = Filename(self.mount_mgr.base_path).to_os_specific()
+            path = os.path.join(base_path, path)
+        return path
+
+    def _finish_startup_trace(self):
+        """ Stops the startup tracer after the first frame, and exports the
+        trace in case pipeline.startup_trace_file is set """
+        StartupTracer.add_span("first_frame", "startup", self._first_frame_start, time.time())
+        StartupTracer.stop()
+        trace_file = self._resolve_path_setting("pipeline.startup_trace_file")
+        if trace_file is not None:
+            self.debug("Writing startup trace to", trace_file)
+            try:
+                StartupTracer.export(trace_file)
+            except IOError as msg:
+                self.warn("Failed to write startup trace:", msg)
+
+    def _report_startup_timings(self):
+        """ Prints how long the creation and shader loading took for each
+        stage and each plugin, as well as the slowest resource loads, to be
+        able to find slow stages """
+        self.debug("Startup timings (create / shaders):")
+        for stage_id, timings in iteritems(self.stage_mgr.stage_timings):
+            self.debug("  {:<35} {:8.2f} ms {:8.2f} ms".format(
+                stage_id, timings["create"] * 1000.0, timings["shaders"] * 1000.0))
+        self.plugin_mgr.log_plugin_timings()
+        self.debug("Startup timings per plugin:")
+        for plugin_id, (create, shaders) in iteritems(self.stage_mgr.get_plugin_timings()):
+            self.debug("  {:<35} {:8.2f} ms {:8.2f} ms".format(
+                plugin_id, create * 1000.0, shaders * 1000.0))
+        load_categories = ("texture", "shader", "model", "font")
+        slow_loads = [i for i in StartupTracer.get_spans() if i[1] in load_categories and
+                      i[2] > timed_loading_operation.SLOW_THRESHOLD]
+        slow_loads.sort(key=lambda i: i[2], reverse=True)
+        for name, category, duration in slow_loads[:5]:
+            self.debug("Slow {} load: {} took {:3.2f} ms".format(category, name, duration * 1000.0))
+        if len(slow_loads) > 5:
+            self.debug(len(slow_loads) - 5, "more slow loads, see the startup trace")
+        self.debug("Light manager shaders: {:3.2f} ms, effects: {:3.2f} ms ({} threads)".format(
+            self._startup_timings.get("light_manager", 0.0) * 1000.0,
+            self._startup_timings.get("effects", 0.0) * 1000.0,
+            self.settings.get("pipeline.shader_preparation_threads", 0)))
+        yaml_stats = get_yaml_stats()
+        self.debug("Loaded {} yaml files in {:3.2f} ms ({} from cache, libyaml: {})".format(
+            yaml_stats["files"], yaml_stats["duration"] * 1000.0, yaml_stats["cached"],
+            "yes" if yaml_stats["libyaml"] else "no"))
+
     def _init_globals(self):
         """ Inits all global bindings. This includes references to the global
         ShowBase instance, as well as the render resolution, the GUI font,
@@ -448,6 +698,12 @@ class RenderPipeline(RPObject):
         effect does not require a custom sort parameter to be passed. """
         self.set_effect(Globals.render, "effects/default.yaml", {}, -10)
 
+    def _prepare_startup_effects(self):
+        """ Prepares the default effect and the skybox effect at once, so that
+        they get generated in parallel and setting them is just a cache lookup """
+        self.prepare_effects([("effects/default.yaml", {}),
+                              ("effects/skybox.yaml", self._SKYBOX_EFFECT_OPTIONS)])
+
     def _adjust_camera_settings(self):
         """ Sets the default camera settings, this includes the cameras
         near and far plane, as well as FoV. The reason for this is, that pandas
@@ -501,6 +757,28 @@ class RenderPipeline(RPObject):
         self._showbase.addTask(self._update_inputs_and_stages, "RP_UpdateInputsAndStages", sort=18)
         self._showbase.taskMgr.doMethodLater(0.5, self._clear_state_cache, "RP_ClearStateCache")
         self._showbase.accept("window-event", self._handle_window_event)
+        if self.settings.get("pipeline.shader_hot_reload", False):
+            self._init_shader_watcher()
+
+    def _init_shader_watcher(self):
+        """ Starts watching the shader and effect directories, and adds a task
+        which reloads the affected stages and effects when a file changed """
+        base_path = Filename(self.mount_mgr.base_path).to_os_specific()
+        self._shader_watcher = ShaderWatcher()
+        self._shader_watcher.add_directory(
+            os.path.join(base_path, "rpcore", "shader"), "/$$rp/shader", (".glsl",))
+        self._shader_watcher.add_directory(
+            os.path.join(base_path, "rpplugins"), "/$$rp/rpplugins", (".glsl",))
+        self._shader_watcher.add_directory(
+            os.path.join(base_path, "effects"), "/$$rp/effects", (".yaml",))
+        self._shader_watcher.start()
+        self._showbase.addTask(self._shader_hot_reload_task, "RP_ShaderHotReload", sort=5)
+
+        # Resolve the includes of all shaders while the first frames render,
+        # instead of stalling the first reload
+        if self._preparation_pool is not None:
+            self._include_graph_job = self._preparation_pool.apply_async(
+                self._build_include_graph, (self._get_stage_shader_sources(),))
 
     def _handle_window_event(self, event):
         """ Checks for window events. This mainly handles incoming resizes,
@@ -552,6 +830,23 @@ class RenderPipeline(RPObject):
 
         return task.cont
 
+    def _shader_hot_reload_task(self, task):
+        """ Reloads the stages and effects affected by changed files. This runs
+        before all other tasks, so that reloads only happen between frames. """
+        changes = self._shader_watcher.get_changes()
+        if changes is None:
+            return task.cont
+        changed_files, first_change = changes
+        self.debug("Detected changes in", ", ".join(changed_files))
+        if self.settings["pipeline.display_debugger"]:
+            self.debugger.error_msg_handler.clear_messages()
+        start_time = time.time()
+        self.reload_changed_shaders(changed_files)
+        end_time = time.time()
+        self.debug("Hot reload took {:3.1f} ms, {:3.1f} ms after the change".format(
+            (end_time - start_time) * 1000.0, (end_time - first_change) * 1000.0))
+        return task.cont
+
     def _update_inputs_and_stages(self, task):
         """ Updates the commonly used inputs each frame. This is a seperate
         task to be able view detailed performance information in pstats, since
@@ -576,6 +871,7 @@ class RenderPipeline(RPObject):
             duration = time.process_time() - self._first_frame
             self.debug("Took", round(duration, 3), "s until first frame")
             self._first_frame = None
+            self._finish_startup_trace()
         return task.cont
 
     def _create_common_defines(self):
@@ -608,14 +904,7 @@ class RenderPipeline(RPObject):
         skybox.set_scale(size)
         skybox.reparent_to(Globals.render)
         skybox.set_bin("unsorted", 10000)
-        self.set_effect(skybox, "effects/skybox.yaml", {
-            "render_shadow": False,
-            "render_envmap": False,
-            "render_voxelize": False,
-            "alpha_testing": False,
-            "normal_mapping": False,
-            "parallax_mapping": False
-        }, 1000)
+        self.set_effect(skybox, "effects/skybox.yaml", self._SKYBOX_EFFECT_OPTIONS, 1000)
         return skybox
 
     def _check_version(self):
@@ -49,6 +49,10 @@ class RenderStage(RPObject):
     produced_pipes = {}
     produced_defines = {}
 
+    # Pipes whose textures may never share their memory with other pipes, e.g.
+    # because their content has to persist over multiple frames
+    exclusive_pipes = []
+
     disabled = False
 
     def __init__(self, pipeline):
@@ -58,6 +62,7 @@ class RenderStage(RPObject):
         self._pipeline = pipeline
         self._active = True
         self._targets = {}
+        self._shader_sources = set()
 
     def create(self):
         """ This method should setup the stage and create the pipes """
@@ -121,6 +126,22 @@ class RenderStage(RPObject):
                 break
         del self._targets[target_key]
 
+    def get_targets(self):
+        """ Returns a list of all targets created by this stage """
+        return list(itervalues(self._targets))
+
+    def replace_texture(self, old_tex, new_tex):
+        """ Replaces all uses of a texture in the targets of this stage by
+        another texture with the same size and format """
+        for target in itervalues(self._targets):
+            target.replace_texture(old_tex, new_tex)
+
+    def estimate_texture_memory(self):
+        """ Returns the estimated amount of video memory in bytes used by the
+        attachments of all targets of this stage """
+        return sum(tex.estimate_texture_memory() for target in itervalues(self._targets)
+                   for tex in itervalues(target.targets))
+
     def _get_shader_handle(self, path, *args):
         """ Returns a handle to a Shader object, containing all sources passed
         as arguments. The path argument will be used to locate shaders if no
@@ -141,8 +162,14 @@ class RenderStage(RPObject):
         # and use the default vertex shader
         if len(args) == 1:
             path_args = ["/$$rp/shader/default_post_process.vert.glsl"] + path_args
+        self._shader_sources.update(path_args)
         return RPLoader.load_shader(*path_args)
 
+    def get_shader_sources(self):
+        """ Returns the paths of all shaders loaded by this stage, this is used
+        to find out which stages have to be reloaded when a shader changed """
+        return set(self._shader_sources)
+
     def _get_plugin_id(self):
         """ Returns the id of the plugin which created this stage. This is done
         by extracting the name of the plugin from the module name """
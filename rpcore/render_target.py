@@ -32,7 +32,7 @@ from panda3d.core import WindowProperties, FrameBufferProperties, GraphicsPipe
 from panda3d.core import LVecBase2i
 
 from rplibs.six.moves import range  # pylint: disable=import-error
-from rplibs.six import iterkeys, itervalues
+from rplibs.six import iterkeys, itervalues, iteritems
 
 from rpcore.globals import Globals
 from rpcore.rpobject import RPObject
@@ -75,6 +75,7 @@ class RenderTarget(RPObject):
         self._source_region = None
         self._active = False
         self._internal_buffer = None
+        self._shader_inputs = {}
         self.sort = None
 
         # Public attributes
@@ -153,15 +154,47 @@ class RenderTarget(RPObject):
         notice the indices start at zero, so the first target has the index 0. """
         return [self._targets[i] for i in sorted(iterkeys(self._targets)) if i.startswith("aux_")]
 
+    @property
+    def size_constraint(self):
+        """ Returns the size constraint of the target, see size """
+        return LVecBase2i(self._size_constraint)
+
+    @property
+    def color_bits(self):
+        """ Returns the bits of the color attachment as a tuple (r, g, b, a) """
+        return self._color_bits
+
     def set_shader_input(self, *args, **kwargs):
         """ Sets a shader input available to the target """
         if self.create_default_region:
             self._source_region.set_shader_input(*args, **kwargs)
+            if len(args) > 1:
+                self._shader_inputs[args[0]] = (args, kwargs)
 
     def set_shader_inputs(self, **kwargs):
         """ Sets shader inputs available to the target """
         if self.create_default_region:
             self._source_region.set_shader_inputs(**kwargs)
+            for name, value in iteritems(kwargs):
+                self._shader_inputs[name] = ((name, value), {})
+
+    def replace_texture(self, old_tex, new_tex):
+        """ Replaces all uses of a texture by another texture, both as attachment
+        and as shader input. The new texture has to have the same size and format.
+        This is used to let the attachments of multiple targets share memory. """
+        attached = False
+        for key, tex in list(iteritems(self._targets)):
+            if tex is old_tex:
+                self._targets[key] = new_tex
+                attached = True
+        if attached and self._internal_buffer:
+            self._internal_buffer.clear_render_textures()
+            self._add_render_textures()
+
+        for args, kwargs in list(itervalues(self._shader_inputs)):
+            if any(arg is old_tex for arg in args[1:]):
+                self.set_shader_input(*[new_tex if arg is old_tex else arg for arg in args],
+                                      **kwargs)
 
     @setter
     def shader(self, shader_obj):
@@ -354,6 +387,24 @@ class RenderTarget(RPObject):
             self.error("Failed to create buffer")
             return
 
+        self._add_render_textures()
+
+        if not self.sort:
+            RenderTarget.CURRENT_SORT += 20
+            self.sort = RenderTarget.CURRENT_SORT
+
+        RenderTarget.NUM_ALLOCATED_BUFFERS += 1
+        self._internal_buffer.set_sort(self.sort)
+        self._internal_buffer.disable_clears()
+        self._internal_buffer.get_display_region(0).disable_clears()
+        self._internal_buffer.get_overlay_display_region().disable_clears()
+        self._internal_buffer.get_overlay_display_region().set_active(False)
+
+        RenderTarget.REGISTERED_TARGETS.append(self)
+        return True
+
+    def _add_render_textures(self):
+        """ Binds all attachments to the internal buffer """
         if self._depth_bits:
             self._internal_buffer.add_render_texture(
                 self.depth_tex, GraphicsOutput.RTM_bind_or_copy,
@@ -375,20 +426,6 @@ class RenderTarget(RPObject):
             self._internal_buffer.add_render_texture(
                 self.aux_tex[i], GraphicsOutput.RTM_bind_or_copy, target_mode)
 
-        if not self.sort:
-            RenderTarget.CURRENT_SORT += 20
-            self.sort = RenderTarget.CURRENT_SORT
-
-        RenderTarget.NUM_ALLOCATED_BUFFERS += 1
-        self._internal_buffer.set_sort(self.sort)
-        self._internal_buffer.disable_clears()
-        self._internal_buffer.get_display_region(0).disable_clears()
-        self._internal_buffer.get_overlay_display_region().disable_clears()
-        self._internal_buffer.get_overlay_display_region().set_active(False)
-
-        RenderTarget.REGISTERED_TARGETS.append(self)
-        return True
-
     def consider_resize(self):
         """ Checks if the target has to get resized, and if this is the case,
         performs the resize. This should be called when the window resolution
@@ -85,6 +85,23 @@ void main() {
                 break;
             }
 
+            #ifdef CMD_store_light_range
+            // Store consecutive lights, this command spans multiple blocks
+            case CMD_store_light_range: {
+                int base_slot = read_int(stack_ptr);
+                int num_lights = read_int(stack_ptr);
+
+                // Copy the data over, the light records are tightly packed
+                for (int i = 0; i < num_lights * 4; ++i) {
+                    imageStore(LightData, base_slot * 4 + i, read_vec4(stack_ptr));
+                }
+
+                // Skip the additional blocks used by this command
+                command_index += (3 + num_lights * 16 + 31) / 32 - 1;
+                break;
+            }
+            #endif
+
             // Remove Light
             case CMD_remove_light: {
 
@@ -113,6 +130,23 @@ void main() {
                 break;
             }
 
+            #ifdef CMD_store_source_range
+            // Store consecutive sources, this command spans multiple blocks
+            case CMD_store_source_range: {
+                int base_slot = read_int(stack_ptr);
+                int num_sources = read_int(stack_ptr);
+
+                // Copy the data over, the source records are tightly packed
+                for (int i = 0; i < num_sources * 5; ++i) {
+                    imageStore(SourceData, base_slot * 5 + i, read_vec4(stack_ptr));
+                }
+
+                // Skip the additional blocks used by this command
+                command_index += (3 + num_sources * 20 + 31) / 32 - 1;
+                break;
+            }
+            #endif
+
             // Remove consecutive sources
             case CMD_remove_sources: {
                 int base_slot = read_int(stack_ptr);
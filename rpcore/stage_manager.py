@@ -24,14 +24,19 @@ THE SOFTWARE.
 
 """
 
-from rplibs.six import iteritems
-from rplibs.yaml import load_yaml_file
+import time
+import collections
 
-from direct.stdpy.file import open
+from rplibs.six import iteritems, itervalues, string_types
+from rplibs.yaml import load_yaml_file
 
 from rpcore.rpobject import RPObject
 from rpcore.gui.pipe_viewer import PipeViewer
 from rpcore.image import Image
+from rpcore.util.generic import write_file_if_changed
+from rpcore.util.startup_tracer import StartupTracer
+from rpcore.util.stage_graph import StageGraph
+from rpcore.util.transient_allocator import TransientAllocator
 from rpcore.util.shader_input_blocks import SimpleInputBlock, GroupedInputBlock
 from rpcore.stages.update_previous_pipes_stage import UpdatePreviousPipesStage
 
@@ -53,6 +58,14 @@ class StageManager(RPObject):
         self.defines = {}
         self.pipeline = pipeline
         self.created = False
+        self.autoconfig_hash = None
+        self.graph = None
+        self.pruned_stages = []
+        self.aliasing_stats = None
+
+        # Time in seconds each stage took to create its targets and to load
+        # its shaders, used for the startup timing report
+        self.stage_timings = collections.OrderedDict()
 
         self._load_stage_order()
 
@@ -231,9 +244,21 @@ class StageManager(RPObject):
         self._prepare_stages()
 
         for stage in self.stages:
+            start_time = time.time()
             stage.create()
             stage.handle_window_resize()
+            end_time = time.time()
+            StartupTracer.add_span(stage.stage_id + ".create", "stage", start_time, end_time)
+            self._get_stage_timings(stage)["create"] += end_time - start_time
 
+        # Unused stages get pruned before aliasing, so that only live stages
+        # share their textures, and before binding, so pruned stages never get
+        # bound. Pipes are bound after aliasing, since it replaces textures.
+        self._analyze_stage_graph()
+        if self.pipeline.settings["pipeline.alias_render_targets"]:
+            self._alias_pipe_textures()
+
+        for stage in self.stages:
             # Rely on the methods to print an appropriate error message
             if not self._bind_pipes_to_stage(stage):
                 continue
@@ -244,12 +269,170 @@ class StageManager(RPObject):
         self._create_previous_pipes()
         self._apply_future_bindings()
 
+    def _alias_pipe_textures(self):
+        """ Lets the color attachments of fullscreen targets share their memory,
+        as long as the pipes they produce are never used at the same time. The
+        lifetime of a pipe lasts from the stage producing it to the last stage
+        requiring it. Pipes which are used from another frame, bound as input,
+        declared as exclusive or still present after the last stage are never
+        aliased. All aliased pipes get logged, since stages accessing pipe
+        textures in other ways would see the content of other pipes. """
+        exclusive = set()
+        excluded_textures = []
+        for stage in self.stages:
+            exclusive.update(stage.exclusive_pipes)
+            excluded_textures.extend(itervalues(stage.produced_inputs))
+            for pipe in stage.required_pipes:
+                if pipe.startswith(StageGraph.PREFIXES):
+                    exclusive.add(pipe.split("::")[-1])
+
+        # Stages may produce the same texture under multiple pipe names, e.g. the
+        # ambient stage also produces PostAmbientScene, so exclude by texture
+        for stage in self.stages:
+            excluded_textures.extend(tex for pipe, tex in iteritems(stage.produced_pipes)
+                                     if pipe in exclusive)
+
+        # Find the first and last use of each pipe texture
+        lifetimes = {}
+        producers = {}
+        pipe_names = {}
+        for index, stage in enumerate(self.stages):
+            for pipe in stage.required_pipes:
+                if pipe in producers:
+                    lifetimes[id(producers[pipe])][2] = index
+            for pipe, tex in iteritems(stage.produced_pipes):
+                target = self._find_fullscreen_target(stage, tex)
+                if target is None or any(tex is i for i in excluded_textures):
+                    producers.pop(pipe, None)
+                    continue
+                lifetimes.setdefault(id(tex), [tex, index, index, stage, target])
+                pipe_names.setdefault(id(tex), []).append(pipe)
+                producers[pipe] = tex
+
+        # The final version of each pipe stays accessible via the pipes
+        for tex in itervalues(producers):
+            lifetimes[id(tex)][2] = len(self.stages)
+
+        allocator = TransientAllocator()
+        for tex, first_use, last_use, stage, target in itervalues(lifetimes):
+            key = (tuple(target.size_constraint), target.color_bits, tex.get_format(),
+                   tex.get_component_type(), tex.get_minfilter(), tex.get_magfilter(),
+                   tex.get_wrap_u(), tex.get_wrap_v())
+            allocator.add_resource(tex, key, first_use, last_use, tex.estimate_texture_memory())
+
+        def describe(tex):
+            return "{} of {}".format("/".join(pipe_names[id(tex)]), lifetimes[id(tex)][3].stage_id)
+
+        for tex, shared_tex in allocator.allocate():
+            self.debug("Pipe", describe(tex), "shares its texture with", describe(shared_tex))
+            lifetimes[id(tex)][3].replace_texture(tex, shared_tex)
+
+        self.aliasing_stats = allocator.get_stats()
+        self.debug("Aliased {resources} pipe textures to {slots} textures: {summed_mib:.1f} MiB "
+                   "summed, {allocated_mib:.1f} MiB allocated, {peak_mib:.1f} MiB peak".format(
+                       summed_mib=self.aliasing_stats["summed"] / (1024**2),
+                       allocated_mib=self.aliasing_stats["allocated"] / (1024**2),
+                       peak_mib=self.aliasing_stats["peak"] / (1024**2), **self.aliasing_stats))
+
+    def _find_fullscreen_target(self, stage, tex):
+        """ Returns the target of the stage which has the given texture as color
+        attachment, in case the target size is relative to the screen size """
+        for target in stage.get_targets():
+            if target.targets.get("color") is tex and target.size_constraint.x < 0 and \
+               target.size_constraint.y < 0:
+                return target
+        return None
+
+    def _analyze_stage_graph(self):
+        """ Builds the dependency graph of all stages and checks the order
+        from the stages.yaml against it. The stages are still rendered in that
+        order, since it also defines the sort of the created targets. In case
+        pipeline.prune_unused_stages is set, all stages whose outputs never reach
+        the final stage get removed. """
+        self.graph = StageGraph(self.stages, self._stage_order)
+        for problem in self.graph.validate():
+            self.warn(problem)
+
+        if self.pipeline.settings["pipeline.prune_unused_stages"]:
+            self._prune_unused_stages()
+        self.debug("Stage graph:\n" + self.format_stage_graph())
+
+    def _prune_unused_stages(self):
+        """ Removes all stages which do not contribute to the final image. Stages
+        without any outputs are kept, since they only exist for their side effects.
+        The defines of the pruned stages are still registered, since the graph
+        does not track which shaders use them. The pruned stages also get
+        unlinked from their plugin, so they are not reloaded or updated anymore. """
+        roots = [stage for stage in self.stages if stage.stage_id == "FinalStage" or
+                 not StageGraph.get_outputs(stage)]
+        live = self.graph.get_live_stages(roots)
+        for stage in list(self.stages):
+            if stage in live:
+                continue
+            memory = stage.estimate_texture_memory()
+            self.pruned_stages.append((stage.stage_id, memory))
+            stage.active = False
+            for target in stage.get_targets():
+                stage.remove_target(target)
+            self.stages.remove(stage)
+            self.defines.update(stage.produced_defines)
+
+            plugin = self.pipeline.plugin_mgr.instances.get(
+                stage._get_plugin_id())  # pylint: disable=protected-access
+            if plugin is not None:
+                plugin.remove_stage(stage)
+
+        if self.pruned_stages:
+            self.debug("Pruned", len(self.pruned_stages), "unused stages, saving",
+                       "{:.1f} MiB".format(sum(i[1] for i in self.pruned_stages) / (1024**2)))
+
+    def format_stage_graph(self):
+        """ Returns a human readable dump of the stage graph, including the
+        pruned stages and their estimated video memory """
+        if self.graph is None:
+            return "Stages not created yet"
+        output = self.graph.format()
+        for stage_id, memory in self.pruned_stages:
+            output += "\n  Pruned {} ({:.1f} MiB)".format(stage_id, memory / (1024**2))
+        return output
+
     def reload_shaders(self):
         """ This pass sets the shaders to all passes and also generates the
         shader configuration """
         self.write_autoconfig()
         for stage in self.stages:
-            stage.reload_shaders()
+            self.reload_stage(stage)
+
+    def reload_stage(self, stage):
+        """ Reloads the shaders of a single stage, without regenerating the
+        shader configuration. The stage can be given as instance or stage id. """
+        if isinstance(stage, string_types):
+            stage = next((i for i in self.stages if i.stage_id == stage), None)
+            if stage is None:
+                self.error("Cannot reload unkown stage")
+                return
+        start_time = time.time()
+        stage.reload_shaders()
+        end_time = time.time()
+        StartupTracer.add_span(stage.stage_id + ".reload_shaders", "stage", start_time, end_time)
+        self._get_stage_timings(stage)["shaders"] = end_time - start_time
+
+    def _get_stage_timings(self, stage):
+        """ Returns the timing entry of a stage, creating it if necessary """
+        if stage.stage_id not in self.stage_timings:
+            self.stage_timings[stage.stage_id] = {
+                "plugin": stage._get_plugin_id(),  # pylint: disable=protected-access
+                "create": 0.0, "shaders": 0.0}
+        return self.stage_timings[stage.stage_id]
+
+    def get_plugin_timings(self):
+        """ Returns the accumulated stage timings of each plugin, as a dictionary
+        of plugin id to (create time, shader time) in seconds """
+        result = collections.OrderedDict()
+        for timings in self.stage_timings.values():
+            create, shaders = result.get(timings["plugin"], (0.0, 0.0))
+            result[timings["plugin"]] = (create + timings["create"], shaders + timings["shaders"])
+        return result
 
     def update(self):
         """ Calls the update method for each registered stage. Inactive stages
@@ -266,8 +449,8 @@ class StageManager(RPObject):
 
     def write_autoconfig(self):
         """ Writes the shader auto config, based on the defines specified by the
-        different stages """
-        self.debug("Writing shader config")
+        different stages. The file is only written if its content changed,
+        the hash of the content is stored in autoconfig_hash. """
 
         # Generate autoconfig as string
         output = "#pragma once\n\n"
@@ -280,7 +463,8 @@ class StageManager(RPObject):
             output += "#define " + key + " " + str(value) + "\n"
 
         try:
-            with open("/$$rptemp/$$pipeline_shader_config.inc.glsl", "w") as handle:
-                handle.write(output)
+            self.autoconfig_hash, written = write_file_if_changed(
+                "/$$rptemp/$$pipeline_shader_config.inc.glsl", output)
+            self.debug("Wrote shader config" if written else "Shader config is unchanged")
         except IOError as msg:
             self.error("Error writing shader autoconfig:", msg)
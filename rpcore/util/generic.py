@@ -31,6 +31,8 @@ import time
 import hashlib
 
 from panda3d.core import PStatCollector, Mat4, Point4, Vec3
+from direct.stdpy.file import open, isfile
+
 from rpcore.globals import Globals
 
 
@@ -44,6 +46,21 @@ def rgb_from_string(text, min_brightness=0.6):
             min_brightness + b / 255.0 * neg_inf)
 
 
+def write_file_if_changed(filename, content):
+    """ Writes the content to the given file, unless the file already has exactly
+    this content. This keeps the timestamps of generated files stable, so that
+    caches depending on them stay valid. Returns a tuple of the sha1 hash of
+    the content and whether the file was written. """
+    content_hash = hashlib.sha1(content.encode("utf-8")).hexdigest()
+    if isfile(filename):
+        with open(filename, "r") as handle:
+            if handle.read() == content:
+                return content_hash, False
+    with open(filename, "w") as handle:
+        handle.write(content)
+    return content_hash, True
+
+
 def profile(func):
     """ Handy decorator which can be used to profile a function with pstats """
     collector_name = "Debug:%s" % func.__name__
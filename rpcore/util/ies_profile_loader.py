@@ -30,7 +30,10 @@ THE SOFTWARE.
 
 from __future__ import print_function
 
+import io
+import os
 import re
+import hashlib
 
 from panda3d.core import PTAFloat, Filename, SamplerState, VirtualFileSystem
 from panda3d.core import get_model_path
@@ -38,7 +41,7 @@ from direct.stdpy.file import open, join, isfile
 
 from rplibs.six.moves import range  # pylint: disable=import-error
 
-from rpcore.native import IESDataset
+from rpcore.native import IESDataset, NATIVE_CXX_LOADED
 from rpcore.image import Image
 from rpcore.rpobject import RPObject
 
@@ -52,7 +55,15 @@ class IESProfileLoader(RPObject):
 
     """ Loader class to load .IES files and create an IESDataset from it.
     It generates a LUT for each loaded ies profile which is used by the lighting
-    pipeline later on. """
+    pipeline later on.
+
+    When a write path is set, the generated LUTs are additionally stored on
+    disk, keyed by the hash of the profile contents and the LUT resolution, so
+    that later starts can copy them into the dataset texture directly. This
+    requires the python implementation and numpy. """
+
+    # Increase this when the LUT generation changes, to invalidate the disk cache
+    LUT_CACHE_VERSION = 1
 
     # Supported IES Profiles
     PROFILES = [
@@ -73,8 +84,33 @@ class IESProfileLoader(RPObject):
         self._pipeline = pipeline
         self._entries = []
         self._max_entries = 32
+        self._cache_hits = 0
+        self._cache_misses = 0
         self._create_storage()
 
+    @property
+    def cache_hits(self):
+        """ Returns how many profiles were loaded from the LUT cache """
+        return self._cache_hits
+
+    @property
+    def cache_misses(self):
+        """ Returns how many profiles had to be parsed and generated """
+        return self._cache_misses
+
+    @property
+    def cache_dir(self):
+        """ Returns the directory where generated LUTs are stored, or None if
+        LUTs cannot be cached """
+        write_path = self._pipeline.mount_mgr.write_path
+        if write_path is None or NATIVE_CXX_LOADED:
+            return None
+        try:
+            import numpy  # noqa # pylint: disable=unused-variable
+        except ImportError:
+            return None
+        return os.path.join(Filename(write_path).to_os_specific(), "ies_cache")
+
     def _create_storage(self):
         """ Internal method to create the storage for the profile dataset textures """
         self._storage_tex = Image.create_3d("IESDatasets", 512, 512, self._max_entries, "R16")
@@ -113,9 +149,23 @@ class IESProfileLoader(RPObject):
             # TODO: Could remove unused profiles here or regenerate texture
             self.warn("Cannot load IES Profile, too many loaded! (Maximum: 32)")
 
+        try:
+            with open(fname, "rb") as handle:
+                content = handle.read()
+        except IOError as msg:
+            self.error("Failed to open", fname, ":", msg)
+            return -1
+
+        # Check if the LUT was generated previously
+        cache_file = self._get_cache_file(content)
+        if cache_file is not None and self._load_from_cache(cache_file, len(self._entries)):
+            self._cache_hits += 1
+            self._entries.append(fname)
+            return len(self._entries) - 1
+
         # Try loading the dataset, and see what happes
         try:
-            dataset = self._load_and_parse_file(fname)
+            dataset = self._load_and_parse_file(fname, content)
         except InvalidIESProfileException as msg:
             self.warn("Failed to load profile from", filename, ":", msg)
             return -1
@@ -124,24 +174,81 @@ class IESProfileLoader(RPObject):
             return -1
 
         # Dataset was loaded successfully, now copy it
-        dataset.generate_dataset_texture_into(self._storage_tex, len(self._entries))
+        self._cache_misses += 1
+        if cache_file is not None:
+            self._generate_and_cache(dataset, cache_file, len(self._entries))
+        else:
+            dataset.generate_dataset_texture_into(self._storage_tex, len(self._entries))
         self._entries.append(fname)
 
         return len(self._entries) - 1
 
-    def _load_and_parse_file(self, pth):
-        """ Loads a .IES file from a given filename, returns an IESDataset
-        which is used by the load function later on. """
-        self.debug("Loading ies profile from", pth)
-
-        try:
-            with open(pth, "r") as handle:
-                lines = handle.readlines()
-        except IOError as msg:
-            self.error("Failed to open", pth, ":", msg)
+    def _get_cache_file(self, content):
+        """ Returns the path of the cached LUT for the given profile contents,
+        or None if LUTs cannot be cached """
+        cache_dir = self.cache_dir
+        if cache_dir is None:
             return None
+        key = hashlib.sha1(content)
+        key.update("-v{}-{}x{}".format(
+            self.LUT_CACHE_VERSION, self._storage_tex.get_x_size(),
+            self._storage_tex.get_y_size()).encode("ascii"))
+        return os.path.join(cache_dir, key.hexdigest() + ".npy")
+
+    def _load_from_cache(self, cache_file, layer_index):
+        """ Copies a cached LUT into the given layer of the dataset texture,
+        returns False if there is no valid cache entry """
+        import numpy
+        from rpcore.pynative.ies_dataset import write_lut_into
+
+        if not os.path.isfile(cache_file):
+            return False
+        try:
+            lut = numpy.load(cache_file)
+        except (IOError, OSError, ValueError) as msg:
+            self.warn("Ignoring invalid cached ies profile", cache_file, ":", msg)
+            return False
+
+        expected_shape = (self._storage_tex.get_y_size(), self._storage_tex.get_x_size())
+        if lut.shape != expected_shape:
+            self.warn("Ignoring cached ies profile with invalid size", cache_file)
+            return False
+
+        self.debug("Loading cached ies profile from", cache_file)
+        write_lut_into(self._storage_tex, layer_index, lut.astype(numpy.float32))
+        return True
+
+    def _generate_and_cache(self, dataset, cache_file, layer_index):
+        """ Generates the LUT of a dataset into the given layer of the dataset
+        texture, and stores it in the cache """
+        import numpy
+        from rpcore.pynative.ies_dataset import write_lut_into
+
+        lut = dataset.generate_dataset_lut(
+            self._storage_tex.get_x_size(), self._storage_tex.get_y_size())
+        write_lut_into(self._storage_tex, layer_index, lut)
+
+        # The LUT is stored as half floats, which matches the precision of
+        # the R16 dataset texture. Write to a temporary file first, so that
+        # other instances never read a partially written file.
+        temp_file = cache_file + ".{}.tmp".format(os.getpid())
+        try:
+            if not os.path.isdir(os.path.dirname(cache_file)):
+                os.makedirs(os.path.dirname(cache_file))
+            with io.open(temp_file, "wb") as handle:
+                numpy.save(handle, lut.astype(numpy.float16))
+            if os.path.isfile(cache_file):
+                os.remove(cache_file)
+            os.rename(temp_file, cache_file)
+        except (IOError, OSError) as msg:
+            self.warn("Failed to write ies profile cache", cache_file, ":", msg)
+
+    def _load_and_parse_file(self, pth, content):
+        """ Parses the contents of a .IES file with the given filename, returns
+        an IESDataset which is used by the load function later on. """
+        self.debug("Loading ies profile from", pth)
 
-        lines = [i.strip() for i in lines]
+        lines = [i.strip() for i in content.decode("latin-1").splitlines()]
 
         # Parse version header
         self._check_version_header(lines.pop(0))
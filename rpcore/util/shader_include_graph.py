@@ -0,0 +1,173 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import re
+import posixpath
+
+from direct.stdpy.file import listdir, isdir, isfile, open
+
+from rpcore.rpobject import RPObject
+
+
+class ShaderIncludeGraph(RPObject):
+
+    """ Tracks which shaders include which other shaders. The graph is built by
+    parsing the '#pragma include' directives of all shaders, and resolving them
+    the same way Panda3D does: first relative to the including file, and then
+    using the model path. This is used to find out which shaders have to be
+    reloaded when a single file changed. """
+
+    INCLUDE_REGEX = re.compile(r'^\s*#pragma\s+include\s+"([^"]+)"')
+
+    # Same order as the model path setup in the MountManager
+    SEARCH_PATHS = ("/$$rptemp", "/$$rp/shader", "/$$rp")
+
+    def __init__(self):
+        """ Constructs a new empty include graph, use scan() to fill it """
+        RPObject.__init__(self)
+        self._includes = {}
+        self._included_by = {}
+        self.unresolved = {}
+
+    @property
+    def files(self):
+        """ Returns a sorted list of all files in the graph """
+        return sorted(self._includes)
+
+    def scan(self):
+        """ Adds all shaders of the pipeline and its plugins to the graph, as
+        well as the generated shader configuration files """
+        self.scan_directory("/$$rp/shader")
+        for plugin_id in listdir("/$$rp/rpplugins"):
+            shader_dir = posixpath.join("/$$rp/rpplugins", plugin_id, "shader")
+            if isdir(shader_dir):
+                self.scan_directory(shader_dir)
+        for entry in listdir("/$$rptemp"):
+            if entry.startswith("$$") and entry.endswith(".inc.glsl"):
+                self.add_file(posixpath.join("/$$rptemp", entry))
+
+    def scan_directory(self, directory):
+        """ Recursively adds all shaders of the given directory """
+        for entry in listdir(directory):
+            path = posixpath.join(directory, entry)
+            if isdir(path):
+                self.scan_directory(path)
+            elif entry.endswith(".glsl"):
+                self.add_file(path)
+
+    def add_file(self, path):
+        """ Adds a shader to the graph, in case it is not present yet. Included
+        files are added as well. Returns the normalized path of the shader. """
+        path = self.normalize(path)
+        if path not in self._includes:
+            self.update_file(path)
+        return path
+
+    def update_file(self, path):
+        """ Parses the includes of a shader again, this should be called when
+        the shader changed. Returns the normalized path of the shader. """
+        path = self.normalize(path)
+        for include in self._includes.get(path, ()):
+            self._included_by[include].discard(path)
+        self._includes[path] = set()
+        self._included_by.setdefault(path, set())
+        self.unresolved.pop(path, None)
+
+        if not isfile(path):
+            return path
+
+        with open(path, "r") as handle:
+            content = handle.read()
+
+        for line in content.splitlines():
+            match = self.INCLUDE_REGEX.match(line)
+            if not match:
+                continue
+            include = self.resolve(match.group(1), path)
+            if include is None:
+                self.unresolved.setdefault(path, []).append(match.group(1))
+                continue
+            self._includes[path].add(include)
+            self._included_by.setdefault(include, set()).add(path)
+            if include not in self._includes:
+                self.update_file(include)
+        return path
+
+    def get_includes(self, path):
+        """ Returns all files the shader directly includes """
+        return set(self._includes.get(self.normalize(path), ()))
+
+    def get_dependents(self, paths):
+        """ Returns all files which transitively include any of the given files,
+        including the given files themselves """
+        pending = [self.normalize(i) for i in paths]
+        result = set(pending)
+        while pending:
+            for dependent in self._included_by.get(pending.pop(), ()):
+                if dependent not in result:
+                    result.add(dependent)
+                    pending.append(dependent)
+        return result
+
+    def resolve(self, path, including_file=None):
+        """ Resolves a shader path the same way Panda3D resolves includes.
+        Returns the normalized path, or None if the file was not found. """
+        path = path.replace("\\", "/")
+        if path.startswith("/"):
+            return self.normalize(path)
+        candidates = [posixpath.join(i, path) for i in self.SEARCH_PATHS]
+        if including_file is not None:
+            candidates.insert(0, posixpath.join(posixpath.dirname(including_file), path))
+        for candidate in candidates:
+            if isfile(candidate):
+                return self.normalize(candidate)
+        return None
+
+    def normalize(self, path):
+        """ Converts a path to the form used as key in the graph """
+        path = path.replace("\\", "/")
+        if not path.startswith("/"):
+            resolved = self.resolve(path)
+            if resolved is not None:
+                return resolved
+        return posixpath.normpath(path)
+
+    def format(self):
+        """ Returns a human readable representation of the graph """
+        lines = []
+        for path in self.files:
+            lines.append(path)
+            for include in sorted(self._includes[path]):
+                lines.append("    -> " + include)
+            for include in self.unresolved.get(path, ()):
+                lines.append("    -> " + include + " (not found)")
+        return "\n".join(lines)
+
+    def get_stats(self):
+        """ Returns the amount of files, includes and unresolved includes """
+        num_includes = sum(len(i) for i in self._includes.values())
+        num_unresolved = sum(len(i) for i in self.unresolved.values())
+        return len(self._includes), num_includes, num_unresolved
@@ -0,0 +1,161 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import hashlib
+import threading
+
+from direct.stdpy.file import open
+
+from rpcore.rpobject import RPObject
+
+
+class ShaderTemplate(RPObject):
+
+    """ A pre-parsed shader template, as used by the effects. The template is
+    split into literal chunks and hook slots once, so that expanding it only
+    has to join the chunks and the injected code. Templates are cached per
+    path, use ShaderTemplate.load() to construct them. The cache may be
+    accessed from multiple threads, see Effect.load_many(). """
+
+    _CACHE = {}
+    _LOCK = threading.Lock()
+
+    @classmethod
+    def load(cls, template_src):
+        """ Returns the compiled template for a given path, reading and parsing
+        the template only the first time """
+        with cls._LOCK:
+            if template_src not in cls._CACHE:
+                with open(template_src, "r") as handle:
+                    content = handle.read()
+                cls._CACHE[template_src] = cls(template_src, content)
+            return cls._CACHE[template_src]
+
+    @classmethod
+    def clear_cache(cls):
+        """ Clears the template cache, so that all templates are read again """
+        with cls._LOCK:
+            cls._CACHE.clear()
+
+    def __init__(self, template_src, content):
+        """ Constructs a new template, this is a private constructor and
+        should not be called. Instead, use ShaderTemplate.load() """
+        RPObject.__init__(self)
+        self.template_src = template_src
+        self.content = content
+        self.content_hash = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        self._chunks = []
+        self._compile()
+
+    def _compile(self):
+        """ Splits the template into chunks. Each chunk is either a string of
+        literal lines, or a (hook name, indent, in_main) tuple for a hook """
+        literal_lines = []
+
+        # Store whether we are in the main function already - we need this
+        # to properly insert scoped code blocks
+        in_main = False
+
+        for line in self.content.splitlines(True):
+            stripped_line = line.strip().lower()
+
+            # Check if we are already in the main function
+            if "void main()" in stripped_line:
+                in_main = True
+
+            # Check if the current line is a hook
+            if stripped_line.startswith("%") and stripped_line.endswith("%"):
+
+                # If the line is a hook, get the hook name and save the
+                # indent so we can indent all injected lines properly.
+                if literal_lines:
+                    self._chunks.append("\n".join(literal_lines))
+                    literal_lines = []
+                indent = " " * (len(line) - len(line.lstrip()))
+                self._chunks.append((stripped_line[1:-1], indent, in_main))
+            else:
+                literal_lines.append(line.rstrip())
+
+        if literal_lines:
+            self._chunks.append("\n".join(literal_lines))
+
+    def expand(self, cache_key, injections):
+        """ Generates the shader source by inserting the code injection
+        definitions into the hooks of the template. Injections which were
+        inserted are removed from the injections dict. """
+        parsed_lines = ["\n\n"]
+        addline = parsed_lines.append
+
+        addline("/* Compiled Shader Template")
+        addline(" * generated from: '" + self.template_src + "'")
+        addline(" * cache key: '" + cache_key + "'")
+        addline(" *")
+        addline(" * !!! Autogenerated, do not edit! Your changes will be lost. !!!")
+        addline(" */\n\n")
+
+        for chunk in self._chunks:
+            if isinstance(chunk, str):
+                addline(chunk)
+                continue
+
+            # Directly remove the value from the list so we can check which
+            # hooks were not found in the template
+            hook_name, indent, in_main = chunk
+            insertions = injections.pop(hook_name, None)
+            if not insertions:
+                continue
+
+            # When we are in the main function, we have to make sure we
+            # use a seperate scope, so there are no conflicts with variable
+            # declarations
+            addline(indent + "/* Hook: " + hook_name + " */" + (" {" if in_main else ""))
+
+            for line_to_insert in insertions:
+                if line_to_insert is None:
+                    self.warn("Empty insertion '" + hook_name + "'")
+                    continue
+
+                if not isinstance(line_to_insert, str):
+                    self.warn("Invalid line type: ", line_to_insert)
+                    continue
+
+                # Dont indent defines and pragmas
+                if line_to_insert.startswith("#"):
+                    addline(line_to_insert)
+                else:
+                    addline(indent + line_to_insert)
+
+            if in_main:
+                addline(indent + "}")
+
+        # Add a closing newline to the file
+        addline("")
+
+        # Warn the user about all unused hooks
+        for key in injections:
+            self.warn("Hook '" + key + "' not found in template '" + self.template_src + "'!")
+
+        return "\n".join(parsed_lines)
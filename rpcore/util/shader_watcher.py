@@ -0,0 +1,126 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import os
+import time
+import threading
+import collections
+
+from rpcore.rpobject import RPObject
+
+
+class ShaderWatcher(RPObject):
+
+    """ Watches directories for changed shaders and effects. A background
+    thread polls the modification times of all files, and collects changed
+    files until no further change happened for a short time, so that saving
+    multiple files at once only triggers a single reload. The changes can
+    then be fetched from the main thread using get_changes(). """
+
+    def __init__(self, interval=0.25, debounce=0.2):
+        """ Constructs a new watcher, polling every interval seconds, and
+        reporting changes after no further change happened for debounce seconds """
+        RPObject.__init__(self)
+        self._interval = interval
+        self._debounce = debounce
+        self._directories = []
+        self._stamps = {}
+        self._pending = {}
+        self._last_change = 0.0
+        self._ready = collections.deque()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add_directory(self, directory, virtual_dir, extensions):
+        """ Adds a directory to watch recursively. Changed files are reported
+        relative to virtual_dir, so they can be used with the VFS. Only files
+        ending with one of the given extensions are watched. """
+        self._directories.append((directory, virtual_dir, tuple(extensions)))
+
+    def start(self):
+        """ Takes a snapshot of all watched files and starts the watcher thread """
+        self._stamps = self._collect_stamps()
+        self.debug("Watching", len(self._stamps), "files for changes")
+        self._thread = threading.Thread(target=self._run, name="RP_ShaderWatcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """ Stops the watcher thread """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get_changes(self):
+        """ Returns a tuple of the changed files and the time when the first
+        of them was changed, or None if no files changed. Files which are
+        still being changed are not reported yet. """
+        if not self._ready:
+            return None
+        files, first_change = set(), None
+        while self._ready:
+            batch_files, batch_time = self._ready.popleft()
+            files.update(batch_files)
+            first_change = batch_time if first_change is None else min(first_change, batch_time)
+        return sorted(files), first_change
+
+    def _run(self):
+        """ Main method of the watcher thread """
+        while not self._stop_event.wait(self._interval):
+            self._poll()
+
+    def _poll(self):
+        """ Compares the current modification times against the last snapshot,
+        and reports the pending changes once they are settled """
+        now = time.time()
+        stamps = self._collect_stamps()
+        for path in set(stamps) | set(self._stamps):
+            if stamps.get(path) != self._stamps.get(path):
+                self._pending.setdefault(path, now)
+                self._last_change = now
+        self._stamps = stamps
+
+        if self._pending and now - self._last_change >= self._debounce:
+            self._ready.append((list(self._pending), min(self._pending.values())))
+            self._pending = {}
+
+    def _collect_stamps(self):
+        """ Returns the modification time and size of all watched files """
+        stamps = {}
+        for directory, virtual_dir, extensions in self._directories:
+            for root, _, files in os.walk(directory):
+                rel_root = os.path.relpath(root, directory).replace("\\", "/")
+                for filename in files:
+                    if not filename.endswith(extensions):
+                        continue
+                    try:
+                        stat = os.stat(os.path.join(root, filename))
+                    except OSError:
+                        continue
+                    rel_path = filename if rel_root == "." else rel_root + "/" + filename
+                    stamps[virtual_dir + "/" + rel_path] = (stat.st_mtime, stat.st_size)
+        return stamps
@@ -34,8 +34,13 @@ class SmoothConnectedCurve(object):
     """ Interface to a curve which also manages connecting the end of the
     curve with the beginning. """
 
+    # Incremented whenever any curve gets rebuilt, so users of baked curves
+    # can cheaply check whether they have to bake them again
+    REVISION = 0
+
     def __init__(self):
         self._curve = None
+        self._lut = None
         self._modified = False
         self._border_points = 1
         self._color = (0, 0, 0)
@@ -119,6 +124,8 @@ class SmoothConnectedCurve(object):
         fitter.compute_tangents(1.0)
 
         self._curve = fitter.make_hermite()
+        self._lut = None
+        SmoothConnectedCurve.REVISION += 1
 
     def set_cv_value(self, index, x_value, y_value):
         """ Updates the cv point at the given index """
@@ -133,6 +140,13 @@ class SmoothConnectedCurve(object):
         self._curve.evaluate_xyz(offset, point)
         return max(0.0, min(1.0, point.y))
 
+    def get_lut(self, num_samples):
+        """ Returns a list of num_samples values of the curve, sampled uniformly
+        from 0 to 1 (both inclusive). The list is cached until the curve changes. """
+        if self._lut is None or len(self._lut) != num_samples:
+            self._lut = [self.get_value(i / float(num_samples - 1)) for i in range(num_samples)]
+        return self._lut
+
     def serialize(self):
         """ Returns the value of the curve as yaml list """
         points = ["[{:5.10f},{:5.10f}]".format(float(a), float(b)) for a, b in self._cv_points]
@@ -0,0 +1,178 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import heapq
+
+from rplibs.six import iterkeys
+
+from rpcore.rpobject import RPObject
+
+
+class StageGraph(RPObject):
+
+    """ Dependency graph of the render stages. The graph is built from the
+    pipes and inputs each stage requires and produces: a stage depends on the
+    last stage before it which produced a required pipe. Pipes from the previous
+    frame ('PreviousFrame::') and future pipes ('FuturePipe::') are tracked as
+    frame edges, they keep the producing stage alive but do not affect the order
+    of the stages within a frame.
+
+    The graph is built from the created stages, since most stages only know
+    their produced pipes after their targets got created. """
+
+    PREFIXES = ("PreviousFrame::", "FuturePipe::")
+
+    def __init__(self, stages, stage_order):
+        """ Builds the graph from the given stages, which should be sorted by
+        their index in the stage order """
+        RPObject.__init__(self)
+        self.stages = list(stages)
+        self.edges = set()
+        self.frame_edges = set()
+        self.violations = []
+        self._stage_order = stage_order
+        self._build()
+
+    @staticmethod
+    def get_outputs(stage):
+        """ Returns the names of all pipes and inputs the stage produces """
+        return set(iterkeys(stage.produced_pipes)) | set(iterkeys(stage.produced_inputs))
+
+    @classmethod
+    def get_requirements(cls, stage):
+        """ Returns a list of (name, from_other_frame) tuples of all pipes and
+        inputs the stage requires """
+        result = []
+        for name in list(stage.required_pipes) + list(stage.required_inputs):
+            for prefix in cls.PREFIXES:
+                if name.startswith(prefix):
+                    result.append((name[len(prefix):], True))
+                    break
+            else:
+                result.append((name, False))
+        return result
+
+    def _build(self):
+        """ Internal method to connect all stages """
+        producers = {}
+        for stage in self.stages:
+            for name in self.get_outputs(stage):
+                producers.setdefault(name, []).append(stage)
+
+        index = {stage: i for i, stage in enumerate(self.stages)}
+        for stage in self.stages:
+            for name, from_other_frame in self.get_requirements(stage):
+                # Requirements without a producing stage are common inputs,
+                # provided by the pipeline itself
+                candidates = producers.get(name, [])
+                if not candidates:
+                    continue
+                if from_other_frame:
+                    self.frame_edges.add((candidates[-1], stage))
+                    continue
+                earlier = [i for i in candidates if index[i] < index[stage]]
+                if earlier:
+                    self.edges.add((earlier[-1], stage))
+                else:
+                    self.violations.append("{} requires {}, which is only produced "
+                                           "later by {}".format(
+                                               stage.stage_id, name, candidates[0].stage_id))
+
+    def get_dependencies(self, stage, include_frame_edges=False):
+        """ Returns all stages the given stage directly depends on """
+        edges = self.edges | self.frame_edges if include_frame_edges else self.edges
+        return set(src for src, dest in edges if dest is stage)
+
+    def topological_sort(self):
+        """ Sorts the stages so that every stage comes after the stages it depends
+        on. Stages without dependencies between them are sorted by their index in
+        the stage order. Returns None if the graph contains a cycle. """
+        def priority(stage):
+            if stage.stage_id in self._stage_order:
+                return self._stage_order.index(stage.stage_id)
+            return len(self._stage_order)
+
+        in_degree = {stage: 0 for stage in self.stages}
+        for _, dest in self.edges:
+            in_degree[dest] += 1
+
+        # Use the position in the list as second key, so stages never get compared
+        queue = [(priority(stage), i, stage) for i, stage in enumerate(self.stages)
+                 if in_degree[stage] == 0]
+        heapq.heapify(queue)
+        position = {stage: i for i, stage in enumerate(self.stages)}
+        result = []
+        while queue:
+            stage = heapq.heappop(queue)[2]
+            result.append(stage)
+            for src, dest in self.edges:
+                if src is stage:
+                    in_degree[dest] -= 1
+                    if in_degree[dest] == 0:
+                        heapq.heappush(queue, (priority(dest), position[dest], dest))
+
+        if len(result) != len(self.stages):
+            return None
+        return result
+
+    def validate(self):
+        """ Checks the stage order against the graph, and returns a list of
+        all problems found. An empty list means the order is valid. """
+        problems = list(self.violations)
+        sorted_stages = self.topological_sort()
+        if sorted_stages is None:
+            problems.append("The stage graph contains a cycle")
+        elif sorted_stages != self.stages:
+            problems.append("Stage order differs from the dependency order: {}".format(
+                ", ".join(stage.stage_id for stage in sorted_stages)))
+        return problems
+
+    def get_live_stages(self, roots):
+        """ Returns all stages whose outputs reach one of the given root stages,
+        including the root stages themselves """
+        live = set()
+        pending = [stage for stage in self.stages if stage in roots]
+        edges = self.edges | self.frame_edges
+        while pending:
+            stage = pending.pop()
+            if stage in live:
+                continue
+            live.add(stage)
+            pending.extend(src for src, dest in edges if dest is stage)
+        return live
+
+    def format(self):
+        """ Returns a human readable representation of the graph, listing
+        the dependencies of each stage """
+        lines = []
+        for stage in self.stages:
+            deps = sorted(i.stage_id for i in self.get_dependencies(stage))
+            frame_deps = sorted(src.stage_id for src, dest in self.frame_edges if dest is stage)
+            line = "  {} <- {}".format(stage.stage_id, ", ".join(deps) or "-")
+            if frame_deps:
+                line += " (last frame: {})".format(", ".join(frame_deps))
+            lines.append(line)
+        return "\n".join(lines)
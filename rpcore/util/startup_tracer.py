@@ -0,0 +1,135 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from __future__ import division
+
+import os
+import json
+import time
+import threading
+
+__all__ = ("StartupTracer",)
+
+
+class _TracedSpan(object):  # pylint: disable=too-few-public-methods
+
+    """ Context manager recording a single span, see StartupTracer.span """
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start_time = None
+
+    def __enter__(self):
+        self.start_time = time.time()
+        return self
+
+    def __exit__(self, *args):
+        StartupTracer.add_span(
+            self.name, self.category, self.start_time, time.time(), self.args)
+
+
+class _NullSpan(object):  # pylint: disable=too-few-public-methods
+
+    """ Context manager doing nothing, used when the tracer is not recording """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class StartupTracer(object):
+
+    """ Records nested spans of the pipeline startup, such as the creation of
+    the managers, plugin hooks, stage creation, shader and texture loads. The
+    spans can be exported as Chrome trace-event file, which can be viewed with
+    chrome://tracing or https://ui.perfetto.dev. The pipeline stops recording
+    after the first frame, so the tracer has no overhead afterwards. Spans
+    may also be recorded from worker threads, they get their own track. """
+
+    _EVENTS = []
+    _LOCK = threading.Lock()
+    _RECORDING = True
+    _START_TIME = time.time()
+    _NULL_SPAN = _NullSpan()
+
+    @classmethod
+    def span(cls, name, category="startup", **args):
+        """ Returns a context manager recording a span with the given name
+        and category. Additional keyword arguments are stored with the span. """
+        if not cls._RECORDING:
+            return cls._NULL_SPAN
+        return _TracedSpan(name, category, args)
+
+    @classmethod
+    def add_span(cls, name, category, start_time, end_time, args=None):
+        """ Records a span given its start and end time in seconds, as returned
+        by time.time(). Spans are nested based on their start and end time. """
+        if not cls._RECORDING:
+            return
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start_time - cls._START_TIME) * 1e6,
+            "dur": (end_time - start_time) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.current_thread().ident,
+            "args": args or {},
+        }
+        with cls._LOCK:
+            cls._EVENTS.append(event)
+
+    @classmethod
+    def is_recording(cls):
+        """ Returns whether spans are currently recorded """
+        return cls._RECORDING
+
+    @classmethod
+    def stop(cls):
+        """ Stops recording spans, the recorded spans are kept """
+        cls._RECORDING = False
+
+    @classmethod
+    def get_spans(cls, category=None):
+        """ Returns a list of (name, category, duration) tuples of all recorded
+        spans, optionally only of the given category. Durations are in seconds. """
+        with cls._LOCK:
+            events = list(cls._EVENTS)
+        return [(i["name"], i["cat"], i["dur"] / 1e6) for i in events
+                if category is None or i["cat"] == category]
+
+    @classmethod
+    def export(cls, filename):
+        """ Writes all recorded spans to the given file, in the Chrome
+        trace-event format """
+        with cls._LOCK:
+            events = list(cls._EVENTS)
+        with open(filename, "w") as handle:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, handle)
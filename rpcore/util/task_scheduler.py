@@ -24,54 +24,227 @@ THE SOFTWARE.
 
 """
 
+from __future__ import division
+
+import time
+import collections
+
+from rplibs.six import iteritems
 from rplibs.yaml import load_yaml_file
 from rpcore.rpobject import RPObject
 
 
+class _MeasuredTask(object):  # pylint: disable=too-few-public-methods
+
+    """ Context manager reporting the time spent in it as cost of a task,
+    see TaskScheduler.measure """
+
+    def __init__(self, scheduler, task_name):
+        self.scheduler = scheduler
+        self.task_name = task_name
+        self.start_time = None
+
+    def __enter__(self):
+        self.start_time = time.time()
+        return self
+
+    def __exit__(self, *args):
+        self.scheduler.report_cost(self.task_name, (time.time() - self.start_time) * 1000.0)
+
+
 class TaskScheduler(RPObject):
 
     """ This class manages the scheduled tasks and splits them over multiple
     frames. Plugins can query whether their subtasks should be executed
     or queued for later frames. Also performs analysis on the task configuration
-    to figure if tasks are distributed uniformly. """
+    to figure if tasks are distributed uniformly.
+
+    There are two modes: In the frame_cycles mode, the tasks run in the fixed
+    order given by the configuration. In the adaptive mode, each frame the most
+    overdue tasks are picked until the frame budget is used up, based on the
+    cost and the maximum staleness of each task.
+
+    Plugins measure the cpu time of their tasks, see measure(). Since most
+    tasks only enable targets which get rendered later on, the gpu time is not
+    included, so the estimated cost is used unless the measured cost exceeds it. """
+
+    MODES = ("frame_cycles", "adaptive")
 
     def __init__(self, pipeline):
         RPObject.__init__(self)
         self._pipeline = pipeline
         self._tasks = []
         self._frame_index = 0
+        self._frame = 0
+        self._task_infos = collections.OrderedDict()
+        self._scheduled = set()
+        self.mode = "frame_cycles"
+        self.frame_budget = 0.0
+        self.scheduled_cost = 0.0
         self._load_config()
 
     def _load_config(self):
         """ Loads the tasks distribution configuration """
-        config = load_yaml_file("/$$rpconfig/task-scheduler.yaml")["frame_cycles"]
-        for frame_name, tasks in config:  # pylint: disable=unused-variable
+        config = load_yaml_file("/$$rpconfig/task-scheduler.yaml")
+        for frame_name, tasks in config["frame_cycles"]:  # pylint: disable=unused-variable
             self._tasks.append(tasks)
 
+        self.mode = config.get("mode", "frame_cycles")
+        if self.mode not in self.MODES:
+            self.error("Unkown scheduler mode '" + self.mode + "', using frame_cycles")
+            self.mode = "frame_cycles"
+        self.frame_budget = config.get("frame_budget", 1.0)
+
+        for task_name, options in config.get("adaptive_tasks", []):
+            self.register_task(task_name, options["cost"], options["max_staleness"])
+        for sequence in config.get("sequences", []):
+            self.add_sequence(sequence)
+
+        # Tasks which only appear in the frame cycles should run once per cycle
+        for tasks in self._tasks:
+            for task_name in tasks:
+                if task_name not in self._task_infos:
+                    self.register_task(task_name, 0.0, len(self._tasks))
+
+    def register_task(self, task_name, cost, max_staleness):
+        """ Registers a new task, or updates an existing one. The cost is the
+        estimated time in milliseconds the task takes, and max_staleness the
+        amount of frames after which the task should run again. Tasks which are
+        not part of the frame cycles run every max_staleness frames in the
+        frame_cycles mode. """
+        info = self._task_infos.setdefault(task_name, {
+            "observed_cost": None, "last_run": -1, "runs": 0,
+            "sequence": None, "queried": False})
+        info["cost"] = float(cost)
+        info["max_staleness"] = max(1, int(max_staleness))
+
+    def add_sequence(self, task_names):
+        """ Makes the given tasks always run in the given order, with at most one
+        task of the sequence per frame. This is required for tasks which build
+        on the results of the previous task. All tasks have to be registered. """
+        sequence = {"tasks": list(task_names), "index": 0}
+        for task_name in task_names:
+            if task_name not in self._task_infos:
+                self.error("Cannot add unregistered task '" + task_name + "' to a sequence")
+                return
+        for task_name in task_names:
+            self._task_infos[task_name]["sequence"] = sequence
+
+    def measure(self, task_name):
+        """ Returns a context manager which reports the time spent in it as
+        cost of the given task, usually wrapping the work done when the
+        task is scheduled """
+        return _MeasuredTask(self, task_name)
+
+    def report_cost(self, task_name, cost):
+        """ Reports the measured time in milliseconds a task took. The observed
+        cost is averaged over multiple runs. """
+        info = self._task_infos.get(task_name)
+        if info is None:
+            self.error("Cannot report cost of unregistered task '" + task_name + "'")
+            return
+        if info["observed_cost"] is None:
+            info["observed_cost"] = cost
+        else:
+            info["observed_cost"] = 0.9 * info["observed_cost"] + 0.1 * cost
+
+    def get_cost(self, task_name):
+        """ Returns the cost of a task in milliseconds, which is its estimated
+        cost, or its observed cost in case that is higher """
+        info = self._task_infos[task_name]
+        if info["observed_cost"] is not None:
+            return max(info["cost"], info["observed_cost"])
+        return info["cost"]
+
     def _check_missing_schedule(self, task_name):
         """ Checks whether the given task is scheduled at some point. This can
         be used to check whether any task is missing in the task scheduler config. """
-        for tasks in self._tasks:
-            if task_name in tasks:
-                break
-        else:
+        if task_name not in self._task_infos:
             self.error("Task '" + task_name + "' is never scheduled and thus will never run!")
 
     def is_scheduled(self, task_name):
         """ Returns whether a given task is supposed to run this frame """
         self._check_missing_schedule(task_name)
-        return task_name in self._tasks[self._frame_index]
+        if task_name in self._task_infos:
+            self._task_infos[task_name]["queried"] = True
+        return task_name in self._scheduled
+
+    def _get_overdue(self, info):
+        """ Returns how overdue a task is, a value of 1 means the task did not
+        run for max_staleness frames """
+        return (self._frame - info["last_run"]) / info["max_staleness"]
+
+    def _is_eligible(self, task_name, info):
+        """ Returns whether a task may run this frame, respecting its sequence """
+        sequence = info["sequence"]
+        return sequence is None or sequence["tasks"][sequence["index"]] == task_name
+
+    def _schedule(self):
+        """ Determines which tasks run this frame """
+        scheduled = set()
+        self.scheduled_cost = 0.0
+
+        if self.mode == "frame_cycles":
+            scheduled.update(self._tasks[self._frame_index])
+            for task_name, info in iteritems(self._task_infos):
+                if all(task_name not in tasks for tasks in self._tasks) and \
+                   self._frame % info["max_staleness"] == 0:
+                    scheduled.add(task_name)
+            self.scheduled_cost = sum(self.get_cost(i) for i in scheduled)
+        else:
+            candidates = [(task_name, info) for task_name, info in iteritems(self._task_infos)
+                          if self._is_eligible(task_name, info)]
+            candidates.sort(key=lambda i: self._get_overdue(i[1]), reverse=True)
+            for task_name, info in candidates:
+                # Tasks nobody asked for yet, e.g. of disabled plugins, cost nothing
+                cost = self.get_cost(task_name) if info["queried"] else 0.0
+
+                # Always run the most overdue task, so every task makes progress
+                if scheduled and self.scheduled_cost + cost > self.frame_budget:
+                    continue
+                scheduled.add(task_name)
+                self.scheduled_cost += cost
+
+        for task_name in scheduled:
+            info = self._task_infos[task_name]
+            info["last_run"] = self._frame
+            info["runs"] += 1
+            sequence = info["sequence"]
+            if sequence is not None and sequence["tasks"][sequence["index"]] == task_name:
+                sequence["index"] = (sequence["index"] + 1) % len(sequence["tasks"])
+        self._scheduled = scheduled
 
     def step(self):
         """ Advances one frame """
+        self._frame += 1
         self._frame_index = (self._frame_index + 1) % len(self._tasks)
+        self._schedule()
+
+    def get_task_stats(self):
+        """ Returns a list of all tasks, sorted by how overdue they are. Each
+        entry is a dictionary containing the name of the task, the frame it last
+        ran in, the amount of frames since then, its maximum staleness, its
+        estimated and observed cost and how often it ran. """
+        stats = []
+        for task_name, info in iteritems(self._task_infos):
+            stats.append({
+                "name": task_name,
+                "last_run": info["last_run"],
+                "age": self._frame - info["last_run"],
+                "max_staleness": info["max_staleness"],
+                "cost": info["cost"],
+                "observed_cost": info["observed_cost"],
+                "runs": info["runs"],
+            })
+        stats.sort(key=lambda i: i["age"] / i["max_staleness"], reverse=True)
+        return stats
 
     @property
     def num_tasks(self):
         """ Returns the total amount of tasks """
-        return sum((len(i) for i in self._tasks))
+        return len(self._task_infos)
 
     @property
     def num_scheduled_tasks(self):
         """ Returns the amount of scheduled tasks this frame """
-        return len(self._tasks[self._frame_index])
+        return len(self._scheduled)
@@ -0,0 +1,85 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from rpcore.rpobject import RPObject
+
+
+class TransientAllocator(RPObject):
+
+    """ Assigns resources with a limited lifetime to shared storage. Each
+    resource has a compatibility key and is used from its first to its last
+    use (both inclusive, e.g. stage indices). Resources with the same key whose
+    lifetimes do not overlap can share the same storage, which is the handle
+    of the first resource assigned to it. """
+
+    def __init__(self):
+        RPObject.__init__(self)
+        self._resources = []
+        self._slots = []
+
+    def add_resource(self, handle, key, first_use, last_use, memory=0):
+        """ Adds a new resource, memory is the size of the resource in bytes
+        and only used for the statistics """
+        assert first_use <= last_use
+        self._resources.append((first_use, last_use, key, handle, memory))
+
+    def allocate(self):
+        """ Assigns all resources to storage, and returns a list of tuples
+        (handle, storage handle) for all resources which can reuse the storage
+        of another resource """
+        self._slots = []
+        result = []
+
+        # Greedy interval assignment: processing the resources by their first
+        # use and reusing the storage which got free first is optimal for a
+        # single key, since lifetimes are intervals
+        for first_use, last_use, key, handle, memory in sorted(
+                self._resources, key=lambda i: (i[0], i[1])):
+            free_slots = [i for i in self._slots if i["key"] == key and i["free_at"] < first_use]
+            if free_slots:
+                slot = min(free_slots, key=lambda i: i["free_at"])
+                slot["free_at"] = last_use
+                slot["users"] += 1
+                result.append((handle, slot["handle"]))
+            else:
+                self._slots.append({"key": key, "handle": handle, "free_at": last_use,
+                                    "memory": memory, "users": 1})
+        return result
+
+    def get_stats(self):
+        """ Returns a dictionary containing the amount of resources and storage
+        slots, the summed memory of all resources, the memory allocated after
+        aliasing and the peak memory of all resources in use at the same time """
+        peak = 0
+        for time in set(i[0] for i in self._resources):
+            peak = max(peak, sum(i[4] for i in self._resources if i[0] <= time <= i[1]))
+        return {
+            "resources": len(self._resources),
+            "slots": len(self._slots),
+            "summed": sum(i[4] for i in self._resources),
+            "allocated": sum(i["memory"] for i in self._slots),
+            "peak": peak,
+        }
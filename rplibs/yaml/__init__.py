@@ -2,12 +2,22 @@
 
 Main PyYAML importer script. Provides functions to load YAML files as dictionaries.
 
+Parsed files are cached as pickled snapshots, keyed by the path, modification
+time and size of the file. The snapshots are kept in memory, and additionally
+stored on disk in case a cache directory was set with set_yaml_cache_dir().
+
 """
 
-from __future__ import print_function
+from __future__ import print_function, absolute_import
 
+import io
+import os
 import sys
-import collections
+import time
+import pickle
+import hashlib
+import threading
+from panda3d.core import Filename, VirtualFileSystem
 from direct.stdpy.file import open
 from rpcore.rpobject import RPObject
 
@@ -19,30 +29,150 @@ else:
     from .yaml_py3 import load as yaml_load
     from .yaml_py3 import YAMLError, SafeLoader
 
-__all__ = ["load_yaml_file", "load_yaml_file_flat"]
+# Prefer libyaml in case PyYAML was installed with its C extension, it is
+# a lot faster than the pure python parser
+try:
+    from yaml import load as cyaml_load
+    from yaml import CSafeLoader
+    from yaml import YAMLError as CYAMLError
+except ImportError:
+    cyaml_load, CSafeLoader, CYAMLError = None, None, YAMLError
+
+__all__ = ["load_yaml_file", "load_yaml_file_flat", "set_yaml_cache_dir", "get_yaml_stats"]
+
+# Bump this whenever the format of the snapshots changes
+SNAPSHOT_VERSION = 1
+
+_SNAPSHOTS = {}
+_CACHE_DIR = None
+_STATS = {"files": 0, "cached": 0, "duration": 0.0}
+
+# Guards the snapshots and stats, since effects load yaml files from worker threads
+_LOCK = threading.Lock()
+
+
+def set_yaml_cache_dir(path):
+    """ Sets the directory to store the parsed yaml files in, so that they
+    do not have to be parsed again on the next start. Pass None to only
+    cache the files in memory. """
+    global _CACHE_DIR  # pylint: disable=global-statement
+    if path is not None and not os.path.isdir(path):
+        try:
+            os.makedirs(path)
+        except OSError as msg:
+            RPObject.global_warn("YAMLLoader", "Could not create yaml cache", path, ":", msg)
+            path = None
+    _CACHE_DIR = path
+
+
+def get_yaml_stats():
+    """ Returns a dictionary containing the amount of loaded yaml files, how
+    many of them were loaded from the cache, the total time spent loading
+    them in seconds and whether libyaml is used """
+    with _LOCK:
+        stats = dict(_STATS)
+    stats["libyaml"] = CSafeLoader is not None
+    return stats
+
+
+def _get_file_stamp(filename):
+    """ Returns the modification time and size of a file, or None if the
+    file does not exist """
+    vfile = VirtualFileSystem.get_global_ptr().get_file(Filename(filename), True)
+    if vfile is None:
+        return None
+    return vfile.get_timestamp(), vfile.get_file_size()
+
+
+def _get_snapshot_file(filename):
+    """ Returns the path of the on-disk snapshot of a file, or None if no
+    cache directory is set """
+    if _CACHE_DIR is None:
+        return None
+    path_hash = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+    return os.path.join(_CACHE_DIR, "{}-py{}.pickle".format(path_hash, sys.version_info[0]))
+
+
+def _load_snapshot(filename, stamp):
+    """ Returns the pickled snapshot of a file, or None if there is no
+    snapshot matching the given stamp """
+    with _LOCK:
+        snapshot = _SNAPSHOTS.get(filename)
+    if snapshot is not None and snapshot[0] == stamp:
+        return snapshot[1]
+
+    snapshot_file = _get_snapshot_file(filename)
+    if snapshot_file is None or not os.path.isfile(snapshot_file):
+        return None
+    try:
+        with io.open(snapshot_file, "rb") as handle:
+            version, snapshot_stamp, data = pickle.loads(handle.read())
+    except Exception:  # pylint: disable=broad-except
+        return None
+    if version != SNAPSHOT_VERSION or snapshot_stamp != stamp:
+        return None
+    with _LOCK:
+        _SNAPSHOTS[filename] = (stamp, data)
+    return data
+
+
+def _store_snapshot(filename, stamp, data):
+    """ Stores the pickled snapshot of a file in memory and on disk """
+    with _LOCK:
+        _SNAPSHOTS[filename] = (stamp, data)
+    snapshot_file = _get_snapshot_file(filename)
+    if snapshot_file is None:
+        return
+    temp_file = snapshot_file + ".{}-{}.tmp".format(
+        os.getpid(), threading.current_thread().ident)
+    try:
+        with io.open(temp_file, "wb") as handle:
+            handle.write(pickle.dumps((SNAPSHOT_VERSION, stamp, data), pickle.HIGHEST_PROTOCOL))
+        if os.path.isfile(snapshot_file):
+            os.remove(snapshot_file)
+        os.rename(temp_file, snapshot_file)
+    except (IOError, OSError) as msg:
+        RPObject.global_warn("YAMLLoader", "Failed to write", snapshot_file, ":", msg)
+
+
+def _parse_yaml_file(filename):
+    """ Parses a yaml file, using libyaml if available """
+    with open(filename, "r") as handle:
+        content = handle.read()
+    if CSafeLoader is not None:
+        return cyaml_load(content, Loader=CSafeLoader)
+    return yaml_load(content, Loader=SafeLoader)
+
 
 def load_yaml_file(filename):
     """ This method is a wrapper arround yaml_load, and provides error checking """
+    start = time.time()
 
-    import time
-    start = time.process_time()
+    stamp = _get_file_stamp(filename)
+    snapshot = _load_snapshot(filename, stamp) if stamp is not None else None
 
-    try:
-        with open(filename, "r") as handle:
-            parsed_yaml = yaml_load(handle, Loader=SafeLoader)
-    except IOError as msg:
-        RPObject.global_error("YAMLLoader", "Could not find or open file:", filename)
-        RPObject.global_error("YAMLLoader", msg)
-        raise Exception("Failed to load YAML file: File not found")
-    except YAMLError as msg:
-        RPObject.global_error("YAMLLoader", "Invalid yaml-syntax in file:", filename)
-        RPObject.global_error("YAMLLoader", msg)
-        raise Exception("Failed to load YAML file: Invalid syntax")
-
-    duration = (time.process_time() - start) * 1000.0
-
-    # Optionally print out profiling information
-    # print("Took", round(duration, 2), "ms to load", filename)
+    if snapshot is not None:
+        # Unpickle the snapshot every time, since callers modify the result
+        parsed_yaml = pickle.loads(snapshot)
+        with _LOCK:
+            _STATS["cached"] += 1
+    else:
+        try:
+            parsed_yaml = _parse_yaml_file(filename)
+        except IOError as msg:
+            RPObject.global_error("YAMLLoader", "Could not find or open file:", filename)
+            RPObject.global_error("YAMLLoader", msg)
+            raise Exception("Failed to load YAML file: File not found")
+        except (YAMLError, CYAMLError) as msg:
+            RPObject.global_error("YAMLLoader", "Invalid yaml-syntax in file:", filename)
+            RPObject.global_error("YAMLLoader", msg)
+            raise Exception("Failed to load YAML file: Invalid syntax")
+        if stamp is not None:
+            _store_snapshot(filename, stamp, pickle.dumps(parsed_yaml, pickle.HIGHEST_PROTOCOL))
+
+    with _LOCK:
+        _STATS["files"] += 1
+        _STATS["duration"] += time.time() - start
 
     return parsed_yaml
 
@@ -164,17 +164,21 @@ class EnvironmentCaptureStage(RenderStage):
             target.active = False
 
         # Check for updated faces
+        task_scheduler = self._pipeline.task_scheduler
         for i in range(6):
-            if self._pipeline.task_scheduler.is_scheduled("envprobes_capture_envmap_face" + str(i)):
-                self.regions[i].set_active(True)
+            task_name = "envprobes_capture_envmap_face" + str(i)
+            if task_scheduler.is_scheduled(task_name):
+                with task_scheduler.measure(task_name):
+                    self.regions[i].set_active(True)
 
         # Check for filtering
-        if self._pipeline.task_scheduler.is_scheduled("envprobes_filter_and_store_envmap"):
-            self.target_store.active = True
-            self.target_store_diff.active = True
-            self.filter_diffuse_target.active = True
-            for target in self.filter_targets:
-                target.active = True
+        if task_scheduler.is_scheduled("envprobes_filter_and_store_envmap"):
+            with task_scheduler.measure("envprobes_filter_and_store_envmap"):
+                self.target_store.active = True
+                self.target_store_diff.active = True
+                self.filter_diffuse_target.active = True
+                for target in self.filter_targets:
+                    target.active = True
 
     def set_shader_input(self, *args):
         Globals.render.set_shader_input(*args)
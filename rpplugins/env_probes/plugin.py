@@ -94,18 +94,20 @@ class Plugin(BasePlugin):
         CullLightsStage.required_inputs.append("EnvProbes")
 
     def on_pre_render_update(self):
-        if self._pipeline.task_scheduler.is_scheduled("envprobes_select_and_cull"):
-            self.probe_mgr.update()
-            self.pta_probes[0] = self.probe_mgr.num_probes
-            probe = self.probe_mgr.find_probe_to_update()
-            if probe:
-                probe.last_update = Globals.clock.get_frame_count()
-                self.capture_stage.active = True
-                self.capture_stage.set_probe(probe)
-
-                if self.is_plugin_enabled("pssm"):
-                    self.get_plugin_instance("pssm").scene_shadow_stage.request_focus(
-                        probe.bounds.get_center(), probe.bounds.get_radius()
-                    )
-            else:
-                self.capture_stage.active = False
+        task_scheduler = self._pipeline.task_scheduler
+        if task_scheduler.is_scheduled("envprobes_select_and_cull"):
+            with task_scheduler.measure("envprobes_select_and_cull"):
+                self.probe_mgr.update()
+                self.pta_probes[0] = self.probe_mgr.num_probes
+                probe = self.probe_mgr.find_probe_to_update()
+                if probe:
+                    probe.last_update = Globals.clock.get_frame_count()
+                    self.capture_stage.active = True
+                    self.capture_stage.set_probe(probe)
+
+                    if self.is_plugin_enabled("pssm"):
+                        self.get_plugin_instance("pssm").scene_shadow_stage.request_focus(
+                            probe.bounds.get_center(), probe.bounds.get_radius()
+                        )
+                else:
+                    self.capture_stage.active = False
@@ -68,27 +68,31 @@ class PSSMDistShadowStage(RenderStage):
         self.target_blur_h.active = False
 
         # Query scheduled tasks
-        if self._pipeline.task_scheduler.is_scheduled("pssm_distant_shadows"):
-
-            self.target.active = True
-
-            # Reposition camera before we capture the scene
-            cam_pos = Globals.base.cam.get_pos(Globals.base.render)
-            self.cam_node.set_pos(cam_pos + self.sun_vector * self.sun_distance)
-            self.cam_node.look_at(cam_pos)
-            self.cam_lens.set_film_size(self.clip_size, self.clip_size)
-
-            snap_shadow_map(self.mvp, self.cam_node, self.resolution)
-
-        if self._pipeline.task_scheduler.is_scheduled("pssm_convert_distant_to_esm"):
-            self.target_convert.active = True
-        if self._pipeline.task_scheduler.is_scheduled("pssm_blur_distant_vert"):
-            self.target_blur_v.active = True
-        if self._pipeline.task_scheduler.is_scheduled("pssm_blur_distant_horiz"):
-            self.target_blur_h.active = True
-
-            # Only update the MVP as soon as the shadow map is available
-            self.pta_mvp[0] = self.mvp
+        task_scheduler = self._pipeline.task_scheduler
+        if task_scheduler.is_scheduled("pssm_distant_shadows"):
+            with task_scheduler.measure("pssm_distant_shadows"):
+                self.target.active = True
+
+                # Reposition camera before we capture the scene
+                cam_pos = Globals.base.cam.get_pos(Globals.base.render)
+                self.cam_node.set_pos(cam_pos + self.sun_vector * self.sun_distance)
+                self.cam_node.look_at(cam_pos)
+                self.cam_lens.set_film_size(self.clip_size, self.clip_size)
+
+                snap_shadow_map(self.mvp, self.cam_node, self.resolution)
+
+        if task_scheduler.is_scheduled("pssm_convert_distant_to_esm"):
+            with task_scheduler.measure("pssm_convert_distant_to_esm"):
+                self.target_convert.active = True
+        if task_scheduler.is_scheduled("pssm_blur_distant_vert"):
+            with task_scheduler.measure("pssm_blur_distant_vert"):
+                self.target_blur_v.active = True
+        if task_scheduler.is_scheduled("pssm_blur_distant_horiz"):
+            with task_scheduler.measure("pssm_blur_distant_horiz"):
+                self.target_blur_h.active = True
+
+                # Only update the MVP as soon as the shadow map is available
+                self.pta_mvp[0] = self.mvp
 
     def create(self):
         self.camera = Camera("PSSMDistShadowsESM")
@@ -77,24 +77,26 @@ class PSSMSceneShadowStage(RenderStage):
             self.cam_lens.get_projection_mat()
 
     def update(self):
-        if self._pipeline.task_scheduler.is_scheduled("pssm_scene_shadows"):
-            if self.focus is None:
-                # When no focus is set, there is no point in rendering the shadow map
-                self.target.active = False
-            else:
-                focus_point, focus_size = self.focus
-
-                self.cam_lens.set_near_far(0.0, 2 * (focus_size + self.sun_distance))
-                self.cam_lens.set_film_size(2 * focus_size, 2 * focus_size)
-                self.cam_node.set_pos(
-                    focus_point + self.sun_vector * (self.sun_distance + focus_size))
-                self.cam_node.look_at(focus_point)
-
-                snap_shadow_map(self.mvp, self.cam_node, self.resolution)
-                self.target.active = True
-                self.pta_mvp[0] = self.mvp
-
-                self.focus = None
+        task_scheduler = self._pipeline.task_scheduler
+        if task_scheduler.is_scheduled("pssm_scene_shadows"):
+            with task_scheduler.measure("pssm_scene_shadows"):
+                if self.focus is None:
+                    # When no focus is set, there is no point in rendering the shadow map
+                    self.target.active = False
+                else:
+                    focus_point, focus_size = self.focus
+
+                    self.cam_lens.set_near_far(0.0, 2 * (focus_size + self.sun_distance))
+                    self.cam_lens.set_film_size(2 * focus_size, 2 * focus_size)
+                    self.cam_node.set_pos(
+                        focus_point + self.sun_vector * (self.sun_distance + focus_size))
+                    self.cam_node.look_at(focus_point)
+
+                    snap_shadow_map(self.mvp, self.cam_node, self.resolution)
+                    self.target.active = True
+                    self.pta_mvp[0] = self.mvp
+
+                    self.focus = None
         else:
             self.target.active = False
 
@@ -82,8 +82,12 @@ class Plugin(BasePlugin):
         return sun_vector
 
     def on_pre_render_update(self):
-        self.envmap_stage.active = self._pipeline.task_scheduler.is_scheduled(
-            "scattering_update_envmap")
+        task_scheduler = self._pipeline.task_scheduler
+        if task_scheduler.is_scheduled("scattering_update_envmap"):
+            with task_scheduler.measure("scattering_update_envmap"):
+                self.envmap_stage.active = True
+        else:
+            self.envmap_stage.active = False
 
     def on_shader_reload(self):
         self.scattering_model.compute()
@@ -0,0 +1,120 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+Benchmarks the GPUCommandList of the python implementation against the
+previous list of commands, which wrote each command with its own copy.
+Uses 1024 commands per frame, which matches the GPUCommandQueue.
+
+Usage: python command_list_benchmark.py [num_frames]
+
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+import random
+
+sys.path.insert(0, "../../")
+
+from rpcore.pynative.gpu_command import GPUCommand  # noqa
+from rpcore.pynative.gpu_command_list import GPUCommandList  # noqa
+
+COMMANDS_PER_FRAME = 1024
+
+
+class ListGPUCommandList(object):
+
+    """ The previous command list, which pops each command from a list """
+
+    def __init__(self):
+        self._commands = []
+
+    def add_command(self, cmd):
+        self._commands.append(cmd)
+
+    def write_commands_to(self, dest, limit=32):
+        num_commands_written = 0
+        while num_commands_written < limit and self._commands:
+            self._commands.pop(0).write_to(dest, num_commands_written)
+            num_commands_written += 1
+        return num_commands_written
+
+
+class RamImage(bytearray):
+
+    """ Stand-in for the ram image of the CommandQueue buffer texture """
+
+    def set_subdata(self, offset, size, data):
+        self[offset:offset + size] = data
+
+
+def make_commands(num_commands, seed=42):
+    """ Creates commands similar to the ones emitted by the light manager """
+    rng = random.Random(seed)
+    commands = []
+    for i in range(num_commands):
+        cmd = GPUCommand(GPUCommand.CMD_store_light)
+        cmd.push_int(i)
+        for _ in range(16):
+            cmd.push_float(rng.uniform(-100.0, 100.0))
+        commands.append(cmd)
+    return commands
+
+
+def run(cmd_list, commands, num_frames):
+    """ Adds the commands of num_frames frames and processes them, returns
+    the duration and the written data of each frame """
+    dest = RamImage(COMMANDS_PER_FRAME * 32 * 4)
+    frames = []
+    start = time.time()
+    for frame in range(num_frames):
+        # Queue more commands than can be processed, to keep a backlog
+        offset = (frame * COMMANDS_PER_FRAME) % len(commands)
+        for cmd in commands[offset:offset + COMMANDS_PER_FRAME + 64]:
+            cmd_list.add_command(cmd)
+        num_written = cmd_list.write_commands_to(dest, COMMANDS_PER_FRAME)
+        frames.append(bytes(dest[:num_written * 32 * 4]))
+    return time.time() - start, frames
+
+
+if __name__ == "__main__":
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    commands = make_commands(8 * COMMANDS_PER_FRAME)
+    print("Processing", num_frames, "frames with", COMMANDS_PER_FRAME, "commands each ..")
+
+    duration_new, frames_new = run(GPUCommandList(), commands, num_frames)
+    duration_old, frames_old = run(ListGPUCommandList(), commands, num_frames)
+
+    total = num_frames * COMMANDS_PER_FRAME
+    for name, duration in (("GPUCommandList:", duration_new), ("List (before):", duration_old)):
+        print("{:18s} {:8.3f} ms / frame, {:10.0f} commands / s".format(
+            name, duration / num_frames * 1000.0, total / max(1e-6, duration)))
+
+    print("Speedup: {:.1f}x".format(duration_old / max(1e-6, duration_new)))
+    if frames_new != frames_old:
+        print("ERROR: The command lists wrote different data!")
+        sys.exit(1)
+    print("Both command lists wrote identical data.")
@@ -0,0 +1,101 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+Checks the hot reloading of effects through RenderPipeline.reload_changed_shaders.
+Saves an effect with a syntax error, which has to be logged instead of raised,
+while the effect keeps its previous shaders. Afterwards measures how long
+reloading the fixed effect takes.
+
+Usage: python hot_reload_benchmark.py [num_reloads]
+
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+sys.path.insert(0, "../../")
+
+from direct.stdpy.file import open  # noqa
+from rpcore.render_pipeline import RenderPipeline  # noqa
+from rpcore.effect import Effect  # noqa
+
+EFFECT_PATH = "/$$rptemp/hot_reload_benchmark.yaml"
+PASSES = ("gbuffer", "shadow", "voxelize", "envmap", "forward")
+BROKEN_YAML = "\nbroken: [unclosed\n  value: : :\n"
+
+
+class Stub(object):  # pylint: disable=too-few-public-methods
+
+    """ Stand-in for the stage and light manager, which require a window """
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def write_effect(content):
+    """ Writes the effect used by the benchmark """
+    with open(EFFECT_PATH, "w") as handle:
+        handle.write(content)
+
+
+def get_shaders(effect):
+    """ Returns the shader objects of all passes of an effect """
+    return [effect.get_shader_obj(i) for i in PASSES]
+
+
+if __name__ == "__main__":
+    num_reloads = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    pipeline = RenderPipeline()
+    pipeline.mount_mgr.mount()
+    pipeline.load_settings("/$$rpconfig/pipeline.yaml")
+    pipeline.stage_mgr = Stub(stages=[])
+    pipeline.light_mgr = Stub(cmd_queue=Stub(SHADER_SOURCES=()))
+
+    with open("/$$rp/effects/default.yaml", "r") as handle:
+        source = handle.read()
+    write_effect(source)
+    effect = Effect.load(EFFECT_PATH, {})
+    shaders = get_shaders(effect)
+
+    print("Reloading the effect with a syntax error ..")
+    write_effect(source + BROKEN_YAML)
+    num_stages, num_effects = pipeline.reload_changed_shaders([EFFECT_PATH])
+    assert num_effects == 0, "The broken effect was reloaded"
+    assert get_shaders(effect) == shaders, "The broken effect lost its shaders"
+    assert effect in Effect.get_loaded_effects(), "The broken effect was removed"
+    print("The broken effect kept its previous shaders.")
+
+    write_effect(source)
+    start = time.time()
+    for i in range(num_reloads):
+        num_stages, num_effects = pipeline.reload_changed_shaders([EFFECT_PATH])
+        assert num_effects == 1, "The fixed effect was not reloaded"
+    duration = (time.time() - start) * 1000.0
+    assert get_shaders(effect) != shaders, "The fixed effect kept its old shaders"
+    print("Reloaded the fixed effect {} times: {:8.2f} ms total, {:6.3f} ms / reload".format(
+        num_reloads, duration, duration / num_reloads))
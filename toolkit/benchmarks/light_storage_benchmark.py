@@ -0,0 +1,160 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+Uploads lights with the NumpyLightStorage over several frames, alternating
+between frames which change a few lights and frames which change most lights.
+The command queue processes only a few commands per frame, so range commands
+are still queued when a frame changes enough lights for a ram image upload.
+The LightData buffer is simulated in python, to verify that queued commands
+never overwrite newer data, compared to the previous version which switched to
+the ram image regardless of queued commands.
+
+Usage: python light_storage_benchmark.py [num_frames]
+
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+import random
+
+import numpy
+
+sys.path.insert(0, "../../")
+
+from rpcore.pynative.gpu_command_list import GPUCommandList  # noqa
+from rpcore.pynative.light_storage import NumpyLightStorage  # noqa
+
+from range_command_benchmark import RamImage, execute_commands  # noqa
+
+MAX_LIGHTS = 2048
+
+# Small on purpose, so the command queue lags behind by several frames
+COMMANDS_PER_FRAME = 64
+
+
+class FakeLight(object):
+
+    """ Stores a slot and writes random data to the light storage """
+
+    def __init__(self, slot, rng):
+        self.slot = slot
+        self.rng = rng
+
+    def get_slot(self):
+        return self.slot
+
+    def write_to_storage(self, storage, slot):
+        storage.light_type[slot] = 1
+        storage.position[slot] = [self.rng.uniform(-10, 10) for _ in range(3)]
+        storage.color[slot] = [self.rng.uniform(0, 1) for _ in range(3)]
+        storage.radius[slot] = self.rng.uniform(1, 20)
+
+
+class FakeBufferTexture(object):
+
+    """ Stand-in for the LightData buffer texture, stores whether the ram
+    image was modified and has to be uploaded """
+
+    def __init__(self):
+        self.ram_image = bytearray(MAX_LIGHTS * NumpyLightStorage.RECORD_SIZE * 4)
+        self.modified = False
+
+    def modify_ram_image(self):
+        self.modified = True
+        return self.ram_image
+
+
+class PreviousLightStorage(NumpyLightStorage):
+
+    """ The previous version, which ignored commands still in the queue """
+
+    def write_dirty_to(self, dest_tex, cmd_list):
+        self._commands_pending = False
+        return NumpyLightStorage.write_dirty_to(self, dest_tex, cmd_list)
+
+
+def render_frame(texture, cmd_list, dest, light_data):
+    """ Uploads the ram image if it was modified, and then processes the
+    command queue, like Panda does when rendering a frame """
+    if texture.modified:
+        texels = numpy.frombuffer(texture.ram_image, dtype=numpy.float32).reshape(-1, 4, 4)
+        light_data[:] = texels[:, :, (2, 1, 0, 3)].flat
+        texture.modified = False
+    num_written = cmd_list.write_commands_to(dest, COMMANDS_PER_FRAME)
+    execute_commands(dest, num_written, light_data, [])
+
+
+def run(storage_cls, num_frames):
+    """ Changes lights for the given amount of frames, then renders until the
+    command queue is empty. Returns the duration spent in write_dirty_to, the
+    amount of ram image uploads and the amount of lights with wrong data """
+    rng = random.Random(42)
+    lights = [FakeLight(i, rng) for i in range(MAX_LIGHTS)]
+    storage = storage_cls(MAX_LIGHTS)
+    cmd_list = GPUCommandList()
+    texture = FakeBufferTexture()
+    dest = RamImage(COMMANDS_PER_FRAME * 32 * 4)
+    light_data = numpy.zeros(MAX_LIGHTS * NumpyLightStorage.RECORD_SIZE, dtype=numpy.float32)
+
+    duration = 0.0
+    num_uploads = 0
+    for frame in range(num_frames):
+        num_changed = 1500 if frame % 3 == 2 else 200
+        for light in rng.sample(lights, num_changed):
+            storage.store_light(light)
+
+        start = time.time()
+        storage.write_dirty_to(texture, cmd_list)
+        duration += time.time() - start
+        num_uploads += int(texture.modified)
+        render_frame(texture, cmd_list, dest, light_data)
+
+    while cmd_list.num_commands > 0:
+        render_frame(texture, cmd_list, dest, light_data)
+
+    expected = storage.pack(slice(0, MAX_LIGHTS))
+    num_wrong = numpy.count_nonzero(
+        (light_data.reshape(MAX_LIGHTS, -1) != expected).any(axis=1))
+    return duration, num_uploads, num_wrong
+
+
+if __name__ == "__main__":
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    print("Uploading lights for", num_frames, "frames with", COMMANDS_PER_FRAME,
+          "commands per frame ..")
+
+    results = []
+    for name, storage_cls in (("NumpyLightStorage:", NumpyLightStorage),
+                              ("Previous:", PreviousLightStorage)):
+        duration, num_uploads, num_wrong = run(storage_cls, num_frames)
+        results.append(num_wrong)
+        print("{:20s} {:8.2f} ms total, {:3d} ram image uploads, {:5d} outdated lights".format(
+            name, duration * 1000.0, num_uploads, num_wrong))
+
+    if results[0] != 0:
+        print("ERROR: Queued commands overwrote newer light data!")
+        sys.exit(1)
+    print("The LightData buffer matches the stored lights.")
@@ -0,0 +1,174 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+Compares uploading lights and shadow sources with one command per object
+against the range commands of the python implementation. The command buffer
+is decoded with a python port of process_command_queue.frag.glsl, to verify
+that both ways produce the same LightData and SourceData, without a GPU.
+
+Usage: python range_command_benchmark.py [num_lights]
+
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+import struct
+import random
+
+sys.path.insert(0, "../../")
+
+from rpcore.pynative.gpu_command import GPUCommand  # noqa
+from rpcore.pynative.gpu_command_list import GPUCommandList  # noqa
+from rpcore.pynative.internal_light_manager import split_into_ranges  # noqa
+
+COMMANDS_PER_FRAME = 1024
+
+
+class FakeRecord(object):
+
+    """ Stores a slot and the data written by write_to_command, like the
+    pynative lights (11 or 14 floats) and shadow sources (20 floats) """
+
+    def __init__(self, slot, data):
+        self.slot = slot
+        self.data = data
+
+    def get_slot(self):
+        return self.slot
+
+    def write_to_command(self, cmd):
+        for value in self.data:
+            cmd.push_float(value)
+
+
+class RamImage(bytearray):
+
+    """ Stand-in for the ram image of the CommandQueue buffer texture """
+
+
+def execute_commands(data, num_blocks, light_data, source_data):
+    """ Python port of process_command_queue.frag.glsl """
+    floats = struct.unpack("{}f".format(num_blocks * 32), bytes(data[:num_blocks * 128]))
+    command_index = 0
+    while command_index < num_blocks:
+        ptr = command_index * 32
+        command_type = int(floats[ptr])
+        if command_type == GPUCommand.CMD_store_light:
+            slot = int(floats[ptr + 1])
+            light_data[slot * 16:slot * 16 + 16] = floats[ptr + 2:ptr + 18]
+        elif command_type == GPUCommand.CMD_store_source:
+            slot = int(floats[ptr + 1])
+            source_data[slot * 20:slot * 20 + 20] = floats[ptr + 2:ptr + 22]
+        elif command_type in (GPUCommand.CMD_store_light_range,
+                              GPUCommand.CMD_store_source_range):
+            is_light = command_type == GPUCommand.CMD_store_light_range
+            record_floats = 16 if is_light else 20
+            dest = light_data if is_light else source_data
+            base_slot, num_records = int(floats[ptr + 1]), int(floats[ptr + 2])
+            size = num_records * record_floats
+            dest[base_slot * record_floats:base_slot * record_floats + size] = \
+                floats[ptr + 3:ptr + 3 + size]
+            command_index += (3 + size + 31) // 32 - 1
+        command_index += 1
+
+
+def encode_single(cmd_list, lights, sources):
+    """ Encodes one command per light and source """
+    for obj, command_type in [(i, GPUCommand.CMD_store_light) for i in lights] + \
+            [(i, GPUCommand.CMD_store_source) for i in sources]:
+        cmd = GPUCommand(command_type)
+        cmd.push_int(obj.get_slot())
+        obj.write_to_command(cmd)
+        cmd_list.add_command(cmd)
+
+
+def encode_ranges(cmd_list, lights, sources):
+    """ Encodes lights and sources in consecutive slots with range commands """
+    for objects, command_type, record_floats in (
+            (lights, GPUCommand.CMD_store_light_range, GPUCommand.LIGHT_RECORD_FLOATS),
+            (sources, GPUCommand.CMD_store_source_range, GPUCommand.SOURCE_RECORD_FLOATS)):
+        max_length = GPUCommand.get_max_range_records(record_floats)
+        for obj_range in split_into_ranges(objects, max_length):
+            cmd_list.add_command(GPUCommand.create_range_command(
+                command_type, record_floats, obj_range))
+
+
+def run(encoder, lights, sources):
+    """ Encodes all objects and processes the queue until it is empty. Returns
+    the encode duration, amount of blocks and the resulting data """
+    cmd_list = GPUCommandList()
+    start = time.time()
+    encoder(cmd_list, lights, sources)
+    duration = time.time() - start
+
+    num_blocks = cmd_list.num_commands
+    light_data = [0.0] * (len(lights) * 16)
+    source_data = [0.0] * (len(sources) * 20)
+    dest = RamImage(COMMANDS_PER_FRAME * 32 * 4)
+    while cmd_list.num_commands > 0:
+        num_written = cmd_list.write_commands_to(dest, COMMANDS_PER_FRAME)
+        execute_commands(dest, num_written, light_data, source_data)
+    return duration, num_blocks, light_data, source_data
+
+
+def to_float32(values):
+    """ Rounds values to float32, like the command buffer does """
+    fmt = "{}f".format(len(values))
+    return list(struct.unpack(fmt, struct.pack(fmt, *values)))
+
+
+if __name__ == "__main__":
+    num_lights = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rng = random.Random(42)
+
+    # Point lights, each with 6 shadow sources in consecutive slots
+    lights = [FakeRecord(i, to_float32([rng.uniform(-10, 10) for _ in range(11)]))
+              for i in range(num_lights)]
+    sources = [FakeRecord(i, to_float32([rng.uniform(-10, 10) for _ in range(20)]))
+               for i in range(num_lights * 6)]
+
+    print("Uploading", num_lights, "point lights with", len(sources), "shadow sources ..")
+    results = []
+    for name, encoder in (("Range commands:", encode_ranges), ("Single commands:", encode_single)):
+        duration, num_blocks, light_data, source_data = run(encoder, lights, sources)
+        results.append((light_data, source_data))
+        print("{:18s} {:8.3f} ms encode, {:6d} blocks, {:8.1f} KiB, {:3d} frames".format(
+            name, duration * 1000.0, num_blocks, num_blocks * 128 / 1024.0,
+            (num_blocks + COMMANDS_PER_FRAME - 1) // COMMANDS_PER_FRAME))
+
+    expected_lights = [0.0] * (num_lights * 16)
+    expected_sources = []
+    for light in lights:
+        expected_lights[light.slot * 16:light.slot * 16 + len(light.data)] = light.data
+    for source in sources:
+        expected_sources += source.data
+
+    for light_data, source_data in results:
+        if light_data != expected_lights or source_data != expected_sources:
+            print("ERROR: The decoded data does not match the packed records!")
+            sys.exit(1)
+    print("Both encodings produce identical light and source data.")
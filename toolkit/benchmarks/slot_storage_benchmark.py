@@ -0,0 +1,160 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+Benchmarks the PointerSlotStorage of the python implementation against the
+linear scan it used before, by adding and removing a lot of lights.
+
+Usage: python slot_storage_benchmark.py [num_lights]
+
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+import random
+
+sys.path.insert(0, "../../")
+
+from rpcore.pynative.pointer_slot_storage import PointerSlotStorage  # noqa
+
+MAX_LIGHT_COUNT = 65535
+MAX_SHADOW_SOURCES = 2048
+
+
+class LinearScanSlotStorage(object):
+
+    """ The previous slot storage, which scans all slots to find free ones """
+
+    def __init__(self, max_size):
+        self._data = [None] * max_size
+        self._max_index = 0
+        self._num_entries = 0
+
+    def get_max_index(self):
+        return self._max_index
+
+    def find_slot(self):
+        for i, value in enumerate(self._data):
+            if not value:
+                return i
+        return -1
+
+    def find_consecutive_slots(self, num_consecutive):
+        if num_consecutive == 1:
+            return self.find_slot()
+        for i in range(len(self._data) - num_consecutive + 1):
+            if not any(self._data[i:i + num_consecutive]):
+                return i
+        return -1
+
+    def free_slot(self, slot):
+        self._data[slot] = None
+        self._num_entries -= 1
+        if slot == self._max_index:
+            while self._max_index >= 0 and not self._data[self._max_index]:
+                self._max_index -= 1
+
+    def reserve_slot(self, slot, ptr):
+        self._max_index = max(self._max_index, slot)
+        self._data[slot] = ptr
+        self._num_entries += 1
+
+    def begin(self):
+        for i in range(self._max_index + 1):
+            if self._data[i]:
+                yield self._data[i]
+
+
+class DummyLight(object):  # pylint: disable=too-few-public-methods
+
+    """ Stand-in for a light, only stores its slots """
+
+    def __init__(self, casts_shadows):
+        self.slot = -1
+        self.source_slot = -1
+        self.num_sources = 6 if casts_shadows else 0
+
+
+def run(storage_cls, num_lights, seed=42):
+    """ Adds num_lights lights, removes half of them in random order, adds
+    them again and finally removes all of them. Returns the duration in seconds
+    and the list of all slots handed out, to compare the implementations. """
+    rng = random.Random(seed)
+    lights = storage_cls(MAX_LIGHT_COUNT)
+    sources = storage_cls(MAX_SHADOW_SOURCES)
+    all_lights = [DummyLight(i % 100 == 0) for i in range(num_lights)]
+    slots = []
+
+    def add(light):
+        light.slot = lights.find_slot()
+        lights.reserve_slot(light.slot, light)
+        slots.append(light.slot)
+        if light.num_sources:
+            light.source_slot = sources.find_consecutive_slots(light.num_sources)
+            if light.source_slot >= 0:
+                for i in range(light.num_sources):
+                    sources.reserve_slot(light.source_slot + i, light)
+            slots.append(light.source_slot)
+
+    def remove(light):
+        lights.free_slot(light.slot)
+        if light.source_slot >= 0:
+            for i in range(light.num_sources):
+                sources.free_slot(light.source_slot + i)
+        light.slot = light.source_slot = -1
+
+    start = time.time()
+    for light in all_lights:
+        add(light)
+    half = rng.sample(all_lights, num_lights // 2)
+    for light in half:
+        remove(light)
+    slots.append(lights.get_max_index())
+    slots.append(sum(1 for _ in lights.begin()))
+    for light in half:
+        add(light)
+    rng.shuffle(all_lights)
+    for light in all_lights:
+        remove(light)
+    slots.append(lights.get_max_index())
+    return time.time() - start, slots
+
+
+if __name__ == "__main__":
+    num_lights = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print("Adding and removing", num_lights, "lights ..")
+
+    duration_new, slots_new = run(PointerSlotStorage, num_lights)
+    print("PointerSlotStorage:    {:8.3f} s".format(duration_new))
+
+    duration_old, slots_old = run(LinearScanSlotStorage, num_lights)
+    print("Linear scan (before):  {:8.3f} s".format(duration_old))
+
+    print("Speedup: {:.1f}x".format(duration_old / max(1e-6, duration_new)))
+    if slots_new != slots_old:
+        print("ERROR: The storages handed out different slots!")
+        sys.exit(1)
+    print("Both storages handed out identical slots.")
@@ -246,7 +246,7 @@ class DayTimeEditor(QMainWindow, Ui_MainWindow):
 
         first_item = None
 
-        for plugin_id, plugin in iteritems(self._plugin_mgr.instances):
+        for plugin_id, plugin in iteritems(self._plugin_mgr.plugin_infos):
 
             daytime_settings = self._plugin_mgr.day_settings[plugin_id]
 
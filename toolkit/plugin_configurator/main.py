@@ -147,7 +147,7 @@ class PluginConfigurator(QMainWindow, Ui_MainWindow):
         assert len(selected_item) == 1
         selected_item = selected_item[0]
         self._current_plugin = selected_item._plugin_id
-        self._current_plugin_instance = self._plugin_mgr.instances[self._current_plugin]
+        self._current_plugin_instance = self._plugin_mgr.plugin_infos[self._current_plugin]
         assert(self._current_plugin_instance is not None)
         self._render_current_plugin()
         self._set_settings_visible(True)
@@ -463,7 +463,7 @@ class PluginConfigurator(QMainWindow, Ui_MainWindow):
         self._plugin_mgr.load()
 
         self.lst_plugins.clear()
-        plugins = sorted(iteritems(self._plugin_mgr.instances), key=lambda plg: plg[1].name)
+        plugins = sorted(iteritems(self._plugin_mgr.plugin_infos), key=lambda plg: plg[1].name)
 
 
         item_font = QFont()
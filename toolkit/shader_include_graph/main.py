@@ -0,0 +1,82 @@
+"""
+
+RenderPipeline
+
+Copyright (c) 2014-2016 tobspr <tobias.springer1@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# This tool prints the include graph of all shaders of the pipeline and its
+# plugins. When shader files are passed, only the files which transitively
+# include them are printed, that is, the files affected by a change.
+#
+# Usage:
+#   python main.py
+#   python main.py /$$rp/shader/includes/brdf.inc.glsl
+#   python main.py --write-path ../../rptemp includes/gbuffer.inc.glsl
+#
+# To resolve the generated $$*.inc.glsl files, pass the write path the
+# pipeline was started with.
+
+from __future__ import print_function
+
+import os
+import sys
+import argparse
+
+# Change to the current directory
+os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__))))
+
+# Add the render pipeline to the path
+sys.path.insert(0, "../../")
+
+from rpcore.mount_manager import MountManager  # noqa
+from rpcore.util.shader_include_graph import ShaderIncludeGraph  # noqa
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prints the shader include graph")
+    parser.add_argument("files", nargs="*", help="Only print the files including these files")
+    parser.add_argument("--write-path", help="Write path containing the generated shaders")
+    args = parser.parse_args()
+
+    mount_mgr = MountManager(None)
+    if args.write_path:
+        mount_mgr.write_path = os.path.abspath(args.write_path)
+        mount_mgr.do_cleanup = False
+    mount_mgr.mount()
+
+    graph = ShaderIncludeGraph()
+    graph.scan()
+
+    if args.files:
+        for path in sorted(graph.get_dependents(args.files)):
+            print(path)
+    else:
+        print(graph.format())
+
+    num_files, num_includes, num_unresolved = graph.get_stats()
+    print("\n{} files, {} includes, {} not found".format(
+        num_files, num_includes, num_unresolved), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()